@@ -11,6 +11,8 @@ from app.models.session import Session
 from app.models.session import Session
 from app.models.transcription_block import TranscriptionBlock
 from app.models.settings import PromptTemplate, VocabularyItem
+from app.models.transcription_job import TranscriptionJob
+from app.models.transcription_cache import TranscriptionCacheEntry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
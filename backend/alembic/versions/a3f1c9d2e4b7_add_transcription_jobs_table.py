@@ -0,0 +1,48 @@
+"""Add transcription jobs table
+
+Revision ID: a3f1c9d2e4b7
+Revises: 6e679058b064
+Create Date: 2026-10-16 09:12:40.218351
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d2e4b7'
+down_revision: Union[str, Sequence[str], None] = '6e679058b064'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transcription_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('block_id', sa.String(), nullable=True),
+    sa.Column('provider', sa.String(), nullable=True),
+    sa.Column('state', sa.String(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('max_attempts', sa.Integer(), nullable=True),
+    sa.Column('lease_owner', sa.String(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['block_id'], ['transcription_blocks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transcription_jobs_id'), 'transcription_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_transcription_jobs_block_id'), 'transcription_jobs', ['block_id'], unique=False)
+    op.create_index(op.f('ix_transcription_jobs_state'), 'transcription_jobs', ['state'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transcription_jobs_state'), table_name='transcription_jobs')
+    op.drop_index(op.f('ix_transcription_jobs_block_id'), table_name='transcription_jobs')
+    op.drop_index(op.f('ix_transcription_jobs_id'), table_name='transcription_jobs')
+    op.drop_table('transcription_jobs')
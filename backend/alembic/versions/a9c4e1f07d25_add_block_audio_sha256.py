@@ -0,0 +1,28 @@
+"""Add audio sha256 column to blocks
+
+Revision ID: a9c4e1f07d25
+Revises: f6b2d8e41a73
+Create Date: 2026-10-17 12:40:51.904316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e1f07d25'
+down_revision: Union[str, Sequence[str], None] = 'f6b2d8e41a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transcription_blocks', sa.Column('audio_sha256', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transcription_blocks', 'audio_sha256')
@@ -0,0 +1,47 @@
+"""Add transcription cache table
+
+Revision ID: b82e4d17c5a9
+Revises: a3f1c9d2e4b7
+Create Date: 2026-10-16 11:47:05.603912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b82e4d17c5a9'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9d2e4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transcription_cache',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('audio_sha256', sa.String(), nullable=True),
+    sa.Column('provider', sa.String(), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('text', sa.Text(), nullable=True),
+    sa.Column('size_bytes', sa.Integer(), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_transcription_cache_key'), 'transcription_cache', ['key'], unique=False)
+    op.create_index(op.f('ix_transcription_cache_audio_sha256'), 'transcription_cache', ['audio_sha256'], unique=False)
+    op.create_index(op.f('ix_transcription_cache_last_used_at'), 'transcription_cache', ['last_used_at'], unique=False)
+    op.add_column('transcription_jobs', sa.Column('cache_hit', sa.Boolean(), server_default=sa.text('false'), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transcription_jobs', 'cache_hit')
+    op.drop_index(op.f('ix_transcription_cache_last_used_at'), table_name='transcription_cache')
+    op.drop_index(op.f('ix_transcription_cache_audio_sha256'), table_name='transcription_cache')
+    op.drop_index(op.f('ix_transcription_cache_key'), table_name='transcription_cache')
+    op.drop_table('transcription_cache')
@@ -0,0 +1,34 @@
+"""Add priority and batch id to transcription jobs
+
+Revision ID: d41a7b9e0c36
+Revises: b82e4d17c5a9
+Create Date: 2026-10-16 15:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7b9e0c36'
+down_revision: Union[str, Sequence[str], None] = 'b82e4d17c5a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transcription_jobs', sa.Column('priority', sa.Integer(), server_default=sa.text('10'), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('batch_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_transcription_jobs_priority'), 'transcription_jobs', ['priority'], unique=False)
+    op.create_index(op.f('ix_transcription_jobs_batch_id'), 'transcription_jobs', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transcription_jobs_batch_id'), table_name='transcription_jobs')
+    op.drop_index(op.f('ix_transcription_jobs_priority'), table_name='transcription_jobs')
+    op.drop_column('transcription_jobs', 'batch_id')
+    op.drop_column('transcription_jobs', 'priority')
@@ -0,0 +1,65 @@
+"""Add transcription status columns to blocks
+
+Revision ID: e5c83f2a9d14
+Revises: d41a7b9e0c36
+Create Date: 2026-10-17 09:21:37.540812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c83f2a9d14'
+down_revision: Union[str, Sequence[str], None] = 'd41a7b9e0c36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Progress texts the old pipeline stored in `text` while a block was queued / processing
+LEGACY_STATUS_PATTERNS = (
+    "(Transcription queued%",
+    "(Processing%",
+    "(Splitting audio%",
+    "(Retry %",
+    "(Connection Error%",
+    "(HTTP %",
+    "(Error:%",
+    "(% unavailable, switching to %",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transcription_blocks', sa.Column('status', sa.String(), nullable=True))
+    op.add_column('transcription_blocks', sa.Column('progress', sa.Float(), nullable=True))
+    op.add_column('transcription_blocks', sa.Column('status_message', sa.Text(), nullable=True))
+
+    # Move status strings that used to be stored in `text` into the new columns
+    op.execute(
+        "UPDATE transcription_blocks SET status = 'failed', status_message = TRIM(SUBSTR(text, 8)), text = NULL "
+        "WHERE text LIKE '[Error]%'"
+    )
+    # Only the placeholders the old code wrote; real transcripts in parentheses stay as they are
+    placeholders = " OR ".join(f"text LIKE '{pattern}'" for pattern in LEGACY_STATUS_PATTERNS)
+    op.execute(
+        "UPDATE transcription_blocks SET status = 'failed', "
+        "status_message = 'Transcription was interrupted. Please re-transcribe.', text = NULL "
+        f"WHERE type = 'audio' AND text LIKE '%)' AND ({placeholders})"
+    )
+    op.execute(
+        "UPDATE transcription_blocks SET status = 'completed', progress = 1.0 "
+        "WHERE type = 'audio' AND status IS NULL AND text IS NOT NULL AND text <> ''"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "UPDATE transcription_blocks SET text = '[Error] ' || COALESCE(status_message, 'Transcription failed') "
+        "WHERE status IN ('failed', 'cancelled') AND (text IS NULL OR text = '')"
+    )
+    op.drop_column('transcription_blocks', 'status_message')
+    op.drop_column('transcription_blocks', 'progress')
+    op.drop_column('transcription_blocks', 'status')
@@ -0,0 +1,37 @@
+"""Add audio metadata columns to blocks
+
+Revision ID: f6b2d8e41a73
+Revises: e5c83f2a9d14
+Create Date: 2026-10-17 11:02:14.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b2d8e41a73'
+down_revision: Union[str, Sequence[str], None] = 'e5c83f2a9d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing blocks are probed lazily the next time they are transcribed
+    op.add_column('transcription_blocks', sa.Column('duration_seconds', sa.Float(), nullable=True))
+    op.add_column('transcription_blocks', sa.Column('codec', sa.String(), nullable=True))
+    op.add_column('transcription_blocks', sa.Column('channels', sa.Integer(), nullable=True))
+    op.add_column('transcription_blocks', sa.Column('sample_rate', sa.Integer(), nullable=True))
+    op.add_column('transcription_blocks', sa.Column('byte_size', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transcription_blocks', 'byte_size')
+    op.drop_column('transcription_blocks', 'sample_rate')
+    op.drop_column('transcription_blocks', 'channels')
+    op.drop_column('transcription_blocks', 'codec')
+    op.drop_column('transcription_blocks', 'duration_seconds')
@@ -1,58 +1,63 @@
+import hashlib
 import os
-import shutil
 import uuid
 from datetime import datetime
+from typing import Optional
 from zoneinfo import ZoneInfo
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Header, Request, Response
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
-from app.db.base import get_db, SessionLocal
+from app.db.base import get_db
 from app.models.session import Session as SessionModel
-from app.models.transcription_block import TranscriptionBlock
+from app.models.transcription_block import TranscriptionBlock, STATUS_QUEUED, STATUS_FAILED
 from app.core.config import settings
-from app.services.transcription import transcribe_audio_task
+from app.services.transcription_queue import QueueFullError
+from app.services.transcription_jobs import check_capacity, enqueue_transcription
+from app.services.transcription_status import set_status
+from app.services.audio_processing import probe_audio, format_duration
+from app.services.resumable_upload import (
+    resumable_uploads, UploadNotFound, UploadOffsetMismatch, UploadTooLarge, UploadIncomplete, UploadChecksumMismatch
+)
+from app.schemas.audio import AudioUploadCreate, AudioUploadFinalize
 
 router = APIRouter()
 
 DATA_DIR = "/data"
 
-def run_background_transcription(block_id: str):
-    # Create a fresh DB session for the background task
-    db = SessionLocal()
-    try:
-        transcribe_audio_task(block_id, db)
-    finally:
-        db.close()
+def queue_full_exception(e: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Transcription queue is full. Please retry in {e.retry_after} seconds.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-@router.post("/upload")
-def upload_audio_file(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    session_id: str = Form(None), 
-    db: Session = Depends(get_db)
-):
+def _ensure_session(db: Session, session_id: Optional[str]) -> str:
+    """The given session, or a new "<date> MEMO" session."""
+    if session_id:
+        return session_id
     tz = ZoneInfo(settings.TIMEZONE)
-    
-    # Ensure session exists or create new
-    if not session_id:
-        today_str = datetime.now(tz).strftime("%Y-%m-%d %H:%M")
-        new_session = SessionModel(title=f"{today_str} MEMO")
-        db.add(new_session)
-        db.commit()
-        db.refresh(new_session)
-        session_id = new_session.id
-    
+    today_str = datetime.now(tz).strftime("%Y-%m-%d %H:%M")
+    new_session = SessionModel(title=f"{today_str} MEMO")
+    db.add(new_session)
+    db.commit()
+    db.refresh(new_session)
+    return new_session.id
+
+def _audio_path(session_id: str, file_ext: str) -> str:
     session_dir = os.path.join(DATA_DIR, session_id, "audio")
     os.makedirs(session_dir, exist_ok=True)
-    
-    file_ext = os.path.splitext(file.filename)[1]
-    if not file_ext:
-        file_ext = ".m4a" # default
-    
-    file_name = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(session_dir, file_name)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    return os.path.join(session_dir, f"{uuid.uuid4()}{file_ext or '.m4a'}")
+
+def _register_audio(db: Session, session_id: str, file_path: str, file_ext: str, audio_sha256: str) -> dict:
+    """Probe the stored file, append its audio block and queue the transcription."""
+    tz = ZoneInfo(settings.TIMEZONE)
+
+    # Probe once at ingest (metadata columns); uploads without an extension get their container's one
+    info = probe_audio(file_path)
+    if info and not file_ext and info.extension:
+        renamed = os.path.splitext(file_path)[0] + info.extension
+        os.replace(file_path, renamed)
+        file_path = renamed
         
     # Determine next order_index (same logic as sessions.py create_block)
     from sqlalchemy import func
@@ -66,15 +71,133 @@ def upload_audio_file(
         session_id=session_id,
         type="audio",
         file_path=file_path,
-        text="(Transcription queued...)" ,
+        audio_sha256=audio_sha256,
+        status=STATUS_QUEUED,
         timestamp=datetime.now(tz).strftime("%H:%M:%S"),
         order_index=next_order
     )
+    if info:
+        info.apply_to(block)
+        if info.duration:
+            block.duration = format_duration(info.duration)
     db.add(block)
     db.commit()
     db.refresh(block)
     
-    # Trigger background task
-    background_tasks.add_task(run_background_transcription, block.id)
+    # Persist the job; a worker (in-process or `python -m app.worker`) picks it up
+    try:
+        enqueue_transcription(db, block.id)
+    except QueueFullError as e:
+        # Lost the race for the last slot: keep the audio, let the user re-transcribe later
+        set_status(block, STATUS_FAILED, message="Transcription queue is full. Please re-transcribe later.")
+        db.commit()
+        raise queue_full_exception(e)
 
     return {"block_id": block.id, "session_id": session_id, "file_path": file_path}
+
+@router.post("/upload")
+def upload_audio_file(
+    file: UploadFile = File(...),
+    session_id: str = Form(None), 
+    db: Session = Depends(get_db)
+):
+    # Reject early (before storing anything) when the transcription queue is saturated
+    try:
+        check_capacity(db)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+    
+    session_id = _ensure_session(db, session_id)
+    file_ext = os.path.splitext(file.filename)[1]
+    file_path = _audio_path(session_id, file_ext)
+
+    # Hash while copying; the result cache keys on it without reading the file again
+    digest = hashlib.sha256()
+    with open(file_path, "wb") as buffer:
+        for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+            buffer.write(chunk)
+            digest.update(chunk)
+
+    return _register_audio(db, session_id, file_path, file_ext, digest.hexdigest())
+
+# --- Resumable uploads: create -> PATCH chunks at offsets -> finalize ---
+
+def _upload_not_found(e: UploadNotFound) -> HTTPException:
+    return HTTPException(status_code=404, detail=str(e))
+
+def _offset_headers(offset: int) -> dict:
+    return {"Upload-Offset": str(offset)}
+
+@router.post("/uploads")
+def create_upload(upload_in: AudioUploadCreate, db: Session = Depends(get_db)):
+    """Start a resumable upload. Send the bytes with PATCH, then call finalize."""
+    try:
+        check_capacity(db)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+    try:
+        upload = resumable_uploads.create(upload_in.filename, upload_in.size, upload_in.session_id)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {**upload, "chunk_size": settings.UPLOAD_CHUNK_SIZE}
+
+@router.get("/uploads/{upload_id}")
+def get_upload(upload_id: str, response: Response):
+    """Bytes received so far; resume the PATCHes from `offset`."""
+    try:
+        upload = resumable_uploads.status(upload_id)
+    except UploadNotFound as e:
+        raise _upload_not_found(e)
+    response.headers.update(_offset_headers(upload["offset"]))
+    return upload
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, response: Response,
+                        upload_offset: int = Header(..., alias="Upload-Offset")):
+    """
+    Append the raw request body at `Upload-Offset`. Bytes received before a
+    dropped connection are kept; on 409 resume from the returned offset.
+    """
+    try:
+        offset = await resumable_uploads.append(upload_id, upload_offset, request.stream())
+    except UploadNotFound as e:
+        raise _upload_not_found(e)
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.offset},
+                            headers=_offset_headers(e.offset))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ClientDisconnect:
+        print(f"[Upload] Client disconnected during upload {upload_id}; received bytes are kept")
+        return Response(status_code=400)
+    response.headers.update(_offset_headers(offset))
+    return {"id": upload_id, "offset": offset}
+
+@router.post("/uploads/{upload_id}/finalize")
+def finalize_upload(upload_id: str, finalize_in: Optional[AudioUploadFinalize] = None, db: Session = Depends(get_db)):
+    """
+    Store the finished file as an audio block of the session and queue its transcription.
+    On a sha256 mismatch (422) the upload is kept; retry finalize or DELETE it.
+    """
+    try:
+        upload = resumable_uploads.status(upload_id)
+        resumable_uploads.verify(upload_id, finalize_in.sha256 if finalize_in else None)
+        session_id = _ensure_session(db, upload.get("session_id"))
+        file_ext = os.path.splitext(upload["filename"])[1]
+        file_path, audio_sha256, _ = resumable_uploads.complete(upload_id, _audio_path(session_id, file_ext))
+    except UploadNotFound as e:
+        raise _upload_not_found(e)
+    except UploadIncomplete as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.offset},
+                            headers=_offset_headers(e.offset))
+    except UploadChecksumMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {**_register_audio(db, session_id, file_path, file_ext, audio_sha256), "sha256": audio_sha256}
+
+@router.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str):
+    try:
+        resumable_uploads.abort(upload_id)
+    except UploadNotFound as e:
+        raise _upload_not_found(e)
+    return {"ok": True}
@@ -16,6 +16,7 @@ from sqlalchemy import and_
 from app.db.base import get_db
 from app.models.session import Session as SessionModel
 from app.models.transcription_block import TranscriptionBlock
+from app.services.audio_processing import derived_audio_paths
 
 router = APIRouter()
 
@@ -94,6 +95,12 @@ def export_data(req: ExportRequest, db: Session = Depends(get_db)):
                 "file_path": b.file_path,
                 "timestamp": b.timestamp,
                 "duration": b.duration,
+                "duration_seconds": b.duration_seconds,
+                "codec": b.codec,
+                "channels": b.channels,
+                "sample_rate": b.sample_rate,
+                "byte_size": b.byte_size,
+                "audio_sha256": b.audio_sha256,
                 "is_checked": b.is_checked,
                 "created_at": b.created_at.isoformat()
             }
@@ -312,6 +319,12 @@ def execute_import(req: ImportExecuteRequest, db: Session = Depends(get_db)):
                             file_path=restored_path,
                             timestamp=b.get("timestamp"),
                             duration=b.get("duration"),
+                            duration_seconds=b.get("duration_seconds"),
+                            codec=b.get("codec"),
+                            channels=b.get("channels"),
+                            sample_rate=b.get("sample_rate"),
+                            byte_size=b.get("byte_size"),
+                            audio_sha256=b.get("audio_sha256"),
                             is_checked=b.get("is_checked", True),
                             created_at=datetime.fromisoformat(b["created_at"])
                         )
@@ -357,6 +370,8 @@ def archive_data(start_date: str, end_date: str, db: Session = Depends(get_db)):
                 if block.file_path and os.path.exists(block.file_path):
                     try:
                         os.remove(block.file_path)
+                        for derived in derived_audio_paths(block.file_path):
+                            os.remove(derived)
                     except OSError:
                         pass 
             
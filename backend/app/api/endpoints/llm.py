@@ -1,10 +1,16 @@
+import asyncio
 import json
+from typing import Any, AsyncIterator, Awaitable, Callable
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from openai import OpenAI
 from app.core.config import settings
-from app.services.openai_factory import get_openai_client
+from app.services.openai_factory import get_async_openai_client
+from app.services.rate_limiter import backoff_delay, provider_limits
+from app.services.circuit_breaker import (
+    provider_call_async, failover_candidates, next_provider, breakers, CircuitOpenError
+)
 from app.services.settings_file import settings_service
 
 router = APIRouter()
@@ -14,52 +20,85 @@ class ChatRequest(BaseModel):
     model: str = "gpt-4o"
     temperature: float = 0.7
 
-@router.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
-    # Determine Provider & Model
+def _llm_provider() -> str:
+    """Configured LLM provider (settings.yaml overrides config)."""
     provider = settings.LLM_PROVIDER
-    model_to_use = request.model
-    
-    # Check dynamic settings
     try:
-        from app.services.settings_file import settings_service
         user_settings = settings_service.get_general_settings()
         if user_settings.get("llm_provider"):
             provider = user_settings.get("llm_provider")
-        
-        # Override model if requested or defaulted
-        if provider == "gemini":
-            model_to_use = settings.LLM_GEMINI_MODEL
-            if user_settings.get("llm_gemini_model"):
-                model_to_use = user_settings.get("llm_gemini_model")
-        elif provider == "azure":
-            model_to_use = settings.LLM_AZURE_DEPLOYMENT
     except: pass
+    return provider
 
-    # Gemini Logic
+def _llm_model(provider: str, requested_model: str) -> str:
+    """Model / deployment to use for `provider` (Gemini and Azure ignore the requested model)."""
     if provider == "gemini":
-        from app.services.gemini_service import gemini_service
-        async def gemini_generator():
+        try:
+            user_settings = settings_service.get_general_settings()
+            if user_settings.get("llm_gemini_model"):
+                return user_settings.get("llm_gemini_model")
+        except: pass
+        return settings.LLM_GEMINI_MODEL
+    if provider == "azure":
+        return settings.LLM_AZURE_DEPLOYMENT
+    return requested_model
+
+_STREAM_END = object()
+
+async def _open_stream(provider: str, open_stream: Callable[[], Awaitable[Any]]) -> AsyncIterator[Any]:
+    """
+    Open a stream and wait for its first chunk inside the provider's limiter
+    slot (pace starts, honour Retry-After), then release the slot: a long
+    generation doesn't hold up other requests. The breaker covers the whole
+    stream, so a provider that keeps breaking mid-answer still trips it.
+    Returns all chunks; aclose() them when done (this also closes the stream).
+    """
+    breaker = breakers.get("llm", provider)
+    breaker.before_call()
+    try:
+        async with provider_limits.get("llm", provider).slot_async():
+            stream = await open_stream()
+            chunks = stream.__aiter__()
             try:
-                yield f"data: {json.dumps({'type': 'status', 'message': '(Connecting to Gemini...)'})}\n\n"
-                
-                # Use thread pool for sync generator in async? or just iterate
-                # StreamingResponse takes async generator or sync iterator.
-                # Our service is sync generator.
-                for chunk in gemini_service.stream_chat(request.messages, model_name=model_to_use):
-                     yield f"data: {json.dumps({'content': chunk})}\n\n"
-                
-                yield "data: [DONE]\n\n"
-            except Exception as e:
-                yield f"data: {json.dumps({'type': 'error', 'message': f'Gemini Error: {str(e)}'})}\n\n"
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = _STREAM_END
+            except BaseException:
+                await _close_stream(stream)
+                raise
+    except BaseException as e:
+        breaker.record_failure(e)
+        raise
+    return _rest_of_stream(breaker, stream, first, chunks)
 
-        return StreamingResponse(gemini_generator(), media_type="text/event-stream")
+async def _rest_of_stream(breaker, stream, first, chunks: AsyncIterator[Any]):
+    try:
+        if first is not _STREAM_END:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+    except BaseException as e:
+        # Client disconnects (GeneratorExit / cancellation) only release a half-open probe
+        breaker.record_failure(e)
+        raise
+    else:
+        breaker.record_success()
+    finally:
+        await _close_stream(stream)
+
+async def _close_stream(stream):
+    # Async generators (Gemini) have aclose(); AsyncStream has close() (aclose() only in newer SDKs)
+    close = getattr(stream, "aclose", None) or stream.close
+    try:
+        await close()
+    except Exception:
+        pass
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    # Providers in failover order (llm_failover in settings.yaml), open breakers last
+    candidates = failover_candidates("llm", _llm_provider())
 
-    # OpenAI / Azure Logic
-    client = get_openai_client("llm")
-    
-    # Prepare OpenAI stream
-    import asyncio
     from openai import APIStatusError, APIConnectionError
 
     async def event_generator():
@@ -67,62 +106,107 @@ async def chat_stream(request: ChatRequest):
         
         # Manual retry settings
         max_retries = settings.LLM_MAX_RETRIES
-        retry_delay = 1.0
-        base_url = str(client.base_url)
+        provider = candidates[0]
+        attempt = 0
+        # Once part of an answer has gone out, a retry or failover would restart or splice it
+        content_sent = False
 
-        for attempt in range(max_retries + 1):
+        while True:
+            model_to_use = _llm_model(provider, request.model)
+            base_url = "Gemini"
             try:
-                # Notify frontend of start/retry
-                if attempt == 0:
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'(Connecting to {base_url}...)'})}\n\n"
+                if provider == "gemini":
+                    from app.services.gemini_service import gemini_service
+                    if attempt == 0:
+                        yield f"data: {json.dumps({'type': 'status', 'message': '(Connecting to Gemini...)'})}\n\n"
+                    else:
+                        yield f"data: {json.dumps({'type': 'status', 'message': f'(Retry {attempt}/{max_retries} to Gemini...)'})}\n\n"
+
+                    # The blocking SDK stream runs on a thread, the loop only awaits its chunks
+                    async def open_gemini():
+                        return gemini_service.stream_chat_async(target_messages, model_name=model_to_use)
+                    chunks = await _open_stream("gemini", open_gemini)
+                    try:
+                        async for chunk in chunks:
+                            content_sent = content_sent or bool(chunk)
+                            yield f"data: {json.dumps({'content': chunk})}\n\n"
+                    finally:
+                        await chunks.aclose()
                 else:
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'(Retry {attempt}/{max_retries} to {base_url}...)'})}\n\n"
-
-                stream = client.chat.completions.create(
-                    model=model_to_use,
-                    messages=target_messages,
-                    temperature=request.temperature,
-                    stream=True,
-                    # timeout handled by client strict settings but wrapped here
-                )
-                
-                # If successful, yield chunks
-                for chunk in stream:
-                    if chunk.choices and chunk.choices[0].delta.content is not None:
-                        content = chunk.choices[0].delta.content
-                        yield f"data: {json.dumps({'content': content})}\n\n"
+                    # OpenAI / Azure Logic (async client: other requests keep running while tokens arrive)
+                    client = get_async_openai_client("llm", provider)
+                    base_url = str(client.base_url)
+
+                    # Notify frontend of start/retry
+                    if attempt == 0:
+                        yield f"data: {json.dumps({'type': 'status', 'message': f'(Connecting to {base_url}...)'})}\n\n"
+                    else:
+                        yield f"data: {json.dumps({'type': 'status', 'message': f'(Retry {attempt}/{max_retries} to {base_url}...)'})}\n\n"
+
+                    chunks = await _open_stream(provider, lambda: client.chat.completions.create(
+                        model=model_to_use,
+                        messages=target_messages,
+                        temperature=request.temperature,
+                        stream=True,
+                        # timeout handled by client strict settings but wrapped here
+                    ))
+
+                    # If successful, yield chunks
+                    try:
+                        async for chunk in chunks:
+                            if chunk.choices and chunk.choices[0].delta.content is not None:
+                                content = chunk.choices[0].delta.content
+                                content_sent = content_sent or bool(content)
+                                yield f"data: {json.dumps({'content': content})}\n\n"
+                    finally:
+                        await chunks.aclose()
                 
                 yield "data: [DONE]\n\n"
                 return # Success, exit loop
 
-            except APIConnectionError as e:
-                print(f"LLM Connection Error (Attempt {attempt+1}): {e}")
-                if attempt < max_retries:
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'(Connection Error: Retrying {attempt+1}/{max_retries}...)'})}\n\n"
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    yield f"data: {json.dumps({'type': 'error', 'message': f'Connection Failed: Could not connect to {base_url}'})}\n\n"
+            except Exception as e:
+                print(f"LLM {provider} failed (Attempt {attempt+1}): {e}")
+
+                if content_sent:
+                    # The client already shows a partial answer: end it with an error instead
+                    yield f"data: {json.dumps({'type': 'error', 'message': f'Stream interrupted: {str(e)}'})}\n\n"
                     return
 
-            except APIStatusError as e:
-                error_code = e.status_code
+                # Provider is down: switch to the next healthy one instead of retrying it
+                if not breakers.get("llm", provider).available():
+                    fallback = next_provider("llm", candidates, provider)
+                    if fallback:
+                        yield f"data: {json.dumps({'type': 'status', 'message': f'({provider} unavailable, switching to {fallback}...)'})}\n\n"
+                        provider = fallback
+                        attempt = 0
+                        continue
+                    if isinstance(e, CircuitOpenError):
+                        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                        return
+
                 if attempt < max_retries:
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'(HTTP {error_code}: Retrying {attempt+1}/{max_retries}...)'})}\n\n"
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2
+                    if isinstance(e, APIConnectionError):
+                        message = f'(Connection Error: Retrying {attempt+1}/{max_retries}...)'
+                    elif isinstance(e, APIStatusError):
+                        message = f'(HTTP {e.status_code}: Retrying {attempt+1}/{max_retries}...)'
+                    else:
+                        message = f'(Error: {str(e)}... Retrying {attempt+1}/{max_retries})'
+                    yield f"data: {json.dumps({'type': 'status', 'message': message})}\n\n"
+                    await asyncio.sleep(backoff_delay(attempt, e))
+                    attempt += 1
+                    continue
+
+                # Final error
+                if provider == "gemini":
+                    message = f'Gemini Error: {str(e)}'
+                elif isinstance(e, APIConnectionError):
+                    message = f'Connection Failed: Could not connect to {base_url}'
+                elif isinstance(e, APIStatusError):
+                    message = f'HTTP {e.status_code}: {e.message}'
                 else:
-                    # Final error
-                    yield f"data: {json.dumps({'type': 'error', 'message': f'HTTP {error_code}: {e.message}'})}\n\n"
-                    return
-            except Exception as e:
-                 if attempt < max_retries:
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'(Error: {str(e)}... Retrying {attempt+1}/{max_retries})'})}\n\n"
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2
-                 else:
-                    yield f"data: {json.dumps({'type': 'error', 'message': f'Error: {str(e)}'})}\n\n"
-                    return
+                    message = f'Error: {str(e)}'
+                yield f"data: {json.dumps({'type': 'error', 'message': message})}\n\n"
+                return
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -132,24 +216,9 @@ class TitleGenerationRequest(BaseModel):
 
 @router.post("/generate_title")
 async def generate_title(request: TitleGenerationRequest):
-    # Determine Provider
-    provider = settings.LLM_PROVIDER
-    model_to_use = request.model
-    
-    # Dynamic settings check
-    try:
-        from app.services.settings_file import settings_service
-        user_settings = settings_service.get_general_settings()
-        if user_settings.get("llm_provider"):
-            provider = user_settings.get("llm_provider")
-        
-        if provider == "gemini":
-            model_to_use = settings.LLM_GEMINI_MODEL
-            if user_settings.get("llm_gemini_model"):
-                model_to_use = user_settings.get("llm_gemini_model")
-        elif provider == "azure":
-             model_to_use = settings.LLM_AZURE_DEPLOYMENT
-    except: pass
+    # First healthy provider in failover order
+    provider = failover_candidates("llm", _llm_provider())[0]
+    model_to_use = _llm_model(provider, request.model)
     
     # Gemini Logic
     if provider == "gemini":
@@ -161,23 +230,25 @@ async def generate_title(request: TitleGenerationRequest):
                  {"role": "system", "content": sys_prompt},
                  {"role": "user", "content": f"Text: {request.text[:1000]}..."}
              ]
-             title = gemini_service.complete_chat(messages, model_name=model_to_use)
+             async with provider_call_async("llm", "gemini"):
+                 title = await asyncio.to_thread(gemini_service.complete_chat, messages, model_name=model_to_use)
              return {"title": title.strip()}
         except Exception as e:
              raise HTTPException(status_code=500, detail=str(e))
 
-    client = get_openai_client("llm")
+    client = get_async_openai_client("llm", provider)
     
     try:
-        completion = client.chat.completions.create(
-            model=model_to_use,
-            messages=[
-                {"role": "system", "content": settings_service.get_system_prompt("title_summary") or "You are a helpful assistant. Generate a concise title (max 20 characters) for the given text. The title should be in Japanese and summarize the main topic. do not include quotation marks."},
-                {"role": "user", "content": f"Text: {request.text[:1000]}..."} # Limit input length
-            ],
-            temperature=0.5,
-            max_tokens=60,
-        )
+        async with provider_call_async("llm", provider):
+            completion = await client.chat.completions.create(
+                model=model_to_use,
+                messages=[
+                    {"role": "system", "content": settings_service.get_system_prompt("title_summary") or "You are a helpful assistant. Generate a concise title (max 20 characters) for the given text. The title should be in Japanese and summarize the main topic. do not include quotation marks."},
+                    {"role": "user", "content": f"Text: {request.text[:1000]}..."} # Limit input length
+                ],
+                temperature=0.5,
+                max_tokens=60,
+            )
         title = completion.choices[0].message.content.strip()
         return {"title": title}
     except Exception as e:
@@ -10,6 +10,8 @@ from app.models.transcription_block import TranscriptionBlock as BlockModel
 from app.schemas import session as session_schema
 from app.schemas import transcription_block as block_schema
 from app.api.endpoints.websocket import broadcast_event
+from app.services.audio_processing import derived_audio_paths
+from app.services.transcription_jobs import cancel_transcription
 
 router = APIRouter()
 
@@ -107,6 +109,8 @@ async def delete_session(session_id: str, db: DBSession = Depends(get_db)):
     
     db_session.is_deleted = True
     db.commit()
+    # Stop queued/running transcriptions of the session's blocks
+    cancel_transcription(db, [block.id for block in db_session.blocks])
     await run_broadcast("session_deleted", {"session_id": session_id})
     return {"ok": True}
 
@@ -136,6 +140,7 @@ def empty_session_trash(db: DBSession = Depends(get_db)):
     for session in deleted_sessions:
         # 1. Delete associated files (blocks)
         blocks = db.query(BlockModel).filter(BlockModel.session_id == session.id).all()
+        cancel_transcription(db, [block.id for block in blocks])
         for block in blocks:
              if block.file_path:
                 try:
@@ -143,6 +148,8 @@ def empty_session_trash(db: DBSession = Depends(get_db)):
                     if file_path.exists() and file_path.is_file():
                         os.remove(file_path)
                         print(f"Deleted file: {file_path}")
+                    for derived in derived_audio_paths(block.file_path):
+                        os.remove(derived)
                 except Exception as e:
                     print(f"Error deleting file {block.file_path}: {e}")
         
@@ -155,6 +162,24 @@ def empty_session_trash(db: DBSession = Depends(get_db)):
     db.commit()
     return {"ok": True, "deleted_count": count}
 
+@router.post("/{session_id}/transcribe")
+async def transcribe_session(session_id: str, db: DBSession = Depends(get_db)):
+    """
+    Re-transcribe every audio block of the session as one low-priority batch.
+    """
+    from app.api.endpoints.stt import queue_batch_transcription
+
+    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    blocks = db.query(BlockModel).filter(
+        BlockModel.session_id == session_id,
+        BlockModel.type == "audio",
+        BlockModel.is_deleted == False
+    ).order_by(BlockModel.order_index).all()
+    return await queue_batch_transcription(db, blocks)
+
 # --- Block Operations ---
 
 @router.get("/{session_id}/blocks", response_model=List[block_schema.TranscriptionBlock])
@@ -268,6 +293,7 @@ def delete_block(block_id: str, db: DBSession = Depends(get_db)):
     db_block.is_deleted = True
     
     db.commit()
+    cancel_transcription(db, [block_id])
     return {"ok": True}
 
 @router.post("/blocks/{block_id}/restore", response_model=block_schema.TranscriptionBlock)
@@ -299,6 +325,8 @@ def empty_trash(session_id: str, db: DBSession = Depends(get_db)):
     if not deleted_blocks:
           return {"ok": True, "deleted_count": 0}
 
+    cancel_transcription(db, [block.id for block in deleted_blocks])
+
     import os
     from pathlib import Path
     
@@ -312,6 +340,8 @@ def empty_trash(session_id: str, db: DBSession = Depends(get_db)):
                 if file_path.exists() and file_path.is_file():
                     os.remove(file_path)
                     print(f"Deleted block file: {file_path}")
+                for derived in derived_audio_paths(block.file_path):
+                    os.remove(derived)
             except Exception as e:
                 print(f"Error deleting block file {block.file_path}: {e}")
         
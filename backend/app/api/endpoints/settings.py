@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Body
 from typing import Dict, Any
 from app.services.settings_file import settings_service
+from app.services.openai_factory import client_registry
 from app.schemas import settings as settings_schema
 from app.core.config import settings as app_settings
 from openai import OpenAI, AzureOpenAI
@@ -17,6 +18,8 @@ def get_settings():
 @router.patch("/")
 def update_settings(settings: Dict[str, Any]):
     updated = settings_service.update_general_settings(settings)
+    # Provider, endpoint or key may have changed: rebuild the shared clients on next use
+    client_registry.invalidate()
     # Reconfigure logging if debug_mode changed
     configure_logging(updated.get("debug_mode", False))
     return updated
@@ -1,40 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.db.base import get_db, SessionLocal
+from app.db.base import get_db
+from app.core.config import settings
 from app.models.transcription_block import TranscriptionBlock
-from app.services.transcription import transcribe_audio_task
+from app.schemas.transcription_block import TranscriptionBatchRequest
+from app.services.transcription_queue import transcription_queue, QueueFullError
+from app.services.transcription_jobs import (
+    enqueue_transcription, enqueue_batch, batch_progress, cancel_transcription, job_counts
+)
+from app.services.transcription_cache import transcription_cache
 from app.api.endpoints.websocket import broadcast_event
-import asyncio
+from app.api.endpoints.audio import queue_full_exception
 
 router = APIRouter()
 
-def run_background_transcription(block_id: str):
-    # Create a fresh DB session for the background task
-    db = SessionLocal()
-    try:
-        transcribe_audio_task(block_id, db)
-    finally:
-        db.close()
-    
-    # Broadcast completion (run in new event loop since we're in a thread)
-    try:
-        block = None
-        with SessionLocal() as db2:
-            block = db2.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
-            if block:
-                session_id = block.session_id
-        if session_id:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(broadcast_event("block_updated", {"session_id": session_id, "block_id": block_id}))
-            loop.close()
-    except Exception as e:
-        print(f"[Broadcast] Error after transcription: {e}")
-
 @router.post("/transcribe/{block_id}")
 async def transcribe_audio(
     block_id: str,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
@@ -42,15 +25,107 @@ async def transcribe_audio(
         raise HTTPException(status_code=404, detail="Block not found")
     
     session_id = block.session_id
-    
-    # Trigger background task
-    background_tasks.add_task(run_background_transcription, block_id)
-    
-    # Update status immediately
-    block.text = "(Transcription queued...)"
-    db.commit()
+
+    # Marks the block as queued only if a new job is created; an active job (maybe running) is reused
+    try:
+        job = enqueue_transcription(db, block_id)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     
     # Broadcast that block is now processing
     await broadcast_event("block_updated", {"session_id": session_id, "block_id": block_id})
 
-    return {"status": "queued", "block_id": block_id}
+    return {"status": job.state, "block_id": block_id}
+
+@router.delete("/transcribe/{block_id}")
+async def cancel_block_transcription(
+    block_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a queued or running transcription. A running one stops at its next
+    checkpoint (before the next provider call, segment upload or retry).
+    """
+    block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
+    if not block:
+        raise HTTPException(status_code=404, detail="Block not found")
+
+    if not cancel_transcription(db, [block_id]):
+        raise HTTPException(status_code=409, detail="No transcription in progress for this block")
+
+    await broadcast_event("block_updated", {"session_id": block.session_id, "block_id": block_id})
+    return {"status": "cancelled", "block_id": block_id}
+
+async def queue_batch_transcription(db: Session, blocks: List[TranscriptionBlock]) -> dict:
+    """
+    Enqueue audio blocks as one low-priority batch (session-wide or multi-block re-transcription).
+    Single-block requests keep their own higher-priority lane.
+    """
+    block_ids = [b.id for b in blocks if b.type == "audio" and b.file_path and not b.is_deleted]
+    if not block_ids:
+        raise HTTPException(status_code=400, detail="No audio blocks to transcribe")
+    session_ids = {b.session_id for b in blocks if b.id in block_ids}
+
+    try:
+        batch_id, jobs = enqueue_batch(db, block_ids)
+    except QueueFullError as e:
+        db.rollback()
+        raise queue_full_exception(e)
+
+    for session_id in session_ids:
+        await broadcast_event("block_updated", {"session_id": session_id})
+
+    return {
+        "status": "queued",
+        "batch_id": batch_id if jobs else None,
+        "queued": len(jobs),
+        "already_active": len(block_ids) - len(jobs),
+        "block_ids": [job.block_id for job in jobs],
+    }
+
+@router.post("/transcribe")
+async def transcribe_blocks(
+    request: TranscriptionBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Re-transcribe several blocks as one batch. Progress: GET /api/stt/batches/{batch_id}
+    (also pushed as `batch_progress` WebSocket events).
+    """
+    blocks = db.query(TranscriptionBlock).filter(TranscriptionBlock.id.in_(request.block_ids)).all()
+    if not blocks:
+        raise HTTPException(status_code=404, detail="Blocks not found")
+    return await queue_batch_transcription(db, blocks)
+
+@router.get("/batches/{batch_id}")
+def get_batch_progress(batch_id: str, db: Session = Depends(get_db)):
+    """
+    Aggregate progress of a batch: job counts per state, completed fraction and `done`.
+    """
+    progress = batch_progress(db, batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+@router.get("/queue")
+def get_queue_status(db: Session = Depends(get_db)):
+    """
+    Transcription queue depth: durable job counts plus this process's provider lanes.
+    """
+    from app.services.async_transcription import async_engine
+    stats = transcription_queue.stats()
+    stats["engine"] = settings.STT_ENGINE
+    stats["async"] = async_engine.stats()
+    stats["jobs"] = job_counts(db)
+    return stats
+
+@router.get("/cache")
+def get_cache_status(db: Session = Depends(get_db)):
+    """
+    Transcription result cache counters (hits/misses since process start) and size,
+    plus the Gemini uploaded-file cache of this process.
+    """
+    from app.services.gemini_service import gemini_service
+    stats = transcription_cache.stats(db)
+    stats["gemini_files"] = gemini_service.files.stats()
+    return stats
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from app.core.config import settings
 
 router = APIRouter()
@@ -29,3 +29,60 @@ def get_system_config():
              "timeout": settings.LLM_TIMEOUT
         }
     }
+
+@router.get("/rate_limits")
+def get_rate_limits():
+    """
+    Shared provider limiter state (token bucket, AIMD concurrency window,
+    Retry-After pauses) for every STT/LLM provider used since startup.
+    """
+    from app.services.rate_limiter import provider_limits
+    return provider_limits.stats()
+
+@router.get("/loop_lag")
+def get_loop_lag(reset: bool = False):
+    """
+    Event loop lag of the API process (how late the loop wakes up).
+    `reset=true` starts a new measurement window after returning the current one.
+    """
+    from app.services.loop_monitor import loop_monitor
+    stats = loop_monitor.stats()
+    if reset:
+        loop_monitor.reset()
+    return stats
+
+@router.get("/settings_cache")
+def get_settings_cache():
+    """
+    In-memory settings.yaml cache: how often the file was really reloaded
+    versus served from memory.
+    """
+    from app.services.settings_file import settings_service
+    return settings_service.stats()
+
+@router.get("/breakers")
+def get_breakers():
+    """
+    Circuit breaker state per STT/LLM provider (closed / open / half_open),
+    plus the failover order that would be used right now.
+    """
+    from app.services.circuit_breaker import breakers, failover_candidates
+    from app.services.transcription_queue import get_stt_provider
+    from app.api.endpoints.llm import _llm_provider
+    return {
+        "breakers": breakers.stats(),
+        "failover": {
+            "stt": failover_candidates("stt", get_stt_provider()),
+            "llm": failover_candidates("llm", _llm_provider()),
+        },
+    }
+
+@router.post("/breakers/{kind}/{provider}/reset")
+def reset_breaker(kind: str, provider: str):
+    """Close a breaker manually (e.g. after fixing credentials)."""
+    if kind not in ("stt", "llm"):
+        raise HTTPException(status_code=400, detail="kind must be 'stt' or 'llm'")
+    from app.services.circuit_breaker import breakers
+    breaker = breakers.get(kind, provider)
+    breaker.reset()
+    return breaker.stats()
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session as DBSession
 from typing import List
 import uuid
 
-from app.schemas.settings import VocabularyItem as VocabularyItemSchema, VocabularyItemCreate, VocabularyItemUpdate
+from app.db.base import get_db
+from app.schemas.settings import (
+    VocabularyItem as VocabularyItemSchema, VocabularyItemCreate, VocabularyItemUpdate, VocabularyApplyRequest
+)
 from app.services.settings_file import settings_service
+from app.services.vocabulary_correction import apply_to_sessions
 
 router = APIRouter()
 
@@ -22,6 +27,19 @@ def create_vocabulary_item(item: VocabularyItemCreate):
     settings_service.add_vocabulary_item(new_item)
     return new_item
 
+@router.post("/apply")
+def apply_vocabulary(request: VocabularyApplyRequest, db: DBSession = Depends(get_db)):
+    """
+    Run the vocabulary correction (reading -> word) over existing transcripts,
+    in the given sessions or in every session. `dry_run` only counts.
+    """
+    result = apply_to_sessions(db, settings_service.get_vocabulary(), request.session_ids, request.dry_run)
+    if not request.dry_run and result["session_ids"]:
+        from app.api.endpoints.websocket import broadcast_event_threadsafe
+        for session_id in result["session_ids"]:
+            broadcast_event_threadsafe("block_updated", {"session_id": session_id})
+    return {"ok": True, **result}
+
 @router.put("/{item_id}", response_model=VocabularyItemSchema)
 def update_vocabulary_item(item_id: str, item: VocabularyItemUpdate):
     updates = {}
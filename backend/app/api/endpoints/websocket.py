@@ -2,7 +2,8 @@
 WebSocket endpoint for real-time synchronization between clients.
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import json
 
 router = APIRouter()
@@ -13,9 +14,12 @@ class ConnectionManager:
     
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Event loop serving the sockets, so worker threads can schedule sends on it
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
+        self.loop = asyncio.get_running_loop()
         self.active_connections.append(websocket)
     
     def disconnect(self, websocket: WebSocket):
@@ -51,6 +55,59 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
+@router.websocket("/ws/stt/{session_id}")
+async def streaming_stt_endpoint(websocket: WebSocket, session_id: str, sample_rate: Optional[int] = None):
+    """
+    Live transcription for a session (`/ws/stt/{session_id}?sample_rate=16000`).
+
+    Client -> server:
+        binary frames: 16-bit little-endian mono PCM at `sample_rate`
+        {"type": "stop"}   flush and close after the last transcript
+    Server -> client:
+        {"type": "ready", "sample_rate": ...}
+        {"type": "utterance", "block_id": ..., "duration": ...}   block created, transcribing
+        {"type": "transcript", "block_id": ..., "text": ..., "status": ..., "message": ...}
+        {"type": "done", "utterances": n}
+    """
+    from app.core.config import settings
+    from app.services.streaming_stt import StreamingTranscription, session_exists, MIN_SAMPLE_RATE, MAX_SAMPLE_RATE
+
+    await websocket.accept()
+    if not settings.STT_STREAM_ENABLED:
+        await websocket.close(code=4403, reason="Streaming transcription is disabled")
+        return
+    if sample_rate is not None and not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        await websocket.close(code=1008, reason=f"sample_rate must be between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE}")
+        return
+    if not await asyncio.to_thread(session_exists, session_id):
+        await websocket.close(code=4404, reason="Session not found")
+        return
+
+    stream = StreamingTranscription(session_id, send=websocket.send_json, sample_rate=sample_rate)
+    await websocket.send_json({"type": "ready", "sample_rate": stream.sample_rate})
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                await stream.feed(message["bytes"])
+                continue
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                continue
+            if control.get("type") == "stop":
+                await stream.finish()
+                await websocket.send_json({"type": "done", "utterances": stream.utterances})
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    # Client dropped mid-recording: keep what was said so far
+    await stream.finish()
+
+
 async def broadcast_event(event_type: str, payload: Dict[str, Any] = None):
     """
     Broadcast an event to all connected clients.
@@ -66,3 +123,18 @@ async def broadcast_event(event_type: str, payload: Dict[str, Any] = None):
         "payload": payload or {}
     }
     await manager.broadcast(message)
+
+
+def broadcast_event_threadsafe(event_type: str, payload: Dict[str, Any] = None):
+    """
+    Broadcast from a worker thread (no running event loop).
+    Schedules the send on the loop that owns the sockets; fire-and-forget.
+    """
+    loop = manager.loop
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(broadcast_event(event_type, payload), loop)
+        return
+    # No client has connected yet (or loop stopped): nothing to deliver to
+    if not manager.active_connections:
+        return
+    asyncio.run(broadcast_event(event_type, payload))
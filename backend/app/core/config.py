@@ -11,8 +11,8 @@ def _decrypt_value(value: str) -> str:
         return value
     if value.startswith("ENC:"):
         try:
-            from app.services.crypto import decrypt
-            return decrypt(value)
+            from app.services.crypto import secret_vault
+            return secret_vault.decrypt(value)
         except Exception as e:
             print(f"[Config] WARNING: Failed to decrypt value: {e}")
     return value
@@ -39,6 +39,60 @@ class Settings(BaseSettings):
     STT_AZURE_API_VERSION: str = "2024-06-01"
     STT_TIMEOUT: float = 60.0
     STT_MAX_RETRIES: int = 3
+    # Transcription worker pool (per-provider concurrency, bounded queue)
+    STT_CONCURRENCY: dict = {"openai": 4, "azure": 4, "gemini": 2}
+    STT_QUEUE_SIZE: int = 100
+    STT_QUEUE_RETRY_AFTER: int = 30
+    # Bulk (batch) jobs: own queue limit, and worker slots per provider kept free for single-block jobs
+    STT_BATCH_QUEUE_SIZE: int = 1000
+    STT_INTERACTIVE_RESERVE: int = 1
+    # Durable job queue: "inline" runs workers inside the API, "external" leaves them to `python -m app.worker`
+    STT_WORKER_MODE: str = "inline"
+    STT_JOB_LEASE: float = 300.0
+    STT_JOB_MAX_ATTEMPTS: int = 3
+    STT_WORKER_POLL_INTERVAL: float = 2.0
+    # Long recordings are split at silences and segments transcribed concurrently
+    STT_CHUNK_ENABLED: bool = True
+    STT_CHUNK_THRESHOLD: float = 300.0  # seconds; longer files are chunked
+    STT_CHUNK_MAX_BYTES: int = 24 * 1024 * 1024  # Whisper upload limit is 25 MB
+    STT_CHUNK_SECONDS: float = 120.0  # max segment length
+    STT_CHUNK_CONCURRENCY: int = 4
+    STT_CHUNK_SILENCE_DB: float = -35.0
+    STT_CHUNK_MIN_SILENCE: float = 0.4
+    # Content-addressed transcription result cache (DB)
+    STT_CACHE_ENABLED: bool = True
+    STT_CACHE_MAX_BYTES: int = 50 * 1024 * 1024
+    # Pre-upload normalisation to mono 16 kHz Opus/FLAC
+    STT_TRANSCODE_ENABLED: bool = True
+    STT_TRANSCODE_FORMAT: str = "opus"
+    STT_TRANSCODE_BITRATE: str = "24k"
+    # Local speech check before the provider call: silent clips are skipped, silence around speech trimmed
+    STT_SILENCE_ENABLED: bool = True
+    STT_SILENCE_THRESHOLD_DB: float = -45.0
+    STT_SILENCE_MIN_SPEECH_MS: int = 250
+    STT_SILENCE_PADDING_MS: int = 300
+    STT_SILENCE_MAX_SECONDS: float = 300.0  # longer clips are not analysed
+    # Vocabulary prompt: per-provider token budget and session blocks used for relevance ranking
+    STT_VOCAB_TOKEN_BUDGET: dict = {"openai": 224, "azure": 224, "gemini": 2000}
+    STT_VOCAB_CONTEXT_BLOCKS: int = 20
+    STT_VOCAB_CORRECTION_MIN_LENGTH: int = 2  # shorter readings are not used for post-transcription correction
+    # Execution engine: "thread" (one OS thread per job) or "async" (jobs multiplexed on an event loop)
+    STT_ENGINE: str = "thread"
+    STT_ASYNC_CONCURRENCY: dict = {"openai": 32, "azure": 32, "gemini": 8}
+    # Gemini: clips up to this size are sent inline; larger ones use the File API
+    STT_GEMINI_INLINE_MAX_BYTES: int = 15 * 1024 * 1024
+    STT_GEMINI_FILE_TTL: float = 900.0
+    STT_GEMINI_REAP_INTERVAL: float = 60.0
+    # Live transcription over /ws/stt/{session_id} (server-side VAD)
+    STT_STREAM_ENABLED: bool = True
+    STT_STREAM_SAMPLE_RATE: int = 16000
+    STT_STREAM_FRAME_MS: int = 30
+    STT_STREAM_THRESHOLD_DB: float = -45.0
+    STT_STREAM_MARGIN_DB: float = 10.0
+    STT_STREAM_SILENCE_MS: int = 600
+    STT_STREAM_MIN_SPEECH_MS: int = 250
+    STT_STREAM_MAX_UTTERANCE_SECONDS: float = 30.0
+    STT_STREAM_CONCURRENCY: int = 4
 
     LLM_PROVIDER: str = "openai"
     LLM_OPENAI_API_URL: str = ""
@@ -48,6 +102,25 @@ class Settings(BaseSettings):
     LLM_AZURE_API_VERSION: str = "2024-06-01"
     LLM_TIMEOUT: float = 60.0
     LLM_MAX_RETRIES: int = 3
+    # Shared provider rate limits: {"stt"|"llm": {provider: {rps, burst, concurrency}}}
+    RATE_LIMITS: dict = {}
+    RATE_LIMIT_BACKOFF_BASE: float = 1.0
+    RATE_LIMIT_BACKOFF_MAX: float = 30.0
+    # Per-provider circuit breaker
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_TIMEOUT: float = 30.0
+    # Resumable audio uploads (create -> PATCH chunks -> finalize)
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # suggested PATCH size (below nginx client_max_body_size)
+    UPLOAD_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    UPLOAD_EXPIRE_SECONDS: float = 24 * 3600.0  # unfinished uploads are deleted after this idle time
+    # Shared provider clients (keep-alive connection pools)
+    CLIENT_MAX_CONNECTIONS: int = 100
+    CLIENT_MAX_KEEPALIVE: int = 20
+    CLIENT_KEEPALIVE_EXPIRY: float = 120.0
+    CLIENT_PREWARM: bool = False
+    CLIENT_RETIRE_SECONDS: float = 300.0
+    # Format of secrets encrypted when settings are saved: "rsa" (ENC:...) or "hybrid" (ENC:v2:...)
+    SECRETS_FORMAT: str = "rsa"
 
     TIMEZONE: str = "UTC"
     DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
@@ -112,11 +185,93 @@ def load_config():
             settings.STT_OPENAI_API_URL = str(stt.get("openai_api_url", ""))
             settings.STT_TIMEOUT = float(stt.get("timeout", 60.0))
             settings.STT_MAX_RETRIES = int(stt.get("max_retries", 3))
+            settings.STT_CONCURRENCY = {**settings.STT_CONCURRENCY, **(stt.get("concurrency") or {})}
+            settings.STT_QUEUE_SIZE = int(stt.get("queue_size", 100))
+            settings.STT_QUEUE_RETRY_AFTER = int(stt.get("queue_retry_after", 30))
+            settings.STT_BATCH_QUEUE_SIZE = int(stt.get("batch_queue_size", 1000))
+            settings.STT_INTERACTIVE_RESERVE = int(stt.get("interactive_reserve", 1))
+            settings.STT_WORKER_MODE = str(stt.get("worker_mode", "inline"))
+            settings.STT_JOB_LEASE = float(stt.get("job_lease", 300.0))
+            settings.STT_JOB_MAX_ATTEMPTS = int(stt.get("job_max_attempts", 3))
+            settings.STT_WORKER_POLL_INTERVAL = float(stt.get("worker_poll_interval", 2.0))
+
+            chunking = stt.get("chunking", {}) or {}
+            settings.STT_CHUNK_ENABLED = bool(chunking.get("enabled", True))
+            settings.STT_CHUNK_THRESHOLD = float(chunking.get("threshold_seconds", 300.0))
+            settings.STT_CHUNK_MAX_BYTES = int(chunking.get("max_bytes", 24 * 1024 * 1024))
+            settings.STT_CHUNK_SECONDS = float(chunking.get("segment_seconds", 120.0))
+            settings.STT_CHUNK_CONCURRENCY = int(chunking.get("concurrency", 4))
+            settings.STT_CHUNK_SILENCE_DB = float(chunking.get("silence_db", -35.0))
+            settings.STT_CHUNK_MIN_SILENCE = float(chunking.get("min_silence", 0.4))
+
+            cache = stt.get("cache", {}) or {}
+            settings.STT_CACHE_ENABLED = bool(cache.get("enabled", True))
+            settings.STT_CACHE_MAX_BYTES = int(cache.get("max_bytes", 50 * 1024 * 1024))
+
+            transcode = stt.get("transcode", {}) or {}
+            settings.STT_TRANSCODE_ENABLED = bool(transcode.get("enabled", True))
+            settings.STT_TRANSCODE_FORMAT = str(transcode.get("format", "opus"))
+            settings.STT_TRANSCODE_BITRATE = str(transcode.get("bitrate", "24k"))
+
+            silence = stt.get("silence") or {}
+            settings.STT_SILENCE_ENABLED = bool(silence.get("enabled", True))
+            settings.STT_SILENCE_THRESHOLD_DB = float(silence.get("threshold_db", -45.0))
+            settings.STT_SILENCE_MIN_SPEECH_MS = int(silence.get("min_speech_ms", 250))
+            settings.STT_SILENCE_PADDING_MS = int(silence.get("padding_ms", 300))
+            settings.STT_SILENCE_MAX_SECONDS = float(silence.get("max_seconds", 300.0))
+
+            vocabulary = stt.get("vocabulary") or {}
+            settings.STT_VOCAB_TOKEN_BUDGET = {**settings.STT_VOCAB_TOKEN_BUDGET, **(vocabulary.get("token_budget") or {})}
+            settings.STT_VOCAB_CONTEXT_BLOCKS = int(vocabulary.get("context_blocks", 20))
+            settings.STT_VOCAB_CORRECTION_MIN_LENGTH = int(vocabulary.get("correction_min_length", 2))
+
+            settings.STT_ENGINE = str(stt.get("engine", "thread"))
+            settings.STT_ASYNC_CONCURRENCY = {**settings.STT_ASYNC_CONCURRENCY, **(stt.get("async_concurrency") or {})}
+
+            gemini = stt.get("gemini") or {}
+            settings.STT_GEMINI_INLINE_MAX_BYTES = int(gemini.get("inline_max_bytes", 15 * 1024 * 1024))
+            settings.STT_GEMINI_FILE_TTL = float(gemini.get("file_ttl", 900))
+            settings.STT_GEMINI_REAP_INTERVAL = float(gemini.get("reap_interval", 60))
+
+            streaming = stt.get("streaming") or {}
+            settings.STT_STREAM_ENABLED = bool(streaming.get("enabled", True))
+            settings.STT_STREAM_SAMPLE_RATE = int(streaming.get("sample_rate", 16000))
+            settings.STT_STREAM_FRAME_MS = int(streaming.get("frame_ms", 30))
+            settings.STT_STREAM_THRESHOLD_DB = float(streaming.get("threshold_db", -45.0))
+            settings.STT_STREAM_MARGIN_DB = float(streaming.get("margin_db", 10.0))
+            settings.STT_STREAM_SILENCE_MS = int(streaming.get("silence_ms", 600))
+            settings.STT_STREAM_MIN_SPEECH_MS = int(streaming.get("min_speech_ms", 250))
+            settings.STT_STREAM_MAX_UTTERANCE_SECONDS = float(streaming.get("max_utterance_seconds", 30.0))
+            settings.STT_STREAM_CONCURRENCY = int(streaming.get("concurrency", 4))
 
             # LLM settings (provider is loaded from settings.yaml)
             settings.LLM_OPENAI_API_URL = str(llm.get("openai_api_url", ""))
             settings.LLM_TIMEOUT = float(llm.get("timeout", 60.0))
             settings.LLM_MAX_RETRIES = int(llm.get("max_retries", 3))
+
+            rate_limits = system.get("rate_limits") or {}
+            settings.RATE_LIMITS = {kind: rate_limits.get(kind) or {} for kind in ("stt", "llm")}
+            settings.RATE_LIMIT_BACKOFF_BASE = float(rate_limits.get("backoff_base", 1.0))
+            settings.RATE_LIMIT_BACKOFF_MAX = float(rate_limits.get("backoff_max", 30.0))
+
+            breaker = system.get("circuit_breaker") or {}
+            settings.CIRCUIT_FAILURE_THRESHOLD = int(breaker.get("failure_threshold", 5))
+            settings.CIRCUIT_RESET_TIMEOUT = float(breaker.get("reset_timeout", 30.0))
+
+            uploads = system.get("uploads") or {}
+            settings.UPLOAD_CHUNK_SIZE = int(uploads.get("chunk_size", 8 * 1024 * 1024))
+            settings.UPLOAD_MAX_BYTES = int(uploads.get("max_bytes", 2 * 1024 * 1024 * 1024))
+            settings.UPLOAD_EXPIRE_SECONDS = float(uploads.get("expire_seconds", 24 * 3600))
+
+            clients = system.get("clients") or {}
+            settings.CLIENT_MAX_CONNECTIONS = int(clients.get("max_connections", 100))
+            settings.CLIENT_MAX_KEEPALIVE = int(clients.get("max_keepalive", 20))
+            settings.CLIENT_KEEPALIVE_EXPIRY = float(clients.get("keepalive_expiry", 120.0))
+            settings.CLIENT_PREWARM = bool(clients.get("prewarm", False))
+            settings.CLIENT_RETIRE_SECONDS = float(clients.get("retire_after", 300.0))
+
+            secrets = system.get("secrets") or {}
+            settings.SECRETS_FORMAT = str(secrets.get("format", "rsa"))
             
             app_config = system.get("app", {})
             settings.TIMEZONE = app_config.get("timezone", "UTC")
@@ -1,3 +1,5 @@
 from app.models.transcription_block import TranscriptionBlock
 from app.models.session import Session
 from app.models.revision import EditorRevision
+from app.models.transcription_job import TranscriptionJob
+from app.models.transcription_cache import TranscriptionCacheEntry
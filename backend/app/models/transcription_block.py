@@ -1,9 +1,18 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey, Integer, Float, BigInteger
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
+# Transcription status of an audio block (None: never transcribed / text block)
+STATUS_QUEUED = "queued"
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_PROCESSING)
+
 class TranscriptionBlock(Base):
     __tablename__ = "transcription_blocks"
 
@@ -13,11 +22,21 @@ class TranscriptionBlock(Base):
     text = Column(Text, nullable=True) # Text content
     file_path = Column(String, nullable=True) # Path to audio file
     timestamp = Column(String, nullable=True) # Display timestamp
-    duration = Column(String, nullable=True)
+    duration = Column(String, nullable=True)  # Display string (m:ss)
+    # Audio metadata probed at upload (None until probed / for text blocks)
+    duration_seconds = Column(Float, nullable=True)
+    codec = Column(String, nullable=True)
+    channels = Column(Integer, nullable=True)
+    sample_rate = Column(Integer, nullable=True)
+    byte_size = Column(BigInteger, nullable=True)
+    audio_sha256 = Column(String, nullable=True)  # Hashed while receiving the upload (result cache key)
     is_checked = Column(Boolean, default=True)
     is_deleted = Column(Boolean, default=False)
     color = Column(String, nullable=True, default=None)  # e.g. 'yellow', 'blue', etc.
     order_index = Column(Integer, default=0)
+    status = Column(String, nullable=True)  # Transcription state (STATUS_*); `text` only changes on success
+    progress = Column(Float, nullable=True)  # 0.0 - 1.0 at the last state change (live progress goes over WebSocket)
+    status_message = Column(Text, nullable=True)  # Error / cancellation reason
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Establish relationship if needed, for cascading deletes etc.
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Text, Integer
+from app.db.base import Base
+
+class TranscriptionCacheEntry(Base):
+    __tablename__ = "transcription_cache"
+
+    # sha256 over (audio sha256, provider, model, effective prompt)
+    key = Column(String, primary_key=True, index=True)
+    audio_sha256 = Column(String, index=True)
+    provider = Column(String, nullable=True)
+    model = Column(String, nullable=True)
+    text = Column(Text, nullable=True)
+    size_bytes = Column(Integer, default=0)  # Encoded size of `text`, used for eviction
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
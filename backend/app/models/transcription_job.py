@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Text, Integer, Boolean, ForeignKey
+from app.db.base import Base
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_JOB_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+# Scheduling priority (higher is claimed first)
+PRIORITY_BULK = 0          # Session-wide / multi-block batches
+PRIORITY_INTERACTIVE = 10  # Single-block requests (uploads, recordings, re-transcribe)
+
+class TranscriptionJob(Base):
+    __tablename__ = "transcription_jobs"
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    block_id = Column(String, ForeignKey("transcription_blocks.id", ondelete="CASCADE"), index=True)
+    provider = Column(String, nullable=True)  # STT provider lane (openai / azure / gemini)
+    state = Column(String, default=JOB_QUEUED, index=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    lease_owner = Column(String, nullable=True)  # Worker id holding the job
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    cache_hit = Column(Boolean, default=False)  # Result served from transcription_cache
+    priority = Column(Integer, default=PRIORITY_INTERACTIVE, index=True)
+    batch_id = Column(String, nullable=True, index=True)  # Set for jobs enqueued as one batch
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
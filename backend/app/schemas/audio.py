@@ -0,0 +1,10 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class AudioUploadCreate(BaseModel):
+    filename: str
+    size: Optional[int] = None  # total bytes; finalize requires all of them when given
+    session_id: Optional[str] = None  # None: a new session is created at finalize
+
+class AudioUploadFinalize(BaseModel):
+    sha256: Optional[str] = None  # verified against the hash computed while receiving
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class PromptTemplateBase(BaseModel):
     title: str
@@ -46,3 +46,7 @@ class VocabularyItem(VocabularyItemBase):
     id: str
     class Config:
         from_attributes = True
+
+class VocabularyApplyRequest(BaseModel):
+    session_ids: Optional[List[str]] = None  # None: every session
+    dry_run: bool = False
@@ -27,6 +27,9 @@ class TranscriptionBlockBulkUpdate(BaseModel):
 class TranscriptionBlockReorder(BaseModel):
     block_ids: List[str]
 
+class TranscriptionBatchRequest(BaseModel):
+    block_ids: List[str]
+
 class TranscriptionBlock(TranscriptionBlockBase):
     id: str
     session_id: str
@@ -35,6 +38,14 @@ class TranscriptionBlock(TranscriptionBlockBase):
     is_deleted: bool = False
     color: Optional[str] = None
     order_index: int = 0
+    status: Optional[str] = None
+    progress: Optional[float] = None
+    status_message: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    codec: Optional[str] = None
+    channels: Optional[int] = None
+    sample_rate: Optional[int] = None
+    byte_size: Optional[int] = None
 
 
     class Config:
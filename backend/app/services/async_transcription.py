@@ -0,0 +1,316 @@
+"""
+Async Transcription Engine
+
+Alternative to the per-provider thread pools (`system.stt.engine: async`).
+Jobs run as coroutines on one dedicated event loop: provider calls go through
+AsyncOpenAI / AsyncAzureOpenAI, backoff uses `asyncio.sleep`, and blocking
+work (DB writes, ffmpeg, hashing, the Gemini SDK) is offloaded with
+`asyncio.to_thread`. Hundreds of in-flight uploads then cost coroutines
+instead of OS threads.
+
+Usage:
+    from app.services.async_transcription import async_engine
+
+    if async_engine.has_capacity("openai"):
+        async_engine.submit(job.id, "openai", job=process_job_async)
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.services.openai_factory import get_async_openai_client
+from app.services.rate_limiter import backoff_delay
+from app.services.circuit_breaker import provider_call_async
+from app.services.cancellation import cancellations, CancelToken, TranscriptionCancelled
+from app.services.transcription_status import publish_progress
+from app.services.transcription import (
+    TranscriptionStart, _start_transcription, _chunking_duration, _detect_speech, _is_silent, _prepare_upload,
+    _split_segments, _transcribe_file, _store_completed, _store_failed, _store_transcript, _store_chunked,
+    _after_failure, NO_SPEECH_MESSAGE
+)
+
+# Fallback in-flight limit for providers not listed in config.yaml
+DEFAULT_ASYNC_CONCURRENCY = 8
+
+
+def _with_db(fn: Callable, *args):
+    """Run `fn(db, *args)` on a short-lived session (called via asyncio.to_thread)."""
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def _complete(block_id: str, text: str, token: CancelToken, message: Optional[str] = None):
+    """Store the transcript unless the transcription was cancelled (raises TranscriptionCancelled)."""
+    await token.check_async()
+    await asyncio.to_thread(_with_db, _store_completed, block_id, text, message)
+
+
+def _read_file(file_path: str):
+    with open(file_path, "rb") as f:
+        return os.path.basename(file_path), f.read()
+
+
+async def _transcribe_file_async(provider: str, client, model_name: str, file_path: str, stt_prompt: str) -> str:
+    """Single provider call for one audio file (no retries), behind the provider's breaker and rate limiter."""
+    if provider == "gemini":
+        # google-generativeai has no asyncio upload API (breaker and limiter are applied in the thread)
+        return await asyncio.to_thread(_transcribe_file, provider, None, model_name, file_path, stt_prompt)
+
+    kwargs = {
+        "model": model_name,
+        "file": await asyncio.to_thread(_read_file, file_path),
+        "response_format": "text"
+    }
+    if stt_prompt.strip():
+        kwargs["prompt"] = stt_prompt.strip()
+    async with provider_call_async("stt", provider):
+        return await client.audio.transcriptions.create(**kwargs)
+
+
+async def _transcribe_chunked_async(block_id: str, start: TranscriptionStart, client, duration: float,
+                                    token: CancelToken) -> Optional[str]:
+    """
+    Async counterpart of `_transcribe_chunked`: segments are uploaded as
+    concurrent coroutines (bounded by STT_CHUNK_CONCURRENCY) and only failed
+    segments are retried. Splitting and storing the outcome are shared.
+    """
+    provider, model_name, stt_prompt = start.provider, start.model_name, start.stt_prompt
+    session_id = start.session_id
+    max_retries = settings.STT_MAX_RETRIES
+    semaphore = asyncio.Semaphore(max(1, settings.STT_CHUNK_CONCURRENCY))
+
+    with tempfile.TemporaryDirectory(prefix="vox-chunks-") as tmp_dir:
+        await token.check_async()
+        publish_progress(session_id, block_id, "Splitting audio...", 0.0)
+        segments = await asyncio.to_thread(_split_segments, start.file_path, tmp_dir, duration)
+        total = len(segments)
+        print(f"Transcribing block {block_id} in {total} segments ({duration:.0f}s) using {provider} (async)")
+
+        results = {}
+        errors = {}
+
+        async def _run_segment(seg, attempt):
+            async with semaphore:
+                await token.check_async()
+                try:
+                    results[seg.index] = ((await _transcribe_file_async(provider, client, model_name, seg.path, stt_prompt)) or "").strip()
+                    errors.pop(seg.index, None)
+                except Exception as e:
+                    print(f"Segment {seg.index + 1}/{total} failed (Attempt {attempt+1}): {e}")
+                    errors[seg.index] = e
+            await token.check_async()
+            publish_progress(session_id, block_id, f"Processing {len(results)}/{total} segments...", len(results) / total)
+
+        pending = segments
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                await token.check_async()
+                publish_progress(session_id, block_id,
+                                 f"Retry {attempt}/{max_retries}: {len(pending)} segment(s) failed...", len(results) / total)
+                await token.sleep_async(backoff_delay(attempt - 1, errors[min(errors)]))
+            outcomes = await asyncio.gather(*(_run_segment(seg, attempt) for seg in pending), return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            pending = [seg for seg in segments if seg.index in errors]
+            if not pending:
+                break
+
+    await token.check_async()
+    return await asyncio.to_thread(_with_db, _store_chunked, block_id, start, results, errors, total)
+
+
+async def transcribe_audio_task_async(block_id: str, job_id: str = None) -> bool:
+    """
+    Async counterpart of `transcribe_audio_task`: same status texts, cache,
+    chunking and cancellation behaviour, without holding a thread while waiting
+    on the provider. Returns True if the result was served from the transcription cache.
+    """
+    with cancellations.track(block_id, job_id) as token:
+        try:
+            return await _run_transcription_async(block_id, token)
+        except TranscriptionCancelled:
+            print(f"Transcription cancelled for block {block_id}")
+            return False
+
+
+async def _run_transcription_async(block_id: str, token: CancelToken) -> bool:
+    print(f"Starting transcription for block {block_id} (async)")
+    try:
+        await token.check_async()
+        start = await asyncio.to_thread(_with_db, _start_transcription, block_id)
+        if start is None:
+            print(f"Block {block_id} not found in background task")
+            return False
+
+        if start.cached_text is not None:
+            await _complete(block_id, start.cached_text, token)
+            print(f"Transcription cache hit for block {block_id}")
+            return True
+
+        speech = await asyncio.to_thread(_detect_speech, start.file_path, start.duration)
+        if _is_silent(speech):
+            await _complete(block_id, "", token, NO_SPEECH_MESSAGE)
+            print(f"No speech detected in block {block_id}, skipping {start.provider}")
+            return False
+
+        client = get_async_openai_client("stt", start.provider) if start.provider != "gemini" else None
+        base_url = str(client.base_url) if client else "Gemini"
+
+        chunk_duration = await asyncio.to_thread(_chunking_duration, start.file_path, start.duration)
+        if chunk_duration:
+            await _transcribe_chunked_async(block_id, start, client, chunk_duration, token)
+            return False
+
+        upload_path = await asyncio.to_thread(_prepare_upload, start.file_path, speech)
+        if start.provider == "gemini":
+            publish_progress(start.session_id, block_id, "Processing with Gemini...")
+
+        max_retries = settings.STT_MAX_RETRIES
+        attempt = 0
+        while True:
+            try:
+                await token.check_async()
+                if not start.file_path or not os.path.exists(start.file_path):
+                    raise FileNotFoundError(f"Audio file not found at {start.file_path}")
+                if attempt > 0:
+                    publish_progress(start.session_id, block_id, f"Retry {attempt}/{max_retries} to {base_url}...")
+
+                print(f"Transcribing file: {upload_path} using {start.provider} / {start.model_name} (Attempt {attempt+1}, async)")
+                text = await _transcribe_file_async(start.provider, client, start.model_name, upload_path, start.stt_prompt)
+
+                await token.check_async()
+                await asyncio.to_thread(_with_db, _store_transcript, block_id, start, text)
+                return False
+            except TranscriptionCancelled:
+                raise
+            except Exception as e:
+                await token.check_async()
+                action, value = _after_failure(e, attempt, start, block_id, base_url)
+                if action == "failover":
+                    await asyncio.to_thread(start.switch_provider, value)
+                    client = get_async_openai_client("stt", start.provider) if start.provider != "gemini" else None
+                    base_url = str(client.base_url) if client else "Gemini"
+                    attempt = 0
+                elif action == "retry":
+                    await token.sleep_async(value)
+                    attempt += 1
+                else:
+                    await asyncio.to_thread(_with_db, _store_failed, block_id, value)
+                    return False
+
+    except TranscriptionCancelled:
+        raise
+    except Exception as e:
+        print(f"CRITICAL: Encoutered top-level error in transcription task: {e}")
+        try:
+            await asyncio.to_thread(_with_db, _store_failed, block_id, f"System Error: {str(e)}")
+        except Exception:
+            print("Failed to update block with error status")
+    return False
+
+
+class AsyncTranscriptionEngine:
+    """
+    Runs transcription coroutines on a private event loop thread with a
+    per-provider in-flight limit. Mirrors the TranscriptionQueue interface
+    used by the worker (providers / has_capacity / submit / stats / shutdown).
+    """
+
+    def __init__(self, concurrency: Dict[str, int] = None):
+        self._concurrency = dict(concurrency if concurrency is not None else settings.STT_ASYNC_CONCURRENCY)
+        self._in_flight: Dict[str, int] = {}
+        self._completed: Dict[str, int] = {}
+        self._failed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="stt-async", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _limit(self, provider: str) -> int:
+        return max(1, int(self._concurrency.get(provider, DEFAULT_ASYNC_CONCURRENCY)))
+
+    def providers(self) -> List[str]:
+        with self._lock:
+            return sorted(set(self._concurrency) | set(self._in_flight))
+
+    def has_capacity(self, provider: str, reserve: int = 0) -> bool:
+        with self._lock:
+            limit = self._limit(provider)
+            return self._in_flight.get(provider, 0) < limit - min(reserve, limit - 1)
+
+    def submit(self, job_id: str, provider: str, job: Callable[[str], Awaitable[None]]):
+        """Schedule `await job(job_id)` on the engine loop."""
+        loop = self._ensure_loop()
+        with self._lock:
+            self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+
+        async def _run():
+            ok = True
+            try:
+                await job(job_id)
+            except Exception as e:
+                ok = False
+                print(f"[AsyncSTT] Transcription job {job_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight[provider] -= 1
+                    counter = self._completed if ok else self._failed
+                    counter[provider] = counter.get(provider, 0) + 1
+
+        asyncio.run_coroutine_threadsafe(_run(), loop)
+        print(f"[AsyncSTT] Scheduled job {job_id} on '{provider}'")
+
+    def run(self, coro: Awaitable[Any]):
+        """Schedule any coroutine on the engine loop (e.g. warming its provider clients)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            names = set(self._concurrency) | set(self._in_flight)
+            return {
+                "running": sum(self._in_flight.values()),
+                "lanes": {
+                    name: {
+                        "concurrency": self._limit(name),
+                        "running": self._in_flight.get(name, 0),
+                        "completed": self._completed.get(name, 0),
+                        "failed": self._failed.get(name, 0),
+                    }
+                    for name in sorted(names)
+                },
+            }
+
+    def shutdown(self, wait: bool = False, timeout: float = 30.0):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+        if wait:
+            deadline = time.monotonic() + timeout
+            while self.stats()["running"] and time.monotonic() < deadline:
+                time.sleep(0.2)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread:
+            thread.join(timeout=5)
+
+
+async_engine = AsyncTranscriptionEngine()
@@ -0,0 +1,362 @@
+"""
+Audio Processing Helpers (ffmpeg)
+
+Thin wrappers around the ffmpeg binary installed in the backend image
+(via `ffmpeg-python`). Used at upload time to probe audio metadata, and by the
+transcription pipeline to split long recordings at silences so segments can
+be transcribed concurrently, to skip clips without speech, and to normalise
+uploads to compact mono 16 kHz audio (trimmed to the speech) before the
+provider call.
+
+Usage:
+    from app.services.audio_processing import probe_audio, split_on_silence
+
+    info = probe_audio("/data/<session>/audio/x.webm")
+    # -> AudioInfo(duration=312.4, codec="opus", channels=1, sample_rate=48000, byte_size=1843200, container="matroska,webm")
+
+    segments = split_on_silence("/data/<session>/audio/x.webm", "/tmp/chunks", max_seconds=120)
+    # -> [AudioSegment(index=0, start=0.0, end=118.4, path="/tmp/chunks/chunk_000.mp3"), ...]
+"""
+
+import glob
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import ffmpeg
+
+# Transcoded artifacts live next to the original: <name>.stt[.<bitrate>][.<start>-<end>ms].<ext>
+TRANSCODE_SUFFIX = ".stt"
+TRANSCODE_FORMATS = {
+    # format: (extension, ffmpeg output options); "copy" only trims and keeps the original stream
+    "opus": (".ogg", {"acodec": "libopus", "application": "voip"}),
+    "flac": (".flac", {"acodec": "flac", "sample_fmt": "s16"}),
+    "copy": (None, {"acodec": "copy"}),
+}
+
+# ffprobe container names -> file extension (for uploads that arrive without a usable extension)
+CONTAINER_EXTENSIONS = {
+    "matroska,webm": ".webm",
+    "ogg": ".ogg",
+    "mp3": ".mp3",
+    "wav": ".wav",
+    "flac": ".flac",
+    "aac": ".aac",
+    "mov,mp4,m4a,3gp,3g2,mj2": ".m4a",
+}
+
+# Local speech check: PCM decoded for the energy VAD, and the least silence worth trimming
+SPEECH_SAMPLE_RATE = 16000
+MIN_TRIM_SECONDS = 0.5
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+@dataclass
+class AudioSegment:
+    index: int
+    start: float
+    end: float
+    path: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class AudioInfo:
+    duration: Optional[float]
+    codec: Optional[str]
+    channels: Optional[int]
+    sample_rate: Optional[int]
+    byte_size: int
+    container: Optional[str] = None
+
+    @property
+    def extension(self) -> Optional[str]:
+        return CONTAINER_EXTENSIONS.get(self.container)
+
+    def apply_to(self, block):
+        """Copy into the block's metadata columns (the caller commits)."""
+        block.duration_seconds = self.duration
+        block.codec = self.codec
+        block.channels = self.channels
+        block.sample_rate = self.sample_rate
+        block.byte_size = self.byte_size
+
+
+@dataclass
+class SpeechActivity:
+    duration: float                # seconds of decoded audio
+    speech_seconds: float          # total length of the frames above the threshold
+    start: Optional[float] = None  # first / last speech frame (None without speech)
+    end: Optional[float] = None
+
+    def has_speech(self, min_speech: float) -> bool:
+        return self.start is not None and self.speech_seconds >= min_speech
+
+    def trim_window(self, padding: float) -> Optional[Tuple[float, float]]:
+        """(start, end) of the speech plus `padding`, or None if trimming would save too little."""
+        if self.start is None:
+            return None
+        start = max(0.0, self.start - padding)
+        end = min(self.duration, self.end + padding)
+        if start + (self.duration - end) < MIN_TRIM_SECONDS:
+            return None
+        return start, end
+
+
+def _optional(value, cast):
+    try:
+        return cast(value) if value not in (None, "", "N/A") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_audio(file_path: str) -> Optional[AudioInfo]:
+    """Duration, codec, channels, sample rate and size of the first audio stream; None if ffprobe fails."""
+    try:
+        info = ffmpeg.probe(file_path, select_streams="a:0")
+    except (ffmpeg.Error, OSError) as e:
+        print(f"[Audio] ffprobe failed for {file_path}: {e}")
+        return None
+    fmt = info.get("format", {})
+    stream = (info.get("streams") or [{}])[0]
+    # Some containers (webm from MediaRecorder) only carry the duration per stream
+    duration = _optional(fmt.get("duration"), float) or _optional(stream.get("duration"), float)
+    return AudioInfo(
+        duration=duration,
+        codec=stream.get("codec_name"),
+        channels=_optional(stream.get("channels"), int),
+        sample_rate=_optional(stream.get("sample_rate"), int),
+        byte_size=_optional(fmt.get("size"), int) or os.path.getsize(file_path),
+        container=fmt.get("format_name"),
+    )
+
+
+def probe_duration(file_path: str) -> Optional[float]:
+    """Duration in seconds, or None if ffprobe cannot tell."""
+    info = probe_audio(file_path)
+    return info.duration if info else None
+
+
+def format_duration(seconds: float) -> str:
+    """Display string for a block (m:ss, or h:mm:ss)."""
+    total = int(round(seconds))
+    hours, rest = divmod(total, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def detect_silences(file_path: str, noise_db: float = -35.0, min_silence: float = 0.4) -> List[Tuple[float, float]]:
+    """Return (start, end) pairs of silent stretches using ffmpeg's silencedetect filter."""
+    try:
+        _, err = (
+            ffmpeg
+            .input(file_path)
+            .output("-", format="null", af=f"silencedetect=noise={noise_db}dB:d={min_silence}")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        print(f"[Audio] silencedetect failed for {file_path}: {e}")
+        return []
+
+    silences = []
+    start = None
+    for line in err.decode("utf-8", errors="ignore").splitlines():
+        m = _SILENCE_START_RE.search(line)
+        if m:
+            start = max(0.0, float(m.group(1)))
+            continue
+        m = _SILENCE_END_RE.search(line)
+        if m and start is not None:
+            silences.append((start, float(m.group(1))))
+            start = None
+    return silences
+
+
+def analyze_speech(file_path: str, threshold_db: float = -45.0, frame_ms: int = 30) -> Optional[SpeechActivity]:
+    """
+    Decode to mono 16 kHz PCM and measure the RMS level of every frame; frames
+    louder than `threshold_db` count as speech. PCM is read from the ffmpeg pipe
+    frame by frame, so memory stays flat. Returns None if ffmpeg fails.
+    """
+    from app.services.vad import SAMPLE_WIDTH, frame_dbfs
+
+    frame_bytes = int(SPEECH_SAMPLE_RATE * frame_ms / 1000) * SAMPLE_WIDTH
+    try:
+        process = (
+            ffmpeg
+            .input(file_path)
+            .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=SPEECH_SAMPLE_RATE)
+            .global_args("-nostdin", "-loglevel", "error")
+            .run_async(pipe_stdout=True)
+        )
+    except OSError as e:
+        print(f"[Audio] Speech check failed for {file_path}: {e}")
+        return None
+
+    frames = speech_frames = 0
+    first = last = None
+    with process.stdout:
+        while True:
+            frame = process.stdout.read(frame_bytes)
+            if not frame:
+                break
+            if frame_dbfs(frame) > threshold_db:
+                speech_frames += 1
+                if first is None:
+                    first = frames
+                last = frames
+            frames += 1
+    if process.wait() != 0:
+        print(f"[Audio] Speech check failed for {file_path}: ffmpeg exited with {process.returncode}")
+        return None
+
+    seconds = frame_ms / 1000
+    return SpeechActivity(
+        duration=frames * seconds,
+        speech_seconds=speech_frames * seconds,
+        start=first * seconds if first is not None else None,
+        end=(last + 1) * seconds if last is not None else None,
+    )
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]], max_seconds: float) -> List[AudioSegment]:
+    """
+    Cut [0, duration] into segments no longer than `max_seconds`,
+    preferring cut points in the middle of a silence.
+    Falls back to a hard cut when a stretch has no usable silence.
+    """
+    if duration <= max_seconds:
+        return [AudioSegment(index=0, start=0.0, end=duration)]
+
+    cut_points = sorted((s + e) / 2 for s, e in silences)
+    segments = []
+    start = 0.0
+    while duration - start > max_seconds:
+        limit = start + max_seconds
+        # Only accept silences in the second half of the window so segments stay reasonably long
+        candidates = [p for p in cut_points if start + max_seconds / 2 <= p <= limit]
+        cut = candidates[-1] if candidates else limit
+        segments.append(AudioSegment(index=len(segments), start=start, end=cut))
+        start = cut
+    segments.append(AudioSegment(index=len(segments), start=start, end=duration))
+    return segments
+
+
+def extract_segment(file_path: str, start: float, end: float, out_path: str) -> str:
+    """Cut [start, end] into a compact mono 16 kHz MP3 suitable for STT upload."""
+    (
+        ffmpeg
+        .input(file_path, ss=start, t=end - start)
+        .output(out_path, vn=None, ac=1, ar=16000, audio_bitrate="48k")
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return out_path
+
+
+def split_on_silence(
+    file_path: str,
+    out_dir: str,
+    max_seconds: float,
+    noise_db: float = -35.0,
+    min_silence: float = 0.4,
+    duration: float = None,
+) -> List[AudioSegment]:
+    """Split an audio file at silences into segment files in `out_dir` (ordered)."""
+    duration = duration if duration is not None else probe_duration(file_path)
+    if not duration:
+        raise ValueError(f"Could not determine duration of {file_path}")
+
+    silences = detect_silences(file_path, noise_db=noise_db, min_silence=min_silence)
+    segments = plan_chunks(duration, silences, max_seconds)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for seg in segments:
+        seg.path = extract_segment(file_path, seg.start, seg.end, os.path.join(out_dir, f"chunk_{seg.index:03d}.mp3"))
+    return segments
+
+
+def transcoded_path(file_path: str, fmt: str = "opus", bitrate: Optional[str] = None,
+                    window: Optional[Tuple[float, float]] = None) -> str:
+    """
+    Path of the artifact stored next to `file_path`. The bitrate and trim window
+    are part of the name, so an artifact is only reused for the same parameters.
+    """
+    base, source_ext = os.path.splitext(file_path)
+    ext = TRANSCODE_FORMATS[fmt][0] or source_ext
+    tags = ""
+    if fmt == "opus" and bitrate:
+        tags += f".{bitrate}"
+    if window:
+        tags += f".{int(window[0] * 1000)}-{int(window[1] * 1000)}ms"
+    return f"{base}{TRANSCODE_SUFFIX}{tags}{ext}"
+
+
+def derived_audio_paths(file_path: str) -> List[str]:
+    """Existing artifacts derived from `file_path` (for cleanup on delete)."""
+    pattern = f"{glob.escape(os.path.splitext(file_path)[0])}{TRANSCODE_SUFFIX}.*"
+    return [p for p in glob.glob(pattern) if p != file_path]
+
+
+def transcode_for_stt(file_path: str, fmt: str = "opus", bitrate: str = "24k",
+                      window: Optional[Tuple[float, float]] = None) -> str:
+    """
+    Downmix to mono, resample to 16 kHz and encode as Opus (or FLAC), keeping
+    only `window` (start, end seconds) if given. With fmt="copy" the audio is
+    not re-encoded: only the window is cut out with a stream copy.
+    The artifact is cached next to the original (named after the parameters) and
+    reused while it is newer than the source; artifacts for other parameters are
+    removed. Returns the path to upload: the artifact, or the original if
+    transcoding fails or would not make the file smaller.
+    """
+    if fmt not in TRANSCODE_FORMATS:
+        raise ValueError(f"Unsupported transcode format: {fmt}")
+    if fmt == "copy" and not window:
+        return file_path
+    out_path = transcoded_path(file_path, fmt, bitrate, window)
+    if out_path == file_path:
+        return file_path
+
+    if not (os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(file_path)):
+        options = dict(TRANSCODE_FORMATS[fmt][1])
+        if fmt == "opus":
+            options["audio_bitrate"] = bitrate
+        if fmt != "copy":
+            options.update(ac=1, ar=16000, format="ogg" if fmt == "opus" else "flac")
+        # Keep the real extension last so ffmpeg can infer the container for stream copies
+        tmp_path = f"{os.path.splitext(out_path)[0]}.part{os.path.splitext(out_path)[1]}"
+        trim = {"ss": window[0], "t": window[1] - window[0]} if window else {}
+        try:
+            (
+                ffmpeg
+                .input(file_path, **trim)
+                .output(tmp_path, vn=None, **options)
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+            os.replace(tmp_path, out_path)
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode("utf-8", errors="ignore")[-300:] if e.stderr else ""
+            print(f"[Audio] Transcode failed for {file_path}: {stderr}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return file_path
+        for stale in derived_audio_paths(file_path):
+            if stale != out_path and ".part." not in os.path.basename(stale):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    original_size = os.path.getsize(file_path)
+    new_size = os.path.getsize(out_path)
+    if new_size >= original_size:
+        return file_path
+    print(f"[Audio] Transcoded {os.path.basename(file_path)}: {original_size} -> {new_size} bytes")
+    return out_path
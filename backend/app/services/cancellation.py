@@ -0,0 +1,149 @@
+"""
+Transcription Cancellation
+
+Cooperative cancellation for running transcriptions. Each run registers a
+CancelToken for its block; the retry loops and the chunked uploader call
+`token.check()` / `token.sleep()` at safe points (before provider calls,
+between segment uploads, during backoff, before writing results), so a
+cancelled run stops without another provider call and without writing its
+result into the block.
+
+Cancels reach a token in two ways: directly in this process via
+`cancellations.cancel(block_id)`, or - for jobs running in another worker
+process - by the job row turning `cancelled` (or disappearing), which tokens
+poll every CANCEL_POLL_INTERVAL seconds.
+
+Usage:
+    from app.services.cancellation import cancellations, TranscriptionCancelled
+
+    with cancellations.track(block_id, job_id) as token:
+        token.check()          # raises TranscriptionCancelled
+        token.sleep(delay)     # backoff that wakes up on cancel
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Set
+
+# Seconds between checks of the job row (cancels issued by another process)
+CANCEL_POLL_INTERVAL = 2.0
+
+# Status message of a cancelled block (re-transcribe to retry)
+CANCELLED_MESSAGE = "Transcription cancelled."
+
+
+class TranscriptionCancelled(Exception):
+    """Raised at a checkpoint of a transcription that was cancelled."""
+
+    def __init__(self, block_id: str):
+        super().__init__(f"Transcription of block {block_id} was cancelled")
+        self.block_id = block_id
+
+
+def _job_cancelled(job_id: str) -> bool:
+    from app.db.base import SessionLocal
+    from app.models.transcription_job import TranscriptionJob, JOB_CANCELLED
+
+    db = SessionLocal()
+    try:
+        state = db.query(TranscriptionJob.state).filter(TranscriptionJob.id == job_id).scalar()
+        return state is None or state == JOB_CANCELLED
+    finally:
+        db.close()
+
+
+class CancelToken:
+    def __init__(self, block_id: str, job_id: Optional[str] = None):
+        self.block_id = block_id
+        self.job_id = job_id
+        self._event = threading.Event()
+        self._polled_at = time.monotonic()
+
+    def cancel(self):
+        self._event.set()
+
+    def _poll_due(self) -> bool:
+        return bool(self.job_id) and time.monotonic() - self._polled_at >= CANCEL_POLL_INTERVAL
+
+    def _poll(self):
+        self._polled_at = time.monotonic()
+        try:
+            if _job_cancelled(self.job_id):
+                self._event.set()
+        except Exception as e:
+            print(f"[Cancel] Could not check job {self.job_id}: {e}")
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self._poll_due():
+            self._poll()
+        return self._event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise TranscriptionCancelled(self.block_id)
+
+    def sleep(self, seconds: float):
+        """time.sleep that returns early (raising TranscriptionCancelled) on cancel."""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.check()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._event.wait(min(remaining, CANCEL_POLL_INTERVAL))
+
+    async def check_async(self):
+        if not self._event.is_set() and self._poll_due():
+            await asyncio.to_thread(self._poll)
+        if self._event.is_set():
+            raise TranscriptionCancelled(self.block_id)
+
+    async def sleep_async(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while True:
+            await self.check_async()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 0.25))
+
+
+class Cancellations:
+    """Tokens of the transcriptions running in this process, by block id."""
+
+    def __init__(self):
+        self._tokens: Dict[str, Set[CancelToken]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, block_id: str, job_id: Optional[str] = None):
+        token = CancelToken(block_id, job_id)
+        with self._lock:
+            self._tokens.setdefault(block_id, set()).add(token)
+        try:
+            yield token
+        finally:
+            with self._lock:
+                tokens = self._tokens.get(block_id)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._tokens[block_id]
+
+    def cancel(self, block_id: str) -> bool:
+        """Signal every running transcription of the block. Returns True if one was running here."""
+        with self._lock:
+            tokens = list(self._tokens.get(block_id, ()))
+        for token in tokens:
+            token.cancel()
+        return bool(tokens)
+
+    def running(self) -> int:
+        with self._lock:
+            return sum(len(tokens) for tokens in self._tokens.values())
+
+
+cancellations = Cancellations()
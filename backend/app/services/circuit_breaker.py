@@ -0,0 +1,215 @@
+"""
+Provider Circuit Breakers and Failover
+
+One breaker per (stt|llm, provider). After `failure_threshold` consecutive
+failures the breaker opens, and calls fail immediately with CircuitOpenError
+instead of walking through retry sleeps. After `reset_timeout` seconds a single
+probe call is let through (half-open): success closes the breaker, failure
+re-opens it.
+
+Callers route around open breakers using the ordered failover list in
+settings.yaml (`stt_failover` / `llm_failover`, e.g. [azure, openai, gemini]).
+
+Usage:
+    from app.services.circuit_breaker import provider_call, failover_candidates
+
+    for provider in failover_candidates("stt", primary):
+        try:
+            with provider_call("stt", provider):   # breaker + shared rate limiter
+                ...
+        except CircuitOpenError:
+            continue
+"""
+
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.rate_limiter import provider_limits
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Errors caused by the request itself (bad audio, oversized file, ...) say nothing about provider health
+CLIENT_ERROR_STATUSES = {400, 404, 413, 415, 422}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, kind: str, provider: str, retry_in: float):
+        super().__init__(f"{provider} {kind.upper()} is unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.kind = kind
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def counts_as_failure(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and status in CLIENT_ERROR_STATUSES:
+        return False
+    return isinstance(error, Exception) and not isinstance(error, (CircuitOpenError, FileNotFoundError))
+
+
+class CircuitBreaker:
+    def __init__(self, kind: str, provider: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.kind = kind
+        self.provider = provider
+        self.failure_threshold = max(1, failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD)
+        self.reset_timeout = reset_timeout if reset_timeout is not None else settings.CIRCUIT_RESET_TIMEOUT
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error = None
+        self.trips = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def available(self) -> bool:
+        """True if a call would currently be allowed (without claiming the half-open probe)."""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                return self._retry_in() == 0
+            return not (self.state == STATE_HALF_OPEN and self._probe_in_flight)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                if self._retry_in() > 0:
+                    raise CircuitOpenError(self.kind, self.provider, self._retry_in())
+                self.state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == STATE_HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.kind, self.provider, self.reset_timeout)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                print(f"[Breaker] {self.kind}:{self.provider} closed")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            self._probe_in_flight = False
+            if not counts_as_failure(error):
+                return
+            self.failures += 1
+            self.last_error = str(error)[:300]
+            if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    self.trips += 1
+                    print(f"[Breaker] {self.kind}:{self.provider} opened after {self.failures} failure(s): {self.last_error}")
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self.state
+            if state == STATE_OPEN and self._retry_in() == 0:
+                state = STATE_HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in": round(self._retry_in(), 1) if self.state == STATE_OPEN else 0,
+                "trips": self.trips,
+                "last_error": self.last_error,
+            }
+
+
+class CircuitBreakers:
+    def __init__(self):
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get((kind, provider))
+            if breaker is None:
+                breaker = CircuitBreaker(kind, provider)
+                self._breakers[(kind, provider)] = breaker
+            return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = list(self._breakers.items())
+        result: Dict[str, Any] = {}
+        for (kind, provider), breaker in breakers:
+            result.setdefault(kind, {})[provider] = breaker.stats()
+        return result
+
+
+breakers = CircuitBreakers()
+
+
+def failover_candidates(kind: str, primary: str) -> List[str]:
+    """
+    Providers to try in order: the selected provider, then the rest of
+    `<kind>_failover` from settings.yaml. Providers whose breaker is open
+    are moved to the end, so a healthy one is tried first.
+    """
+    order = [primary]
+    try:
+        from app.services.settings_file import settings_service
+        for provider in settings_service.get_general_settings().get(f"{kind}_failover") or []:
+            if provider and provider not in order:
+                order.append(provider)
+    except Exception as e:
+        print(f"[Breaker] Error loading {kind}_failover: {e}")
+    healthy = [p for p in order if breakers.get(kind, p).available()]
+    return healthy + [p for p in order if p not in healthy]
+
+
+def next_provider(kind: str, candidates: List[str], provider: str) -> Optional[str]:
+    """The next candidate after `provider` whose breaker admits calls, or None."""
+    remaining = candidates[candidates.index(provider) + 1:] if provider in candidates else candidates
+    for candidate in remaining:
+        if breakers.get(kind, candidate).available():
+            return candidate
+    return None
+
+
+@contextmanager
+def provider_call(kind: str, provider: str):
+    """Breaker check + shared rate limiter slot around one provider call."""
+    breaker = breakers.get(kind, provider)
+    breaker.before_call()
+    try:
+        with provider_limits.get(kind, provider).slot():
+            yield
+    except BaseException as e:
+        breaker.record_failure(e)
+        raise
+    else:
+        breaker.record_success()
+
+
+@asynccontextmanager
+async def provider_call_async(kind: str, provider: str):
+    breaker = breakers.get(kind, provider)
+    breaker.before_call()
+    try:
+        async with provider_limits.get(kind, provider).slot_async():
+            yield
+    except BaseException as e:
+        breaker.record_failure(e)
+        raise
+    else:
+        breaker.record_success()
@@ -4,6 +4,15 @@ Credential Encryption Service
 RSA-2048 public-key encryption for API keys and other sensitive credentials.
 Encrypted values use the prefix "ENC:" to be easily identified.
 
+Two formats:
+    ENC:<base64>                 RSA-OAEP of the value itself
+    ENC:v2:<wrapped>:<payload>   hybrid: AES-256-GCM payload, its data key
+                                 RSA-OAEP wrapped. encrypt_many() shares one
+                                 data key, so a batch costs one RSA operation.
+
+Keys are loaded once (reloaded if the .pem file changes) and `secret_vault`
+decrypts each ciphertext once, keeping the plaintext in memory.
+
 Usage:
     from app.services.crypto import encrypt, decrypt, ensure_keypair
     
@@ -12,18 +21,23 @@ Usage:
     
     # Encrypt a value
     encrypted = encrypt("my-secret-key")  # Returns "ENC:xxxxxxxx"
+    encrypted = encrypt_many(["key-1", "key-2"])  # Hybrid, one RSA operation
     
     # Decrypt a value
     decrypted = decrypt("xxxxxxxx")  # Returns "my-secret-key"
+    decrypted = secret_vault.decrypt("ENC:...")  # Cached
 """
 
 import os
 import base64
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 
 # Key file paths
@@ -34,6 +48,22 @@ PRIVATE_KEY_FILE = KEYS_DIR / "private.pem"
 
 # Encrypted value prefix
 ENC_PREFIX = "ENC:"
+# Marker of the hybrid format, after ENC_PREFIX (":" never occurs in base64)
+HYBRID_MARKER = "v2:"
+HYBRID_NONCE_BYTES = 12
+
+# Plaintexts kept by the vault (settings hold a handful of secrets)
+VAULT_MAX_ENTRIES = 256
+
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+# Parsed keys by path, with the file stamp they were loaded from
+_key_cache: Dict[Path, tuple] = {}
+_key_lock = threading.Lock()
 
 
 def ensure_keypair() -> bool:
@@ -83,73 +113,166 @@ def ensure_keypair() -> bool:
     return True
 
 
+def _cached_key(path: Path, loader):
+    """Parse a key file once; parse it again only if the file was replaced."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"{'Public' if path == PUBLIC_KEY_FILE else 'Private'} key not found: {path}")
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _key_lock:
+        cached = _key_cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    key = loader(path.read_bytes())
+    with _key_lock:
+        _key_cache[path] = (stamp, key)
+    return key
+
+
 def _load_public_key():
     """Load public key from file."""
-    if not PUBLIC_KEY_FILE.exists():
-        raise FileNotFoundError(f"Public key not found: {PUBLIC_KEY_FILE}")
-    
-    public_pem = PUBLIC_KEY_FILE.read_bytes()
-    return serialization.load_pem_public_key(public_pem, backend=default_backend())
+    return _cached_key(PUBLIC_KEY_FILE, lambda pem: serialization.load_pem_public_key(pem, backend=default_backend()))
 
 
 def _load_private_key():
     """Load private key from file."""
-    if not PRIVATE_KEY_FILE.exists():
-        raise FileNotFoundError(f"Private key not found: {PRIVATE_KEY_FILE}")
-    
-    private_pem = PRIVATE_KEY_FILE.read_bytes()
-    return serialization.load_pem_private_key(private_pem, password=None, backend=default_backend())
+    return _cached_key(PRIVATE_KEY_FILE, lambda pem: serialization.load_pem_private_key(pem, password=None, backend=default_backend()))
 
 
-def encrypt(plaintext: str) -> str:
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii')
+
+
+def encrypt(plaintext: str, hybrid: bool = False) -> str:
     """
     Encrypt a string using the public key.
     Returns the encrypted value with ENC_PREFIX.
     """
+    if hybrid:
+        return encrypt_many([plaintext])[0]
+
     public_key = _load_public_key()
     
     plaintext_bytes = plaintext.encode('utf-8')
     
-    ciphertext = public_key.encrypt(
-        plaintext_bytes,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
+    ciphertext = public_key.encrypt(plaintext_bytes, _OAEP)
     
     # Base64 encode for safe storage
-    encoded = base64.b64encode(ciphertext).decode('ascii')
-    return f"{ENC_PREFIX}{encoded}"
+    return f"{ENC_PREFIX}{_b64(ciphertext)}"
+
+
+def encrypt_many(plaintexts: List[str]) -> List[str]:
+    """
+    Hybrid-encrypt several strings under one fresh AES-256-GCM data key,
+    wrapped once with the public key (ENC:v2:<wrapped>:<nonce + ciphertext>).
+    """
+    data_key = AESGCM.generate_key(bit_length=256)
+    wrapped = _b64(_load_public_key().encrypt(data_key, _OAEP))
+    aesgcm = AESGCM(data_key)
+    results = []
+    for plaintext in plaintexts:
+        nonce = os.urandom(HYBRID_NONCE_BYTES)
+        payload = nonce + aesgcm.encrypt(nonce, plaintext.encode('utf-8'), None)
+        results.append(f"{ENC_PREFIX}{HYBRID_MARKER}{wrapped}:{_b64(payload)}")
+    return results
+
+
+def _unwrap_data_key(wrapped: str) -> bytes:
+    return _load_private_key().decrypt(base64.b64decode(wrapped), _OAEP)
+
+
+def _decrypt_hybrid(value: str, unwrap=_unwrap_data_key) -> str:
+    wrapped, _, payload = value[len(HYBRID_MARKER):].partition(":")
+    payload_bytes = base64.b64decode(payload)
+    nonce, ciphertext = payload_bytes[:HYBRID_NONCE_BYTES], payload_bytes[HYBRID_NONCE_BYTES:]
+    return AESGCM(unwrap(wrapped)).decrypt(nonce, ciphertext, None).decode('utf-8')
 
 
 def decrypt(ciphertext: str) -> str:
     """
     Decrypt a string using the private key.
-    Accepts with or without ENC_PREFIX.
+    Accepts with or without ENC_PREFIX, in either format.
     """
     # Remove prefix if present
     if ciphertext.startswith(ENC_PREFIX):
         ciphertext = ciphertext[len(ENC_PREFIX):]
+    if ciphertext.startswith(HYBRID_MARKER):
+        return _decrypt_hybrid(ciphertext)
     
     private_key = _load_private_key()
     
     # Base64 decode
     ciphertext_bytes = base64.b64decode(ciphertext)
     
-    plaintext_bytes = private_key.decrypt(
-        ciphertext_bytes,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
+    plaintext_bytes = private_key.decrypt(ciphertext_bytes, _OAEP)
     
     return plaintext_bytes.decode('utf-8')
 
 
+class SecretVault:
+    """
+    Decrypt-once cache: plaintext by ciphertext (and hybrid data keys by
+    wrapped key, so values encrypted together cost one RSA operation).
+    A ciphertext always decrypts to the same plaintext, so entries never
+    go stale; the oldest are dropped beyond VAULT_MAX_ENTRIES.
+    """
+
+    def __init__(self, max_entries: int = VAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._plaintexts: "OrderedDict[str, str]" = OrderedDict()
+        self._data_keys: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._decryptions = 0
+        self._hits = 0
+
+    def _remember(self, cache: OrderedDict, key: str, value):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+
+    def _unwrap(self, wrapped: str) -> bytes:
+        with self._lock:
+            data_key = self._data_keys.get(wrapped)
+        if data_key is None:
+            data_key = _unwrap_data_key(wrapped)
+            self._remember(self._data_keys, wrapped, data_key)
+        return data_key
+
+    def decrypt(self, ciphertext: str) -> str:
+        """Same as decrypt(), from memory after the first time. Raises on failure."""
+        with self._lock:
+            plaintext = self._plaintexts.get(ciphertext)
+            if plaintext is not None:
+                self._hits += 1
+                return plaintext
+        body = ciphertext[len(ENC_PREFIX):] if ciphertext.startswith(ENC_PREFIX) else ciphertext
+        if body.startswith(HYBRID_MARKER):
+            plaintext = _decrypt_hybrid(body, unwrap=self._unwrap)
+        else:
+            plaintext = decrypt(body)
+        self._remember(self._plaintexts, ciphertext, plaintext)
+        with self._lock:
+            self._decryptions += 1
+        return plaintext
+
+    def clear(self):
+        with self._lock:
+            self._plaintexts.clear()
+            self._data_keys.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._plaintexts),
+                "data_keys": len(self._data_keys),
+                "decryptions": self._decryptions,
+                "hits": self._hits,
+            }
+
+
 def is_encrypted(value: str) -> bool:
     """Check if a value is encrypted (has ENC: prefix)."""
     return value.startswith(ENC_PREFIX)
@@ -165,9 +288,12 @@ def decrypt_if_encrypted(value: str) -> str:
     
     if is_encrypted(value):
         try:
-            return decrypt(value)
+            return secret_vault.decrypt(value)
         except Exception as e:
             print(f"[Crypto] WARNING: Failed to decrypt value: {e}")
             return value
     
     return value
+
+
+secret_vault = SecretVault()
@@ -1,11 +1,179 @@
+import asyncio
 import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional
+
 import google.generativeai as genai
 from app.core.config import settings
 from app.services.settings_file import settings_service
 
+AUDIO_MIME_TYPES = {
+    ".wav": "audio/wav",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".flac": "audio/flac",
+    ".webm": "audio/webm",
+    ".aac": "audio/aac",
+    ".mp3": "audio/mpeg",
+}
+
+# Remote files must still be valid this long after we pick a cached handle
+EXPIRY_MARGIN = 600
+
+# Marks the end of a bridged stream in its queue
+_STREAM_END = object()
+
+
+def audio_mime_type(file_path: str) -> str:
+    return AUDIO_MIME_TYPES.get(os.path.splitext(file_path)[1].lower(), "audio/mpeg")
+
+
+class GeminiFileCache:
+    """
+    Uploaded File API handles keyed by audio sha256, so retries and
+    re-transcriptions reuse one upload. A daemon reaper deletes remote files
+    once they have been idle for `ttl` seconds (or are about to expire).
+    """
+
+    def __init__(self, ttl: float = None, reap_interval: float = None):
+        self.ttl = ttl if ttl is not None else settings.STT_GEMINI_FILE_TTL
+        self.reap_interval = reap_interval if reap_interval is not None else settings.STT_GEMINI_REAP_INTERVAL
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._upload_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.uploads = 0
+        self.reuses = 0
+        self.deleted = 0
+
+    def _usable(self, entry: Dict[str, Any]) -> bool:
+        expires = entry.get("expires_at")
+        return expires is None or expires - time.time() > EXPIRY_MARGIN
+
+    def get_or_upload(self, audio_sha256: str, file_path: str, mime_type: str):
+        with self._lock:
+            upload_lock = self._upload_locks.setdefault(audio_sha256, threading.Lock())
+        # One upload per content hash even if several jobs race for it
+        with upload_lock:
+            with self._lock:
+                entry = self._entries.get(audio_sha256)
+                if entry and self._usable(entry):
+                    entry["last_used"] = time.time()
+                    self.reuses += 1
+                    print(f"[Gemini] Reusing uploaded file {entry['file'].name}")
+                    return entry["file"]
+
+            print(f"Uploading file {file_path} to Gemini...")
+            uploaded_file = _wait_until_active(genai.upload_file(file_path, mime_type=mime_type))
+            print(f"File uploaded: {uploaded_file.name}")
+            expiration = getattr(uploaded_file, "expiration_time", None)
+            with self._lock:
+                self._entries[audio_sha256] = {
+                    "file": uploaded_file,
+                    "last_used": time.time(),
+                    "expires_at": expiration.timestamp() if isinstance(expiration, datetime) else None,
+                }
+                self.uploads += 1
+        self._ensure_reaper()
+        return uploaded_file
+
+    def discard(self, audio_sha256: str):
+        """Forget a handle the API rejected and delete it remotely (best effort)."""
+        with self._lock:
+            entry = self._entries.pop(audio_sha256, None)
+        if entry:
+            self._delete(entry["file"].name)
+
+    def _delete(self, name: str) -> bool:
+        try:
+            genai.delete_file(name)
+            with self._lock:
+                self.deleted += 1
+            return True
+        except Exception as e:
+            # Already gone (expired / deleted elsewhere) counts as done
+            if "not found" in str(e).lower() or "404" in str(e):
+                return True
+            print(f"[Gemini] Failed to delete remote file {name}: {e}")
+            return False
+
+    def reap(self, force: bool = False) -> int:
+        """Delete idle or expiring remote files. Returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            victims = [
+                (key, entry) for key, entry in self._entries.items()
+                if force or now - entry["last_used"] > self.ttl or not self._usable(entry)
+            ]
+        removed = 0
+        for key, entry in victims:
+            if self._delete(entry["file"].name):
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                        self._upload_locks.pop(key, None)
+                removed += 1
+        if removed:
+            print(f"[Gemini] Reaped {removed} uploaded file(s)")
+        return removed
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper and self._reaper.is_alive():
+                return
+            self._stop.clear()
+            self._reaper = threading.Thread(target=self._reap_loop, name="gemini-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"[Gemini] Reaper error: {e}")
+            with self._lock:
+                if not self._entries:
+                    self._reaper = None
+                    return
+
+    def shutdown(self):
+        """Stop the reaper and delete every remote file we still hold."""
+        self._stop.set()
+        if self._entries:
+            self.reap(force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "uploads": self.uploads,
+                "reuses": self.reuses,
+                "deleted": self.deleted,
+            }
+
+
+def _wait_until_active(uploaded_file, timeout: float = 60.0):
+    """Audio is usually ACTIVE immediately; longer files may sit in PROCESSING briefly."""
+    deadline = time.monotonic() + timeout
+    while getattr(getattr(uploaded_file, "state", None), "name", "ACTIVE") == "PROCESSING":
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Gemini file {uploaded_file.name} is still processing")
+        time.sleep(1)
+        uploaded_file = genai.get_file(uploaded_file.name)
+    if getattr(getattr(uploaded_file, "state", None), "name", "ACTIVE") == "FAILED":
+        raise RuntimeError(f"Gemini could not process file {uploaded_file.name}")
+    return uploaded_file
+
+
 class GeminiService:
     def __init__(self):
         self._configure()
+        self.files = GeminiFileCache()
 
     def _configure(self):
         # Prefer dynamic settings, fallback to config
@@ -25,32 +193,36 @@ class GeminiService:
             pass
         return settings.GEMINI_API_KEY
 
+    def _audio_part(self, file_path: str):
+        """
+        Inline bytes for small clips (no File API round trip), otherwise a
+        cached File API handle. Returns (part, audio_sha256 or None).
+        """
+        mime_type = audio_mime_type(file_path)
+        if os.path.getsize(file_path) <= settings.STT_GEMINI_INLINE_MAX_BYTES:
+            with open(file_path, "rb") as f:
+                return {"mime_type": mime_type, "data": f.read()}, None
+
+        from app.services.transcription_cache import hash_file
+        audio_sha256 = hash_file(file_path)
+        return self.files.get_or_upload(audio_sha256, file_path, mime_type), audio_sha256
+
     def transcribe(self, file_path: str, model_name: str = "gemini-1.5-flash", prompt: str = None) -> str:
         """
-        Transcribes audio using Gemini 1.5 Flash.
-        Uploads file to Google AI Studio, generates content, then deletes file?
-        Note: Files uploaded to File API are temporary but should be managed.
+        Transcribes audio with Gemini.
+        Small clips are sent inline; larger ones go through the File API, whose
+        handles are reused by content hash and deleted by the reaper when idle.
         """
+        audio_sha256 = None
         try:
-            print(f"Uploading file {file_path} to Gemini...")
-            # Determine mime type
-            mime_type = "audio/mpeg"
-            if file_path.endswith(".wav"): mime_type = "audio/wav"
-            elif file_path.endswith(".m4a"): mime_type = "audio/mp4"
-
-            uploaded_file = genai.upload_file(file_path, mime_type=mime_type)
-            print(f"File uploaded: {uploaded_file.name}")
+            audio_part, audio_sha256 = self._audio_part(file_path)
 
             model = genai.GenerativeModel(model_name)
             
             # Use provided prompt or default
             final_prompt = prompt if prompt else "Transcribe the following audio file verbatim. Do not add any commentary or markdown formatting unless requested. Just the text."
             
-            response = model.generate_content([final_prompt, uploaded_file])
-            
-            # Cleanup? (Wait for processing? upload_file handles waiting for processing state?)
-            # genai.upload_file returns partially processed file maybe?
-            # Usually for audio it's fast. Video needs processing.
+            response = model.generate_content([final_prompt, audio_part])
             
             # Safety check for empty response
             if response.candidates and response.parts:
@@ -64,6 +236,9 @@ class GeminiService:
             # If it's the specific safe accessor error, handle it
             if "quick accessor requires the response" in str(e):
                 return ""
+            # The handle may be stale (deleted/expired remotely): upload afresh next time
+            if audio_sha256 and any(code in str(e) for code in ("403", "404", "PERMISSION_DENIED", "NOT_FOUND")):
+                self.files.discard(audio_sha256)
             raise e
 
     def stream_chat(self, messages: list, model_name: str = "gemini-1.5-flash"):
@@ -119,6 +294,50 @@ class GeminiService:
             print(f"Gemini Chat Error: {e}")
             raise e
 
+    async def stream_chat_async(self, messages: list, model_name: str = "gemini-1.5-flash") -> AsyncIterator[str]:
+        """
+        `stream_chat` for code on the event loop. The SDK stream is blocking, so
+        it runs on its own thread and hands chunks over through an asyncio.Queue;
+        the loop only waits on the queue, and concurrent generations interleave.
+        Stopping early (client disconnect) makes the thread stop after its current chunk.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def _emit(item) -> bool:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+                return True
+            except RuntimeError:
+                # Loop closed while the stream was still running: nobody is listening
+                return False
+
+        def _produce():
+            stream = self.stream_chat(messages, model_name)
+            try:
+                for chunk in stream:
+                    if stop.is_set() or not _emit(chunk):
+                        return
+                _emit(_STREAM_END)
+            except Exception as e:
+                _emit(e)
+            finally:
+                stream.close()
+
+        # A thread per stream: long generations must not hold the shared default executor
+        threading.Thread(target=_produce, name="gemini-stream", daemon=True).start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
     def complete_chat(self, messages: list, model_name: str = "gemini-1.5-flash") -> str:
         """
         Non-streaming chat completion.
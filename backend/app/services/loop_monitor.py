@@ -0,0 +1,82 @@
+"""
+Event Loop Lag Monitor
+
+Measures how late the API event loop wakes up: a background task sleeps for
+LOOP_LAG_INTERVAL and records how much longer than that it actually took.
+Blocking calls on the loop (sync SDK calls, file I/O, CPU work) show up
+directly as lag, which delays every WebSocket send and streamed response
+served by the process.
+
+Usage:
+    from app.services.loop_monitor import loop_monitor
+
+    loop_monitor.start()          # on startup, inside the running loop
+    loop_monitor.stats()          # {"samples": 600, "p50_ms": 0.3, "p99_ms": 12.5, "max_ms": 48.0, ...}
+    loop_monitor.reset()
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Seconds between wake-ups (lag resolution), and samples kept (5 minutes)
+LOOP_LAG_INTERVAL = 0.1
+LOOP_LAG_WINDOW = 3000
+
+
+def _percentile(ordered, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, window: int = LOOP_LAG_WINDOW):
+        self.interval = interval
+        self._samples = deque(maxlen=window)
+        self._max = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            with self._lock:
+                self._samples.append(lag)
+                self._max = max(self._max, lag)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._samples)
+            peak = self._max
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "samples": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(peak * 1000, 3),
+        }
+
+
+loop_monitor = LoopLagMonitor()
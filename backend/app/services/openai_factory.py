@@ -1,15 +1,255 @@
-from openai import OpenAI, AzureOpenAI
+"""
+Provider clients (OpenAI / Azure OpenAI, sync and async).
+
+Clients are long-lived and shared: `client_registry` keeps one per config
+fingerprint (provider, endpoint, key hash, API version, timeouts), each with
+its own keep-alive connection pool, so calls reuse open TCP/TLS connections
+instead of handshaking every time. A client is replaced only when the
+resolved settings change (settings.yaml saved or edited); the replaced client
+is retired and closed CLIENT_RETIRE_SECONDS later, once requests still using
+it have finished (or at shutdown).
+
+Usage:
+    from app.services.openai_factory import get_openai_client, get_async_openai_client
+    client = get_openai_client("stt")                 # do not close: shared
+    client = get_async_openai_client("llm", "azure")  # per event loop
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from openai import OpenAI, AzureOpenAI, AsyncOpenAI, AsyncAzureOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
 from app.core.config import settings
 import re
 from app.core.logging import log_safe
 
-def get_openai_client(service_type: str = "llm"):
+# Timeout of the request sent to open connections at startup
+PREWARM_TIMEOUT = 10.0
+
+def get_openai_client(service_type: str = "llm", provider: str = None):
     """
     Factory to return either standard OpenAI client or AzureOpenAI client
-    based on configuration.
+    based on configuration. The client is shared: don't close it.
     
     Args:
         service_type: "llm" or "stt"
+        provider: "openai" / "azure" to override the configured provider (failover)
+    """
+    return client_registry.get(service_type, provider)
+
+def get_async_openai_client(service_type: str = "llm", provider: str = None):
+    """
+    Async variant of get_openai_client (AsyncOpenAI / AsyncAzureOpenAI)
+    for code running on the event loop. Shared per event loop: don't close it.
+    """
+    return client_registry.get_async(service_type, provider)
+
+
+def _fingerprint(kind: str, client_args: Dict[str, Any]) -> str:
+    # Secrets only enter the hash; the key itself never holds them
+    payload = json.dumps([kind, client_args], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.CLIENT_MAX_KEEPALIVE,
+        keepalive_expiry=settings.CLIENT_KEEPALIVE_EXPIRY,
+    )
+
+
+class ClientRegistry:
+    """
+    Shared provider clients keyed by config fingerprint.
+
+    Resolved settings are cached per (service_type, provider) and re-resolved
+    only when settings.yaml changes (or after invalidate()). Async clients are
+    bound to the event loop that created them (httpx pools can't cross
+    loops), so they are kept per loop and dropped with it.
+
+    When a key resolves to a new fingerprint, the clients of the old one are
+    retired: no longer handed out, and closed `retire_after` seconds later
+    (async ones on their own loop), so requests in flight can finish first.
+    """
+
+    def __init__(self, retire_after: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._resolved: Dict[Tuple[str, Optional[str]], tuple] = {}
+        self._clients: Dict[str, Any] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        # (close after, loop or None for sync, client)
+        self._retired: List[Tuple[float, Optional[asyncio.AbstractEventLoop], Any]] = []
+        self._retire_after = retire_after
+        self._created = 0
+        self._reused = 0
+        self._closed = 0
+
+    def _resolve(self, service_type: str, provider: Optional[str]):
+        """(kind, client_args, fingerprint), cached until settings.yaml changes."""
+        from app.services.settings_file import settings_service
+        version = settings_service.version()
+        key = (service_type, provider)
+        with self._lock:
+            cached = self._resolved.get(key)
+        if cached and cached[0] == version:
+            return cached[1:]
+        kind, client_args = _build_client_args(service_type, provider)
+        resolved = (kind, client_args, _fingerprint(kind, client_args))
+        with self._lock:
+            self._resolved[key] = (version,) + resolved
+            if cached and cached[3] != resolved[2]:
+                self._retire(cached[3])
+        return resolved
+
+    def _retire(self, fingerprint: str):
+        """Move the clients of a fingerprint no key resolves to any more to the retired list (lock held)."""
+        if any(entry[3] == fingerprint for entry in self._resolved.values()):
+            return
+        retire_after = self._retire_after if self._retire_after is not None else settings.CLIENT_RETIRE_SECONDS
+        close_at = time.monotonic() + retire_after
+        client = self._clients.pop(fingerprint, None)
+        if client is not None:
+            self._retired.append((close_at, None, client))
+        for loop, clients in list(self._async_clients.items()):
+            client = clients.pop(fingerprint, None)
+            if client is not None:
+                self._retired.append((close_at, loop, client))
+
+    def _close_retired(self, force: bool = False):
+        """Close retired clients whose grace period is over (all of them with force)."""
+        now = time.monotonic()
+        with self._lock:
+            if not self._retired or (not force and min(r[0] for r in self._retired) > now):
+                return
+            due = [r for r in self._retired if force or r[0] <= now]
+            self._retired = [r for r in self._retired if not (force or r[0] <= now)]
+            self._closed += len(due)
+        for _, loop, client in due:
+            try:
+                if loop is None:
+                    client.close()
+                elif not loop.is_closed():
+                    # httpx async pools must be closed on the loop that owns them
+                    asyncio.run_coroutine_threadsafe(client.close(), loop)
+            except Exception as e:
+                print(f"[Clients] Closing a retired client failed: {e}")
+
+    def get(self, service_type: str = "llm", provider: str = None):
+        kind, client_args, fingerprint = self._resolve(service_type, provider)
+        self._close_retired()
+        with self._lock:
+            client = self._clients.get(fingerprint)
+            if client is not None:
+                self._reused += 1
+                return client
+            http_client = DefaultHttpxClient(limits=_pool_limits())
+            client = (AzureOpenAI if kind == "azure" else OpenAI)(**client_args, http_client=http_client)
+            self._clients[fingerprint] = client
+            self._created += 1
+        print(f"[Clients] New {kind} client for {service_type}")
+        return client
+
+    def get_async(self, service_type: str = "llm", provider: str = None):
+        loop = asyncio.get_running_loop()
+        kind, client_args, fingerprint = self._resolve(service_type, provider)
+        self._close_retired()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(fingerprint)
+            if client is not None:
+                self._reused += 1
+                return client
+            http_client = DefaultAsyncHttpxClient(limits=_pool_limits())
+            client = (AsyncAzureOpenAI if kind == "azure" else AsyncOpenAI)(**client_args, http_client=http_client)
+            clients[fingerprint] = client
+            self._created += 1
+        print(f"[Clients] New async {kind} client for {service_type}")
+        return client
+
+    def invalidate(self):
+        """
+        Re-resolve the settings on the next call (call after settings change).
+        Clients whose settings changed are retired; the others are kept.
+        """
+        with self._lock:
+            for key, entry in self._resolved.items():
+                self._resolved[key] = (None,) + entry[1:]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "async_clients": sum(len(c) for c in self._async_clients.values()),
+                "retired": len(self._retired),
+                "created": self._created,
+                "reused": self._reused,
+                "closed": self._closed,
+            }
+
+    def _targets(self, service_types):
+        # Selected provider of each service (as in _build_client_args); Gemini has its own SDK
+        from app.services.settings_file import settings_service
+        try:
+            user_settings = settings_service.get_general_settings()
+        except Exception:
+            user_settings = {}
+        for service_type in service_types:
+            provider = user_settings.get(f"{service_type}_provider") or (
+                settings.LLM_PROVIDER if service_type == "llm" else settings.STT_PROVIDER)
+            if provider in ("openai", "azure"):
+                yield service_type, provider
+
+    def prewarm(self, service_types=("stt", "llm")):
+        """Open connections of the sync clients (any HTTP response will do)."""
+        for service_type, provider in self._targets(service_types):
+            try:
+                self.get(service_type, provider).with_options(timeout=PREWARM_TIMEOUT).models.list()
+                print(f"[Clients] Pre-warmed {service_type} connection to {provider}")
+            except Exception as e:
+                print(f"[Clients] Pre-warm of {service_type} ({provider}) failed: {e}")
+
+    async def prewarm_async(self, service_types=("llm",)):
+        """Open connections of the async clients on the running loop."""
+        for service_type, provider in self._targets(service_types):
+            try:
+                await self.get_async(service_type, provider).with_options(timeout=PREWARM_TIMEOUT).models.list()
+                print(f"[Clients] Pre-warmed async {service_type} connection to {provider}")
+            except Exception as e:
+                print(f"[Clients] Pre-warm of {service_type} ({provider}) failed: {e}")
+
+    def close(self):
+        """Close the sync clients and every retired client (shutdown)."""
+        self._close_retired(force=True)
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._resolved.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    async def aclose(self):
+        """Close the async clients of the running loop (shutdown)."""
+        with self._lock:
+            clients = list(self._async_clients.pop(asyncio.get_running_loop(), {}).values())
+        for client in clients:
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+
+def _build_client_args(service_type: str, provider_override: str = None):
+    """
+    Resolve provider settings into ("azure" | "openai", constructor kwargs).
     """
     
     
@@ -27,9 +267,13 @@ def get_openai_client(service_type: str = "llm"):
         provider = user_settings.get("llm_provider")
     elif service_type == "stt" and user_settings.get("stt_provider"):
         provider = user_settings.get("stt_provider")
+    if provider_override:
+        provider = provider_override
 
     timeout = settings.LLM_TIMEOUT if service_type == "llm" else settings.STT_TIMEOUT
-    max_retries = settings.LLM_MAX_RETRIES if service_type == "llm" else settings.STT_MAX_RETRIES
+    # Retries (with shared rate limiting and Retry-After) are done by our own loops;
+    # SDK-level retries on top of them would multiply attempts
+    max_retries = 0
     
     # --- OpenAI Params ---
     openai_api_key = user_settings.get("openai_api_key")
@@ -96,7 +340,7 @@ def get_openai_client(service_type: str = "llm"):
         else:
              raise ValueError("Azure OpenAI selected but API Key or AD Token is missing. Please check your Settings.")
              
-        return AzureOpenAI(**client_args)
+        return "azure", client_args
 
     else:
         # Standard OpenAI
@@ -112,4 +356,7 @@ def get_openai_client(service_type: str = "llm"):
         elif service_type == "llm" and settings.LLM_OPENAI_API_URL:
             client_args["base_url"] = settings.LLM_OPENAI_API_URL
 
-        return OpenAI(**client_args)
+        return "openai", client_args
+
+
+client_registry = ClientRegistry()
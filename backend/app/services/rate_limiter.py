@@ -0,0 +1,224 @@
+"""
+Provider Rate Limiter
+
+One limiter per (endpoint type, provider), shared by every caller in the
+process: the STT worker pool, the async engine, streaming transcription and
+the LLM endpoints.
+
+- Token bucket (`rps` / `burst`) paces request starts.
+- An AIMD concurrency window caps in-flight calls: +1/window per success,
+  halved on a 429.
+- A 429's `Retry-After` pauses the whole provider, not just the caller that saw it.
+
+Retries are owned by our loops (the SDK clients are created with
+`max_retries=0`); they sleep `backoff_delay(attempt, error)`, which uses full
+jitter and never less than the server's Retry-After.
+
+Usage:
+    from app.services.rate_limiter import provider_limits, backoff_delay
+
+    with provider_limits.get("stt", "azure").slot():
+        client.audio.transcriptions.create(...)
+
+    async with provider_limits.get("llm", "openai").slot_async():
+        await client.chat.completions.create(...)
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+DEFAULT_LIMITS = {"rps": 5.0, "burst": 10, "concurrency": 8}
+
+# Poll interval while waiting for a concurrency slot (randomised to avoid lockstep wakeups)
+SLOT_POLL_INTERVAL = 0.05
+
+
+def retry_after_seconds(error: Optional[BaseException]) -> Optional[float]:
+    """Retry-After (seconds or HTTP date, or retry-after-ms) from an SDK error's response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value)
+            return max(0.0, parsed.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(error: BaseException) -> bool:
+    """True for provider rate-limit responses (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    return type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def backoff_delay(attempt: int, error: BaseException = None) -> float:
+    """
+    Full-jitter exponential backoff for retry `attempt` (0-based),
+    raised to the server's Retry-After when it sent one.
+    """
+    ceiling = min(settings.RATE_LIMIT_BACKOFF_MAX, settings.RATE_LIMIT_BACKOFF_BASE * (2 ** attempt))
+    delay = random.uniform(ceiling / 2, ceiling)
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, 0.5))
+    return delay
+
+
+class ProviderLimiter:
+    """Token bucket + AIMD concurrency window for one provider endpoint."""
+
+    def __init__(self, name: str, rps: float, burst: int, concurrency: int):
+        self.name = name
+        self.rps = max(0.01, float(rps))
+        self.burst = max(1, int(burst))
+        self.max_concurrency = max(1, int(concurrency))
+        self.window = float(self.max_concurrency)
+        self.tokens = float(self.burst)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.requests = 0
+        self.waited = 0.0
+
+    def _try_acquire(self) -> float:
+        """Take a slot and a token now (returns 0) or return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.window):
+                return SLOT_POLL_INTERVAL * random.uniform(1, 2)
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rps)
+            self._refilled_at = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rps
+            self.tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            return 0.0
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                break
+            time.sleep(wait)
+        self._record_wait(time.monotonic() - started)
+
+    async def acquire_async(self):
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+        self._record_wait(time.monotonic() - started)
+
+    def _record_wait(self, waited: float):
+        if waited > 0:
+            with self._lock:
+                self.waited += waited
+
+    def release(self, error: BaseException = None):
+        with self._lock:
+            self.in_flight -= 1
+            if error is not None and is_throttled(error):
+                # Multiplicative decrease, and hold everyone back for Retry-After
+                self.throttled += 1
+                self.window = max(1.0, self.window / 2)
+                pause = retry_after_seconds(error)
+                if pause:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+                print(f"[RateLimit] {self.name} throttled: window -> {int(self.window)}"
+                      + (f", pausing {pause:.1f}s" if pause else ""))
+            elif error is None:
+                # Additive increase: about +1 per window of successful calls
+                self.window = min(float(self.max_concurrency), self.window + 1 / self.window)
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.release(error)
+
+    @asynccontextmanager
+    async def slot_async(self):
+        await self.acquire_async()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.release(error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rps": self.rps,
+                "burst": self.burst,
+                "max_concurrency": self.max_concurrency,
+                "window": int(self.window),
+                "in_flight": self.in_flight,
+                "tokens": round(self.tokens, 2),
+                "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited, 2),
+            }
+
+
+class ProviderLimits:
+    """Registry of limiters keyed by (kind, provider); kind is "stt" or "llm"."""
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, provider: str) -> ProviderLimiter:
+        key = (kind, provider)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                conf = {**DEFAULT_LIMITS, **((settings.RATE_LIMITS.get(kind) or {}).get(provider) or {})}
+                limiter = ProviderLimiter(f"{kind}:{provider}", conf["rps"], conf["burst"], conf["concurrency"])
+                self._limiters[key] = limiter
+            return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = list(self._limiters.items())
+        result: Dict[str, Any] = {}
+        for (kind, provider), limiter in limiters:
+            result.setdefault(kind, {})[provider] = limiter.stats()
+        return result
+
+
+provider_limits = ProviderLimits()
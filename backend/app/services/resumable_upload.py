@@ -0,0 +1,252 @@
+"""
+Resumable Audio Uploads
+
+Large recordings are sent as create -> PATCH chunks at byte offsets -> finalize.
+Bytes are appended to `<root>/<upload_id>.part` as they arrive, so when a
+connection drops mid-chunk everything received so far is kept; the client asks
+for the current offset and re-sends only the rest. Upload metadata lives in a
+`<upload_id>.json` sidecar, so an upload survives a backend restart.
+
+The sha256 of the audio is computed on the fly while bytes are written and is
+only rebuilt from the partial file when the in-memory state is missing (after
+a restart) - the finished file is never read back just to hash it.
+
+Usage:
+    from app.services.resumable_upload import resumable_uploads
+
+    upload = resumable_uploads.create("memo.webm", size=94371840, session_id=None)
+    offset = await resumable_uploads.append(upload["id"], 0, request.stream())
+    path, sha256, size = resumable_uploads.complete(upload["id"], "/data/<session>/audio/x.webm")
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# Request body chunks are collected up to this size before each threaded write
+APPEND_BATCH_BYTES = 1024 * 1024
+
+
+class UploadNotFound(Exception):
+    def __init__(self, upload_id: str):
+        super().__init__(f"Upload {upload_id} not found (expired or already finalized)")
+        self.upload_id = upload_id
+
+
+class UploadOffsetMismatch(Exception):
+    """The client's offset differs from the bytes stored; it should resume from `offset`."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload offset mismatch: server has {offset} bytes")
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadIncomplete(Exception):
+    def __init__(self, offset: int, size: int):
+        super().__init__(f"Upload incomplete: {offset}/{size} bytes received")
+        self.offset = offset
+        self.size = size
+
+
+class UploadChecksumMismatch(Exception):
+    pass
+
+
+def _write_chunks(f, hasher, chunks):
+    for chunk in chunks:
+        f.write(chunk)
+        hasher.update(chunk)
+
+
+def _hash_prefix(path: str, length: int):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(1024 * 1024, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+class ResumableUploads:
+    def __init__(self, root: str):
+        self.root = root
+        # upload_id -> (offset covered, running sha256)
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, f"{upload_id}.json")
+
+    def _read_meta(self, upload_id: str) -> Dict[str, Any]:
+        # Ids are server-generated uuids; anything else never names a file
+        try:
+            uuid.UUID(upload_id)
+            with open(self._meta_path(upload_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            raise UploadNotFound(upload_id)
+
+    def _upload_lock(self, upload_id: str) -> asyncio.Lock:
+        with self._lock:
+            return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    def _forget(self, upload_id: str):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+
+    def _hasher(self, upload_id: str, offset: int):
+        with self._lock:
+            state = self._hashers.get(upload_id)
+        if state and state[0] == offset:
+            return state[1]
+        # Restarted (or another process wrote the bytes): rebuild from the partial file once
+        digest = _hash_prefix(self._part_path(upload_id), offset)
+        with self._lock:
+            self._hashers[upload_id] = (offset, digest)
+        return digest
+
+    def create(self, filename: str, size: Optional[int] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        if size is not None and (size < 0 or size > settings.UPLOAD_MAX_BYTES):
+            raise UploadTooLarge(f"Upload size {size} exceeds the limit of {settings.UPLOAD_MAX_BYTES} bytes")
+        os.makedirs(self.root, exist_ok=True)
+        self.prune()
+        upload_id = str(uuid.uuid4())
+        meta = {
+            "id": upload_id,
+            "filename": filename or "",
+            "size": size,
+            "session_id": session_id,
+            "created_at": time.time(),
+        }
+        open(self._part_path(upload_id), "wb").close()
+        with open(self._meta_path(upload_id), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        with self._lock:
+            self._hashers[upload_id] = (0, hashlib.sha256())
+        return {**meta, "offset": 0}
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        try:
+            offset = os.path.getsize(self._part_path(upload_id))
+        except OSError:
+            raise UploadNotFound(upload_id)
+        return {**meta, "offset": offset}
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Append the request body at `offset`; returns the new offset. Bytes written
+        before a disconnect stay stored (the exception propagates). Writing and
+        hashing run in a worker thread, in batches of up to APPEND_BATCH_BYTES.
+        """
+        async with self._upload_lock(upload_id):
+            meta = self._read_meta(upload_id)
+            part_path = self._part_path(upload_id)
+            current = os.path.getsize(part_path)
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+            limit = meta["size"] if meta.get("size") is not None else settings.UPLOAD_MAX_BYTES
+            hasher = await asyncio.to_thread(self._hasher, upload_id, current)
+            written = current
+            pending, pending_bytes = [], 0
+            try:
+                with open(part_path, "ab") as f:
+                    try:
+                        async for chunk in chunks:
+                            if not chunk:
+                                continue
+                            if written + pending_bytes + len(chunk) > limit:
+                                raise UploadTooLarge(f"Upload exceeds {limit} bytes")
+                            pending.append(chunk)
+                            pending_bytes += len(chunk)
+                            if pending_bytes >= APPEND_BATCH_BYTES:
+                                await asyncio.to_thread(_write_chunks, f, hasher, pending)
+                                written += pending_bytes
+                                pending, pending_bytes = [], 0
+                    finally:
+                        if pending:
+                            await asyncio.to_thread(_write_chunks, f, hasher, pending)
+                            written += pending_bytes
+            finally:
+                with self._lock:
+                    self._hashers[upload_id] = (written, hasher)
+                os.utime(self._meta_path(upload_id))
+            return written
+
+    def verify(self, upload_id: str, expected_sha256: Optional[str] = None) -> Tuple[str, int]:
+        """
+        (sha256, size) of a finished upload; raises UploadIncomplete / UploadChecksumMismatch.
+        The upload is left in place either way.
+        """
+        meta = self._read_meta(upload_id)
+        offset = os.path.getsize(self._part_path(upload_id))
+        if meta.get("size") is not None and offset != meta["size"]:
+            raise UploadIncomplete(offset, meta["size"])
+        sha256 = self._hasher(upload_id, offset).hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            # Keep the upload: the client may have sent the wrong digest, or can abort it itself
+            raise UploadChecksumMismatch(f"sha256 mismatch: expected {expected_sha256}, received {sha256}")
+        return sha256, offset
+
+    def complete(self, upload_id: str, target_path: str, expected_sha256: Optional[str] = None) -> Tuple[str, str, int]:
+        """Move the finished file to `target_path`; returns (path, sha256, size)."""
+        sha256, size = self.verify(upload_id, expected_sha256)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.replace(self._part_path(upload_id), target_path)
+        os.remove(self._meta_path(upload_id))
+        self._forget(upload_id)
+        return target_path, sha256, size
+
+    def abort(self, upload_id: str):
+        self._read_meta(upload_id)
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._forget(upload_id)
+
+    def prune(self) -> int:
+        """Delete uploads idle for longer than UPLOAD_EXPIRE_SECONDS."""
+        cutoff = time.time() - settings.UPLOAD_EXPIRE_SECONDS
+        removed = 0
+        for meta_path in glob.glob(os.path.join(self.root, "*.json")):
+            upload_id = os.path.splitext(os.path.basename(meta_path))[0]
+            try:
+                part_path = self._part_path(upload_id)
+                last_write = max(os.path.getmtime(meta_path),
+                                 os.path.getmtime(part_path) if os.path.exists(part_path) else 0)
+                if last_write >= cutoff:
+                    continue
+                for path in (part_path, meta_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._forget(upload_id)
+                removed += 1
+            except OSError as e:
+                print(f"[Upload] Could not prune upload {upload_id}: {e}")
+        if removed:
+            print(f"[Upload] Pruned {removed} expired upload(s)")
+        return removed
+
+
+resumable_uploads = ResumableUploads(os.path.join("/data", "uploads"))
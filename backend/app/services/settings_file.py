@@ -1,19 +1,103 @@
-
+import copy
+import tempfile
+import threading
+import time
 import yaml
 import os
-from typing import List, Dict, Optional, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows: writes are serialised within this process only
+    fcntl = None
+
 # Path to the data directory. Assuming app is running from backend root or similar.
 # We'll try to resolve it relative to this file.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 SETTINGS_FILE = BASE_DIR / "data" / "settings.yaml"
 
+# Reads within this many seconds of the last check trust the in-memory copy
+# without stat()ing settings.yaml (edits by other processes show up after it)
+SETTINGS_CHECK_INTERVAL = 1.0
+# Mutations arriving within this window are applied together in one rewrite
+SETTINGS_WRITE_BATCH_SECONDS = 0.02
+
+
+class _PendingMutation:
+    __slots__ = ("apply", "result", "error", "done")
+
+    def __init__(self, apply: Callable[[Dict[str, Any]], Tuple[Any, bool]]):
+        self.apply = apply
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+
+class _FileLock:
+    """Exclusive flock on a side file, so writers in other processes (workers) queue up too."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
 class SettingsFileService:
-    def __init__(self, file_path: Path = SETTINGS_FILE):
+    """
+    settings.yaml store. The parsed file (and the decrypted general settings)
+    is kept in memory and reloaded only when the file's inode / mtime / size
+    changes; writes through this service update the copy directly.
+
+    Mutations go through one writer at a time (a thread lock plus an flock on
+    settings.yaml.lock for other processes), are applied to the latest file
+    contents and written atomically (temp file + fsync + rename). Mutations
+    queued while a write is pending share the next rewrite.
+
+    Getters return copies, so callers may modify what they get back without
+    touching the cached snapshot.
+    """
+
+    def __init__(self, file_path: Path = SETTINGS_FILE, check_interval: float = SETTINGS_CHECK_INTERVAL,
+                 batch_window: float = SETTINGS_WRITE_BATCH_SECONDS):
         self.file_path = file_path
+        self.lock_path = file_path.with_name(file_path.name + ".lock")
+        self.check_interval = check_interval
+        self.batch_window = batch_window
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: List[_PendingMutation] = []
+        self._writes = 0
+        self._mutations = 0
+        self._data: Optional[Dict[str, Any]] = None
+        self._general: Optional[Dict[str, Any]] = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._version = 0
+        self._reloads = 0
+        self._hits = 0
 
-    def _read_yaml(self) -> Dict[str, Any]:
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load_yaml(self) -> Dict[str, Any]:
         if not self.file_path.exists():
             return {"templates": [], "vocabulary": [], "system_prompts": {}}
         try:
@@ -23,100 +107,220 @@ class SettingsFileService:
             print(f"Error reading settings.yaml: {e}")
             return {"templates": [], "vocabulary": [], "system_prompts": {}}
 
+    def _snapshot(self, force_check: bool = False) -> Dict[str, Any]:
+        """Parsed settings.yaml, reloaded only if the file changed since the last load."""
+        now = time.monotonic()
+        with self._lock:
+            if self._data is not None and not force_check and now - self._checked_at < self.check_interval:
+                self._hits += 1
+                return self._data
+            stamp = self._file_stamp()
+            self._checked_at = now
+            if self._data is not None and stamp == self._stamp:
+                self._hits += 1
+                return self._data
+            self._data = self._load_yaml()
+            self._general = None
+            self._stamp = stamp
+            self._version += 1
+            self._reloads += 1
+            return self._data
+
     def _write_yaml(self, data: Dict[str, Any]):
+        """Atomically replace settings.yaml (callers hold the writer locks)."""
+        tmp_path = None
         try:
             # Ensure directory exists
             self.file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.file_path, "w", encoding="utf-8") as f:
+            fd, tmp_path = tempfile.mkstemp(dir=self.file_path.parent, prefix=f".{self.file_path.name}.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
                 yaml.safe_dump(data, f, allow_unicode=True, default_flow_style=False)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates 0600: keep the existing file's mode (0644 for a new one, as before)
+            mode = os.stat(self.file_path).st_mode & 0o777 if self.file_path.exists() else 0o644
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.file_path)
+            tmp_path = None
+            self._fsync_dir()
         except Exception as e:
             print(f"Error writing settings.yaml: {e}")
             raise e
+        finally:
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._data = data
+            self._general = None
+            self._stamp = self._file_stamp()
+            self._checked_at = time.monotonic()
+            self._version += 1
+            self._writes += 1
+
+    def _fsync_dir(self):
+        # Make the rename itself durable (not supported on every platform)
+        try:
+            fd = os.open(self.file_path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _mutate(self, apply: Callable[[Dict[str, Any]], Tuple[Any, bool]]):
+        """
+        Run `apply(data) -> (result, changed)` on the current settings and
+        persist them. Whoever gets the writer lock first waits batch_window,
+        then applies every queued mutation in order and writes once.
+        """
+        pending = _PendingMutation(apply)
+        with self._lock:
+            self._pending.append(pending)
+        with self._write_lock:
+            if not pending.done:
+                if self.batch_window > 0:
+                    time.sleep(self.batch_window)
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                self._commit(batch)
+        if pending.error is not None:
+            raise pending.error
+        # Results usually point into the new snapshot (e.g. the updated "general" dict)
+        return copy.deepcopy(pending.result)
+
+    def _commit(self, batch: List[_PendingMutation]):
+        try:
+            with self._file_lock():
+                # Latest contents, including writes by other processes
+                data = copy.deepcopy(self._snapshot(force_check=True))
+                changed = False
+                for pending in batch:
+                    try:
+                        pending.result, mutated = pending.apply(data)
+                        changed = changed or mutated
+                    except Exception as e:
+                        pending.error = e
+                if changed:
+                    self._write_yaml(data)
+                with self._lock:
+                    self._mutations += len(batch)
+        except Exception as e:
+            for pending in batch:
+                pending.error = pending.error or e
+        finally:
+            for pending in batch:
+                pending.done = True
+
+    def _file_lock(self):
+        return _FileLock(self.lock_path)
+
+    def version(self) -> int:
+        """Changes whenever the settings change (write here or edit of the file)."""
+        self._snapshot()
+        return self._version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.file_path),
+                "version": self._version,
+                "reloads": self._reloads,
+                "cache_hits": self._hits,
+                "check_interval": self.check_interval,
+                "mutations": self._mutations,
+                "writes": self._writes,
+            }
 
     # --- Templates ---
     def get_templates(self) -> List[Dict[str, Any]]:
-        data = self._read_yaml()
-        return data.get("templates", [])
+        return copy.deepcopy(self._snapshot().get("templates", []))
 
     def add_template(self, template: Dict[str, Any]):
-        data = self._read_yaml()
-        if "templates" not in data:
-            data["templates"] = []
-        # Check if exists (update if id matches? or just append?)
-        # For simplicity, if ID exists, update.
-        existing = next((t for t in data["templates"] if t.get("id") == template.get("id")), None)
-        if existing:
-            existing.update(template)
-        else:
-            data["templates"].append(template)
-        self._write_yaml(data)
-        return template
+        def apply(data):
+            if "templates" not in data:
+                data["templates"] = []
+            # Check if exists (update if id matches? or just append?)
+            # For simplicity, if ID exists, update.
+            existing = next((t for t in data["templates"] if t.get("id") == template.get("id")), None)
+            if existing:
+                existing.update(template)
+            else:
+                data["templates"].append(template)
+            return template, True
+        return self._mutate(apply)
 
     def update_template(self, template_id: str, updates: Dict[str, Any]):
-        data = self._read_yaml()
-        templates = data.get("templates", [])
-        for t in templates:
-            if t.get("id") == template_id:
-                t.update(updates)
-                self._write_yaml(data)
-                return t
-        return None
+        def apply(data):
+            templates = data.get("templates", [])
+            for t in templates:
+                if t.get("id") == template_id:
+                    t.update(updates)
+                    return t, True
+            return None, False
+        return self._mutate(apply)
 
     def delete_template(self, template_id: str):
-        data = self._read_yaml()
-        templates = data.get("templates", [])
-        data["templates"] = [t for t in templates if t.get("id") != template_id]
-        self._write_yaml(data)
+        def apply(data):
+            templates = data.get("templates", [])
+            data["templates"] = [t for t in templates if t.get("id") != template_id]
+            return None, True
+        self._mutate(apply)
 
     # --- Vocabulary ---
     def get_vocabulary(self) -> List[Dict[str, Any]]:
-        data = self._read_yaml()
-        return data.get("vocabulary", [])
+        return copy.deepcopy(self._snapshot().get("vocabulary", []))
 
     def add_vocabulary_item(self, item: Dict[str, Any]):
-        data = self._read_yaml()
-        if "vocabulary" not in data:
-            data["vocabulary"] = []
-        # Simple append, generic ID check
-        existing = next((v for v in data["vocabulary"] if v.get("id") == item.get("id")), None)
-        if existing:
-            existing.update(item)
-        else:
-            data["vocabulary"].append(item)
-        self._write_yaml(data)
-        return item
+        def apply(data):
+            if "vocabulary" not in data:
+                data["vocabulary"] = []
+            # Simple append, generic ID check
+            existing = next((v for v in data["vocabulary"] if v.get("id") == item.get("id")), None)
+            if existing:
+                existing.update(item)
+            else:
+                data["vocabulary"].append(item)
+            return item, True
+        return self._mutate(apply)
     
     def update_vocabulary_item(self, item_id: str, updates: Dict[str, Any]):
-        data = self._read_yaml()
-        vocab = data.get("vocabulary", [])
-        for v in vocab:
-            if v.get("id") == item_id:
-                v.update(updates)
-                self._write_yaml(data)
-                return v
-        return None
+        def apply(data):
+            vocab = data.get("vocabulary", [])
+            for v in vocab:
+                if v.get("id") == item_id:
+                    v.update(updates)
+                    return v, True
+            return None, False
+        return self._mutate(apply)
 
     def delete_vocabulary_item(self, item_id: str):
-        data = self._read_yaml()
-        vocab = data.get("vocabulary", [])
-        data["vocabulary"] = [v for v in vocab if v.get("id") != item_id]
-        self._write_yaml(data)
+        def apply(data):
+            vocab = data.get("vocabulary", [])
+            data["vocabulary"] = [v for v in vocab if v.get("id") != item_id]
+            return None, True
+        self._mutate(apply)
 
     # --- System Prompts ---
     def get_system_prompts(self) -> Dict[str, str]:
-        data = self._read_yaml()
-        return data.get("system_prompts", {})
+        return copy.deepcopy(self._snapshot().get("system_prompts", {}))
 
     def get_system_prompt(self, key: str) -> Optional[str]:
-        prompts = self.get_system_prompts()
-        return prompts.get(key)
+        # Strings are immutable: no need to copy the whole mapping for one value
+        return self._snapshot().get("system_prompts", {}).get(key)
     
     def update_system_prompt(self, key: str, content: str):
-        data = self._read_yaml()
-        if "system_prompts" not in data:
-            data["system_prompts"] = {}
-        data["system_prompts"][key] = content
-        self._write_yaml(data)
+        def apply(data):
+            if "system_prompts" not in data:
+                data["system_prompts"] = {}
+            data["system_prompts"][key] = content
+            return None, True
+        self._mutate(apply)
 
     # --- General Settings ---
     
@@ -144,15 +348,21 @@ class SettingsFileService:
             return data
 
     def get_general_settings(self) -> Dict[str, Any]:
-        data = self._read_yaml()
-        general = data.get("general", {})
-        # Decrypt sensitive fields before returning
-        return self._decrypt_sensitive_fields(general)
+        data = self._snapshot()
+        general = self._general
+        if general is None:
+            # Decrypt sensitive fields once per load, not per read
+            general = self._decrypt_sensitive_fields(data.get("general", {}))
+            with self._lock:
+                if self._data is data:
+                    self._general = general
+        return dict(general)
 
     def _encrypt_sensitive_fields(self, updates: Dict[str, Any]) -> Dict[str, Any]:
         """Encrypt sensitive fields if they're not already encrypted."""
         try:
-            from app.services.crypto import encrypt, is_encrypted, PUBLIC_KEY_FILE
+            from app.services.crypto import encrypt, encrypt_many, is_encrypted, PUBLIC_KEY_FILE
+            from app.core.config import settings
             
             # Check if encryption is available (keys exist)
             if not PUBLIC_KEY_FILE.exists():
@@ -160,13 +370,20 @@ class SettingsFileService:
                 return updates
             
             encrypted_updates = updates.copy()
-            for field in self.SENSITIVE_FIELDS:
-                if field in encrypted_updates:
-                    value = encrypted_updates[field]
-                    # Only encrypt if value is non-empty and not already encrypted
-                    if value and isinstance(value, str) and not is_encrypted(value):
-                        encrypted_updates[field] = encrypt(value)
-                        print(f"[Settings] Encrypted field: {field}")
+            # Only encrypt if value is non-empty and not already encrypted
+            fields = [
+                field for field in self.SENSITIVE_FIELDS
+                if encrypted_updates.get(field) and isinstance(encrypted_updates[field], str)
+                and not is_encrypted(encrypted_updates[field])
+            ]
+            if settings.SECRETS_FORMAT == "hybrid":
+                # One data key (one RSA operation) for all fields of this save
+                values = encrypt_many([encrypted_updates[field] for field in fields]) if fields else []
+            else:
+                values = [encrypt(encrypted_updates[field]) for field in fields]
+            for field, value in zip(fields, values):
+                encrypted_updates[field] = value
+                print(f"[Settings] Encrypted field: {field}")
             
             return encrypted_updates
         except Exception as e:
@@ -174,16 +391,15 @@ class SettingsFileService:
             return updates
 
     def update_general_settings(self, updates: Dict[str, Any]):
-        data = self._read_yaml()
-        if "general" not in data:
-            data["general"] = {}
-        
-        # Encrypt sensitive fields before saving
+        # Encrypt sensitive fields before saving (outside the writer lock)
         encrypted_updates = self._encrypt_sensitive_fields(updates)
-        
-        data["general"].update(encrypted_updates)
-        self._write_yaml(data)
-        return data["general"]
+
+        def apply(data):
+            if "general" not in data:
+                data["general"] = {}
+            data["general"].update(encrypted_updates)
+            return data["general"], True
+        return self._mutate(apply)
 
 settings_service = SettingsFileService()
 
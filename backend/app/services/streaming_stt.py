@@ -0,0 +1,178 @@
+"""
+Streaming Transcription
+
+Backs the `/ws/stt/{session_id}` endpoint: live PCM frames are segmented into
+utterances by the VAD, and each finished utterance is saved as a WAV file,
+added to the session as an audio block and transcribed immediately, so text
+appears about one utterance after speaking instead of after the recording ends.
+
+Usage:
+    stream = StreamingTranscription(session_id, send=websocket.send_json)
+    await stream.feed(pcm_bytes)   # per binary frame
+    await stream.finish()          # flush the last utterance and wait for transcripts
+"""
+
+import asyncio
+import os
+import uuid
+import wave
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.session import Session as SessionModel
+from app.models.transcription_block import TranscriptionBlock, STATUS_PROCESSING
+from app.services.vad import UtteranceSegmenter, SAMPLE_WIDTH
+
+DATA_DIR = "/data"
+
+# Accepted `sample_rate` values for the live PCM stream (Hz)
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+
+def session_exists(session_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(SessionModel.id).filter(SessionModel.id == session_id).first() is not None
+    finally:
+        db.close()
+
+
+def _write_wav(path: str, pcm: bytes, sample_rate: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+
+
+def _create_block(session_id: str, file_path: str, duration: float, sample_rate: int, worker_id: str) -> Tuple[str, str]:
+    """
+    Append an audio block for a finished utterance (same ordering as uploads),
+    together with a running job leased to `worker_id`. Returns (block_id, job_id).
+    """
+    from app.services.transcription_jobs import add_running_job
+
+    tz = ZoneInfo(settings.TIMEZONE)
+    db = SessionLocal()
+    try:
+        max_order = db.query(func.max(TranscriptionBlock.order_index)).filter(
+            TranscriptionBlock.session_id == session_id
+        ).scalar()
+        block = TranscriptionBlock(
+            session_id=session_id,
+            type="audio",
+            file_path=file_path,
+            status=STATUS_PROCESSING,
+            progress=0.0,
+            timestamp=datetime.now(tz).strftime("%H:%M:%S"),
+            duration=f"{duration:.1f}",
+            order_index=(max_order if max_order is not None else -1) + 1,
+            # Known from the stream format; no ffprobe needed
+            duration_seconds=duration,
+            codec="pcm_s16le",
+            channels=1,
+            sample_rate=sample_rate,
+            byte_size=os.path.getsize(file_path),
+        )
+        db.add(block)
+        db.flush()
+        job = add_running_job(db, block.id, worker_id)
+        db.commit()
+        return block.id, job.id
+    finally:
+        db.close()
+
+
+def _block_result(block_id: str) -> Dict[str, Any]:
+    """Text and final status of a transcribed utterance block."""
+    db = SessionLocal()
+    try:
+        block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
+        if not block:
+            return {"text": None, "status": None, "message": None}
+        return {"text": block.text, "status": block.status, "message": block.status_message}
+    finally:
+        db.close()
+
+
+class StreamingTranscription:
+    """Per-connection state: VAD segmenter plus the utterances being transcribed."""
+
+    def __init__(self, session_id: str, send: Callable[[Dict[str, Any]], Awaitable[None]], sample_rate: int = None):
+        self.session_id = session_id
+        self.sample_rate = sample_rate or settings.STT_STREAM_SAMPLE_RATE
+        self.segmenter = UtteranceSegmenter(
+            sample_rate=self.sample_rate,
+            frame_ms=settings.STT_STREAM_FRAME_MS,
+            threshold_db=settings.STT_STREAM_THRESHOLD_DB,
+            margin_db=settings.STT_STREAM_MARGIN_DB,
+            silence_ms=settings.STT_STREAM_SILENCE_MS,
+            min_speech_ms=settings.STT_STREAM_MIN_SPEECH_MS,
+            max_utterance_seconds=settings.STT_STREAM_MAX_UTTERANCE_SECONDS,
+        )
+        self._send = send
+        self._semaphore = asyncio.Semaphore(max(1, settings.STT_STREAM_CONCURRENCY))
+        self._tasks: Set[asyncio.Task] = set()
+        self.utterances = 0
+
+    async def _notify(self, message: Dict[str, Any]):
+        try:
+            await self._send(message)
+        except Exception:
+            # Client went away; blocks are still stored and broadcast
+            pass
+
+    async def feed(self, pcm: bytes):
+        for utterance in self.segmenter.feed(pcm):
+            self._start(utterance)
+
+    def _start(self, pcm: bytes):
+        task = asyncio.create_task(self._transcribe_utterance(pcm))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _transcribe_utterance(self, pcm: bytes):
+        from app.api.endpoints.websocket import broadcast_event
+        from app.worker import transcription_worker
+
+        self.utterances += 1
+        duration = len(pcm) / (self.sample_rate * SAMPLE_WIDTH)
+        file_path = os.path.join(DATA_DIR, self.session_id, "audio", f"{uuid.uuid4()}.wav")
+        await asyncio.to_thread(_write_wav, file_path, pcm, self.sample_rate)
+        # A leased job row, so a restart mid-utterance is recovered and DELETE /transcribe cancels it
+        block_id, job_id = await asyncio.to_thread(
+            _create_block, self.session_id, file_path, duration, self.sample_rate, transcription_worker.worker_id
+        )
+
+        await broadcast_event("block_created", {"session_id": self.session_id, "block_id": block_id})
+        await self._notify({"type": "utterance", "block_id": block_id, "duration": round(duration, 2)})
+
+        # Keep the lease while waiting for a slot, or recovery would requeue the job
+        waiting = asyncio.create_task(transcription_worker.keep_lease_async(job_id))
+        try:
+            async with self._semaphore:
+                waiting.cancel()
+                # Renews the lease, records the job outcome and broadcasts block_updated
+                await transcription_worker.process_job_async(job_id)
+        except Exception as e:
+            print(f"[StreamSTT] Transcription failed for block {block_id}: {e}")
+        finally:
+            waiting.cancel()
+
+        result = await asyncio.to_thread(_block_result, block_id)
+        await self._notify({"type": "transcript", "block_id": block_id, **result})
+
+    async def finish(self):
+        """Flush the utterance in progress and wait for outstanding transcriptions."""
+        tail = self.segmenter.flush()
+        if tail:
+            self._start(tail)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -1,195 +1,509 @@
 from openai import OpenAI
 import os
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy.orm import Session
-from app.models.transcription_block import TranscriptionBlock
+from app.models.transcription_block import TranscriptionBlock, STATUS_PROCESSING, STATUS_COMPLETED, STATUS_FAILED
 from app.core.config import settings
 from app.services.openai_factory import get_openai_client
+from app.services.rate_limiter import backoff_delay
+from app.services.circuit_breaker import provider_call, failover_candidates, next_provider, breakers, CircuitOpenError
+from app.services.cancellation import cancellations, CancelToken, TranscriptionCancelled
+from app.services.transcription_status import set_status, publish_progress
+from app.services.vocabulary_prompt import vocabulary_prompts
 
-def transcribe_audio_task(block_id: str, db: Session):
+# Status message of a clip the local speech check found silent (completed, empty text)
+NO_SPEECH_MESSAGE = "No speech detected"
+
+def _chunking_duration(file_path: str, duration: Optional[float] = None):
+    """
+    Return the audio duration if the file should be split into segments, else None.
+    Long or oversized recordings are chunked; short clips go up in one request.
+    `duration` is the probed value stored on the block (ffprobe runs only without it).
+    """
+    if not settings.STT_CHUNK_ENABLED or not file_path or not os.path.exists(file_path):
+        return None
+    if duration is None:
+        from app.services.audio_processing import probe_duration
+        duration = probe_duration(file_path)
+    if not duration or duration <= settings.STT_CHUNK_SECONDS:
+        return None
+    if duration > settings.STT_CHUNK_THRESHOLD or os.path.getsize(file_path) > settings.STT_CHUNK_MAX_BYTES:
+        return duration
+    return None
+
+def _ensure_audio_info(block: TranscriptionBlock) -> Optional[float]:
+    """
+    Probe (and, with the result cache on, hash) blocks stored before this was
+    done at upload time (backups, older uploads) once, and keep the values on
+    the block (the caller commits). Returns the duration.
+    """
+    if not block.file_path or not os.path.exists(block.file_path):
+        return block.duration_seconds
+    if block.duration_seconds is None:
+        from app.services.audio_processing import probe_audio
+        info = probe_audio(block.file_path)
+        if info:
+            info.apply_to(block)
+    if block.audio_sha256 is None and settings.STT_CACHE_ENABLED:
+        from app.services.transcription_cache import hash_file
+        block.audio_sha256 = hash_file(block.file_path)
+    return block.duration_seconds
+
+def _detect_speech(file_path: str, duration: Optional[float] = None):
+    """
+    Local speech check (RMS over the decoded PCM) before any provider call.
+    Returns the SpeechActivity, or None when the check is disabled, the clip is
+    too long to be an accidental recording, or ffmpeg cannot decode it.
+    """
+    if not settings.STT_SILENCE_ENABLED or not file_path or not os.path.exists(file_path):
+        return None
+    if duration is not None and duration > settings.STT_SILENCE_MAX_SECONDS:
+        return None
+    try:
+        from app.services.audio_processing import analyze_speech
+        return analyze_speech(file_path, settings.STT_SILENCE_THRESHOLD_DB)
+    except Exception as e:
+        print(f"[Audio] Speech check skipped for {file_path}: {e}")
+        return None
+
+def _is_silent(speech) -> bool:
+    return speech is not None and not speech.has_speech(settings.STT_SILENCE_MIN_SPEECH_MS / 1000)
+
+def _prepare_upload(file_path: str, speech=None) -> str:
+    """
+    Path to send to the provider: a compact mono 16 kHz artifact when transcoding
+    is enabled, cut to the detected speech (plus padding) when there is silence to trim.
+    With transcoding disabled the original stream is only trimmed (stream copy).
+    """
+    if not file_path or not os.path.exists(file_path):
+        return file_path
+    window = speech.trim_window(settings.STT_SILENCE_PADDING_MS / 1000) if speech is not None else None
+    if not settings.STT_TRANSCODE_ENABLED and not window:
+        return file_path
+    fmt = settings.STT_TRANSCODE_FORMAT if settings.STT_TRANSCODE_ENABLED else "copy"
+    try:
+        from app.services.audio_processing import transcode_for_stt
+        return transcode_for_stt(file_path, fmt, settings.STT_TRANSCODE_BITRATE, window)
+    except Exception as e:
+        print(f"[Audio] Transcoding skipped for {file_path}: {e}")
+        return file_path
+
+def _transcribe_file(provider: str, client, model_name: str, file_path: str, stt_prompt: str, token: CancelToken = None) -> str:
+    """Single provider call for one audio file (no retries), behind the provider's breaker and rate limiter."""
+    if token:
+        token.check()
+    with provider_call("stt", provider):
+        return _call_provider(provider, client, model_name, file_path, stt_prompt)
+
+def _call_provider(provider: str, client, model_name: str, file_path: str, stt_prompt: str) -> str:
+    if provider == "gemini":
+        from app.services.gemini_service import gemini_service
+        final_prompt = stt_prompt if stt_prompt.strip() else "Transcribe the following audio file verbatim."
+        return gemini_service.transcribe(file_path, model_name=model_name, prompt=final_prompt)
+
+    with open(file_path, "rb") as audio_file:
+        kwargs = {
+            "model": model_name,
+            "file": audio_file,
+            "response_format": "text"
+        }
+        if stt_prompt.strip():
+            kwargs["prompt"] = stt_prompt.strip()
+        return client.audio.transcriptions.create(**kwargs)
+
+def _cache_lookup(db: Session, file_path: str, provider: str, model_name: str, stt_prompt: str,
+                  audio_sha256: Optional[str] = None):
+    """
+    Return (cache_key, audio_sha256, cached_text); all None when caching does not apply.
+    `audio_sha256` is the hash stored on the block (the file is only hashed without it).
+    """
+    if not settings.STT_CACHE_ENABLED or not file_path or not os.path.exists(file_path):
+        return None, None, None
+    from app.services.transcription_cache import transcription_cache, hash_file
+    audio_sha256 = audio_sha256 or hash_file(file_path)
+    cache_key = transcription_cache.make_key(audio_sha256, provider, model_name, stt_prompt)
+    return cache_key, audio_sha256, transcription_cache.get(db, cache_key)
+
+def _cache_result(db: Session, cache_key: str, audio_sha256: str, provider: str, model_name: str, text: str):
+    """Store a successful transcription in the result cache (best effort)."""
+    if not cache_key or not text:
+        return
+    try:
+        from app.services.transcription_cache import transcription_cache
+        transcription_cache.put(db, cache_key, audio_sha256, provider, model_name, text)
+    except Exception as e:
+        db.rollback()
+        print(f"[Cache] Failed to store transcription result: {e}")
+
+def _split_segments(file_path: str, tmp_dir: str, duration: float):
+    """Cut a long recording into segments at silences (shared by both engines)."""
+    from app.services.audio_processing import split_on_silence
+    return split_on_silence(
+        file_path, tmp_dir,
+        max_seconds=settings.STT_CHUNK_SECONDS,
+        noise_db=settings.STT_CHUNK_SILENCE_DB,
+        min_silence=settings.STT_CHUNK_MIN_SILENCE,
+        duration=duration,
+    )
+
+def _store_chunked(db: Session, block_id: str, start: "TranscriptionStart", results: dict, errors: dict, total: int) -> Optional[str]:
+    """
+    Write the outcome of a chunked transcription: the stitched text (cached
+    under the original key) when every segment succeeded, else the first error.
+    Returns the stitched provider text, or None.
+    """
+    if errors:
+        first_error = errors[min(errors)]
+        _store_failed(db, block_id, f"{len(errors)}/{total} segments failed: {str(first_error)}", len(results) / total)
+        return None
+    text = "\n".join(results[i] for i in range(total) if results[i])
+    _store_completed(db, block_id, text)
+    _cache_result(db, start.cache_key, start.audio_sha256, start.provider, start.model_name, text)
+    print(f"Chunked transcription finished for block {block_id}")
+    return text
+
+def _transcribe_chunked(db: Session, block_id: str, start: "TranscriptionStart", duration: float, token: CancelToken) -> Optional[str]:
+    """
+    Split a long recording at silences, transcribe segments concurrently and
+    stitch the results in order. Only failed segments are retried.
+    Segment uploads run in a local pool and check `token` before each upload,
+    so a cancel stops the remaining segments. Progress is only published over
+    the WebSocket; the block is written once with the result.
+    Returns the stitched provider text when every segment succeeded, else None.
+    """
+    provider, model_name, stt_prompt = start.provider, start.model_name, start.stt_prompt
+    session_id = start.session_id
+    client = None if provider == "gemini" else get_openai_client("stt", provider)
+    max_retries = settings.STT_MAX_RETRIES
+
+    with tempfile.TemporaryDirectory(prefix="vox-chunks-") as tmp_dir:
+        publish_progress(session_id, block_id, "Splitting audio...", 0.0)
+        segments = _split_segments(start.file_path, tmp_dir, duration)
+        total = len(segments)
+        print(f"Transcribing block {block_id} in {total} segments ({duration:.0f}s) using {provider}")
+
+        results = {}
+        errors = {}
+        pending = segments
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                token.check()
+                publish_progress(session_id, block_id,
+                                 f"Retry {attempt}/{max_retries}: {len(pending)} segment(s) failed...", len(results) / total)
+                token.sleep(backoff_delay(attempt - 1, errors[min(errors)]))
+
+            with ThreadPoolExecutor(max_workers=max(1, min(settings.STT_CHUNK_CONCURRENCY, len(pending)))) as pool:
+                futures = {
+                    pool.submit(_transcribe_file, provider, client, model_name, seg.path, stt_prompt, token): seg
+                    for seg in pending
+                }
+                for future in as_completed(futures):
+                    seg = futures[future]
+                    try:
+                        results[seg.index] = (future.result() or "").strip()
+                        errors.pop(seg.index, None)
+                    except TranscriptionCancelled:
+                        pass
+                    except Exception as e:
+                        print(f"Segment {seg.index + 1}/{total} failed (Attempt {attempt+1}): {e}")
+                        errors[seg.index] = e
+                    if token.cancelled:
+                        # Segments not yet started see the token and bail out without uploading
+                        continue
+                    publish_progress(session_id, block_id,
+                                     f"Processing {len(results)}/{total} segments...", len(results) / total)
+
+            token.check()
+            pending = [seg for seg in segments if seg.index in errors]
+            if not pending:
+                break
+
+    token.check()
+    return _store_chunked(db, block_id, start, results, errors, total)
+
+def _postprocess_transcript(text: str) -> str:
+    """
+    Vocabulary correction (reading -> word) when `use_vocabulary_correction` is on,
+    and hit counting for the vocabulary prompt ranking.
+    The result cache keeps the provider's text, so corrections follow vocabulary edits.
+    """
+    if not text:
+        return text
+    try:
+        from app.services.settings_file import settings_service
+        from app.services.vocabulary_correction import vocabulary_corrector
+        if settings_service.get_general_settings().get("use_vocabulary_correction", False):
+            text, replaced = vocabulary_corrector.apply(text, settings_service.get_vocabulary())
+            if replaced:
+                print(f"[Vocabulary] Corrected {replaced} term(s)")
+    except Exception as e:
+        print(f"[Vocabulary] Correction skipped: {e}")
+    vocabulary_prompts.record_hits(text)
+    return text
+
+def load_stt_config(provider_override: str = None, session_id: str = None):
+    """
+    Resolve (provider, model_name, effective prompt) from settings.yaml.
+    The prompt includes the vocabulary suffix when `use_vocabulary_for_stt` is on,
+    trimmed to the provider's token budget and ranked by relevance to `session_id`.
+    `provider_override` resolves model and prompt for a failover provider instead.
+    """
+    provider = settings.STT_PROVIDER
+    stt_prompt = "" # Default empty prompt
+    use_vocab = False
+    user_settings = {}
+
+    try:
+        from app.services.settings_file import settings_service
+        user_settings = settings_service.get_general_settings()
+        if user_settings.get("stt_provider"):
+            provider = user_settings.get("stt_provider")
+        if provider_override:
+            provider = provider_override
+
+        # Fetch Prompt Config
+        prompts = user_settings.get("stt_prompts", {})
+        stt_prompt = prompts.get(provider, "")
+        use_vocab = user_settings.get("use_vocabulary_for_stt", False)
+
+        # Append Vocabulary if enabled
+        if use_vocab:
+            vocab_list = settings_service.get_vocabulary()
+            if vocab_list:
+                stt_prompt += vocabulary_prompts.build(provider, stt_prompt, vocab_list, session_id)
+
+    except Exception as e:
+        print(f"Error loading STT settings: {e}")
+
+    if provider == "gemini":
+        model_name = user_settings.get("stt_gemini_model") or settings.STT_GEMINI_MODEL
+    else:
+        model_name = settings.STT_AZURE_DEPLOYMENT if provider == "azure" else "whisper-1"
+
+    return provider, model_name, stt_prompt
+
+def retry_status(e: Exception, attempt: int, max_retries: int, base_url: str) -> str:
+    """Progress message published while waiting to retry after `e`."""
+    from openai import APIStatusError, APIConnectionError
+    if isinstance(e, APIConnectionError):
+        return f"Connection Error: Retrying {attempt+1}/{max_retries} to {base_url}..."
+    if isinstance(e, APIStatusError):
+        return f"HTTP {e.status_code}: Retrying {attempt+1}/{max_retries} to {base_url}..."
+    return f"Error: {str(e)}... Retrying {attempt+1}/{max_retries}"
+
+def final_error(e: Exception, provider: str, base_url: str) -> str:
+    """Block status message after the last attempt failed with `e`."""
+    from openai import APIStatusError, APIConnectionError
+    if isinstance(e, CircuitOpenError):
+        return str(e)
+    if provider == "gemini":
+        return f"Gemini Error: {str(e)}"
+    if isinstance(e, APIConnectionError):
+        return f"Connection Failed: Could not connect to {base_url}."
+    if isinstance(e, APIStatusError):
+        return f"HTTP {e.status_code}: {e.message}"
+    return f"認識に失敗しました: {str(e)}"
+
+@dataclass
+class TranscriptionStart:
+    """Everything both engines need after a block was marked processing."""
+    file_path: str
+    session_id: str
+    duration: Optional[float]
+    candidates: List[str]
+    provider: str
+    model_name: str
+    stt_prompt: str
+    cache_key: Optional[str]
+    audio_sha256: Optional[str]
+    cached_text: Optional[str]
+
+    def switch_provider(self, provider: str):
+        """Fail over: model and effective prompt of `provider` (the cache key follows on success)."""
+        self.provider, self.model_name, self.stt_prompt = load_stt_config(provider, self.session_id)
+
+def _start_transcription(db: Session, block_id: str) -> Optional[TranscriptionStart]:
+    """
+    Mark the block processing (probing/hashing it if needed), pick the first
+    healthy provider and look up the result cache. None if the block is gone.
+    """
+    block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
+    if not block:
+        return None
+    set_status(block, STATUS_PROCESSING, 0.0)
+    duration = _ensure_audio_info(block)
+    db.commit()
+
+    primary, _, _ = load_stt_config()
+    candidates = failover_candidates("stt", primary)
+    provider, model_name, stt_prompt = load_stt_config(candidates[0], block.session_id)
+    if provider != primary:
+        print(f"STT provider {primary} is unavailable, using {provider}")
+
+    # Content-addressed result cache: same audio + provider + model + effective prompt
+    cache_key, audio_sha256, cached_text = _cache_lookup(db, block.file_path, provider, model_name, stt_prompt, block.audio_sha256)
+    return TranscriptionStart(block.file_path or "", block.session_id, duration, candidates, provider, model_name,
+                              stt_prompt, cache_key, audio_sha256, cached_text)
+
+def _store_outcome(db: Session, block_id: str, status: str, text: Optional[str], progress: Optional[float], message: Optional[str]):
+    block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
+    if not block:
+        return
+    if text is not None:
+        block.text = text
+    set_status(block, status, progress, message)
+    db.commit()
+
+def _store_completed(db: Session, block_id: str, text: str, message: Optional[str] = None):
+    """Store the (vocabulary-corrected) transcript and mark the block completed."""
+    _store_outcome(db, block_id, STATUS_COMPLETED, _postprocess_transcript(text), 1.0, message)
+
+def _store_failed(db: Session, block_id: str, message: str, progress: Optional[float] = None):
+    """Mark the block failed, keeping its previous text."""
+    _store_outcome(db, block_id, STATUS_FAILED, None, progress, message)
+
+def _store_transcript(db: Session, block_id: str, start: TranscriptionStart, text: str):
+    """Successful single-file transcription: store it and cache it under the provider that produced it."""
+    _store_completed(db, block_id, text)
+    cache_key = start.cache_key
+    if cache_key:
+        from app.services.transcription_cache import transcription_cache
+        cache_key = transcription_cache.make_key(start.audio_sha256, start.provider, start.model_name, start.stt_prompt)
+    _cache_result(db, cache_key, start.audio_sha256, start.provider, start.model_name, text)
+    print(f"Transcription finished for block {block_id}")
+
+def _after_failure(e: Exception, attempt: int, start: TranscriptionStart, block_id: str, base_url: str):
+    """
+    Decide what follows a failed provider call, publishing the matching progress:
+    ("failover", provider) when the provider's breaker is open and another
+    candidate is healthy, ("retry", delay) while attempts remain, else ("fail", message).
+    """
+    provider = start.provider
+    print(f"{provider} transcription failed (Attempt {attempt+1}): {e}")
+
+    # Provider is down (breaker open): fail over right away instead of sleeping through retries
+    if not breakers.get("stt", provider).available():
+        fallback = next_provider("stt", start.candidates, provider)
+        if fallback:
+            print(f"Failing over STT from {provider} to {fallback}")
+            publish_progress(start.session_id, block_id, f"{provider} unavailable, switching to {fallback}...")
+            return "failover", fallback
+        if isinstance(e, CircuitOpenError):
+            return "fail", final_error(e, provider, base_url)
+
+    max_retries = settings.STT_MAX_RETRIES
+    if attempt < max_retries:
+        publish_progress(start.session_id, block_id, retry_status(e, attempt, max_retries, base_url))
+        return "retry", backoff_delay(attempt, e)
+    return "fail", final_error(e, provider, base_url)
+
+def transcribe_audio_task(block_id: str, db: Session, job_id: str = None) -> bool:
+    """
+    Transcribe a block's audio and store the result in block.text.
+    The block's status moves processing -> completed | failed; retries and
+    failover are only published as progress events (see transcription_status).
+    Providers are tried in failover order (`stt_failover`), skipping those whose
+    circuit breaker is open. Returns True if the result was served from the cache.
+    Stops at the next checkpoint once the block's transcription is cancelled.
+    The steps are shared with the async engine (async_transcription.py);
+    only the provider calls and waits differ.
+    """
+    with cancellations.track(block_id, job_id) as token:
+        try:
+            return _run_transcription(block_id, db, token)
+        except TranscriptionCancelled:
+            db.rollback()
+            print(f"Transcription cancelled for block {block_id}")
+            return False
+
+def _run_transcription(block_id: str, db: Session, token: CancelToken) -> bool:
     print(f"Starting transcription for block {block_id}")
     
     try:
-        # Check block existence
-        block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
-        if not block:
-            print(f"Block {block_id} not found in background task")
-            return
-
         # Immediate feedback that task started
-        block.text = "(Processing...)"
-        db.commit()
-
-        # Determine Provider (Prefer dynamic settings if available)
-        # Determine Provider (Prefer dynamic settings if available)
-        provider = settings.STT_PROVIDER
-        stt_prompt = "" # Default empty prompt
-        use_vocab = False
-        
-        try:
-             from app.services.settings_file import settings_service
-             user_settings = settings_service.get_general_settings()
-             if user_settings.get("stt_provider"):
-                 provider = user_settings.get("stt_provider")
-             
-             # Fetch Prompt Config
-             prompts = user_settings.get("stt_prompts", {})
-             stt_prompt = prompts.get(provider, "")
-             use_vocab = user_settings.get("use_vocabulary_for_stt", False)
-             
-             # Append Vocabulary if enabled
-             if use_vocab:
-                 vocab_list = settings_service.get_vocabulary()
-                 if vocab_list:
-                     vocab_text = ", ".join([f"{v['word']}({v['reading']})" for v in vocab_list])
-                     # Format depends on provider, but generally appending is safe for context
-                     # For OpenAI/Azure, prompt is just context text.
-                     # For Gemini, it's instruction.
-                     
-                     if provider == "gemini":
-                         stt_prompt += f"\n\nPlease verify whether the following terms are included in the audio and transcribe them correctly using the specified readings:\n{vocab_text}"
-                     else:
-                         # OpenAI/Azure prompt is limited in length (224 tokens usually?) 
-                         # Actually prompt is for "style and context". A list of words helps.
-                         # We append it.
-                         stt_prompt += f" {vocab_text}"
-
-        except Exception as e:
-             print(f"Error loading STT settings: {e}")
-
-        if provider == "gemini":
-            from app.services.gemini_service import gemini_service
-            model_name = settings.STT_GEMINI_MODEL
-            try:
-                # Override model from user settings if present
-                if user_settings.get("stt_gemini_model"):
-                    model_name = user_settings.get("stt_gemini_model")
-            except: pass
+        token.check()
+        start = _start_transcription(db, block_id)
+        if start is None:
+            print(f"Block {block_id} not found in background task")
+            return False
 
-            print(f"Transcribing block {block_id} using Gemini ({model_name})...")
-            block.text = "(Processing with Gemini...)"
-            db.commit()
+        if start.cached_text is not None:
+            token.check()
+            _store_completed(db, block_id, start.cached_text)
+            print(f"Transcription cache hit for block {block_id}")
+            return True
 
-            try:
-                # Use the configured prompt (or default if empty, but we set default in settings.yaml)
-                # If settings.yaml gave us "", Gemini might need a base instruction?
-                # The user default we set was "Transcribe..."
-                # If user clears it, we might want a fallback?
-                # Let's assume if stt_prompt is empty, we use a hardcoded fallback just in case.
-                final_prompt = stt_prompt if stt_prompt.strip() else "Transcribe the following audio file verbatim."
-
-                text = gemini_service.transcribe(block.file_path, model_name=model_name, prompt=final_prompt)
-                block.text = text
-                db.add(block)
-                db.commit()
-                print(f"Gemini Transcription finished for block {block_id}")
-                return
-            except Exception as e:
-                block.text = f"[Error] Gemini Error: {str(e)}"
-                db.add(block)
-                db.commit()
-                return
+        # Accidental taps / near-silent clips: no provider call at all
+        speech = _detect_speech(start.file_path, start.duration)
+        if _is_silent(speech):
+            token.check()
+            _store_completed(db, block_id, "", NO_SPEECH_MESSAGE)
+            print(f"No speech detected in block {block_id}, skipping {start.provider}")
+            return False
 
-        # OpenAI / Azure Logic
-        client = get_openai_client("stt")
-        model_name = settings.STT_AZURE_DEPLOYMENT if settings.STT_PROVIDER == "azure" else "whisper-1"
+        # Long recordings: split at silences and transcribe segments concurrently
+        chunk_duration = _chunking_duration(start.file_path, start.duration)
+        if chunk_duration:
+            _transcribe_chunked(db, block_id, start, chunk_duration, token)
+            return False
 
-        import time
-        from openai import APIStatusError, APIConnectionError
+        # Upload a compact mono 16 kHz artifact (without leading/trailing silence) instead of the raw browser recording
+        upload_path = _prepare_upload(start.file_path, speech)
 
         # Manual retry loop to provide status updates
         max_retries = settings.STT_MAX_RETRIES
-        retry_delay = 1.0
-        
-        # Get base URL for display
-        base_url = str(client.base_url)
-        
-        for attempt in range(max_retries + 1):
+        attempt = 0
+        client = None if start.provider == "gemini" else get_openai_client("stt", start.provider)
+        base_url = str(client.base_url) if client else "Gemini"
+        if start.provider == "gemini":
+            publish_progress(start.session_id, block_id, "Processing with Gemini...")
+
+        while True:
             try:
                 # Check if file exists
-                if not block.file_path or not os.path.exists(block.file_path):
-                    raise FileNotFoundError(f"Audio file not found at {block.file_path}")
+                if not start.file_path or not os.path.exists(start.file_path):
+                    raise FileNotFoundError(f"Audio file not found at {start.file_path}")
 
-                # Update status for frontend (first attempt or retry)
-                # We already set "Processing..." initially.
-                # If we are retrying, we update.
+                token.check()
                 if attempt > 0:
-                    block.text = f"(Retry {attempt}/{max_retries} to {base_url}...)"
-                    db.commit()
+                    publish_progress(start.session_id, block_id, f"Retry {attempt}/{max_retries} to {base_url}...")
                 
-                print(f"Transcribing file: {block.file_path} using model {model_name} (Attempt {attempt+1})")
+                print(f"Transcribing file: {upload_path} using {start.provider} / {start.model_name} (Attempt {attempt+1})")
                 
-                with open(block.file_path, "rb") as audio_file:
-                    # Construct args
-                    kwargs = {
-                        "model": model_name,
-                        "file": audio_file,
-                        "response_format": "text"
-                    }
-                    if stt_prompt.strip():
-                        kwargs["prompt"] = stt_prompt.strip()
-
-                    transcription = client.audio.transcriptions.create(**kwargs)
+                transcription = _transcribe_file(start.provider, client, start.model_name, upload_path, start.stt_prompt)
                 
-                # Success
-                block.text = transcription
-                db.add(block)
-                db.commit()
-                print(f"Transcription finished for block {block_id}")
-                return
-
-            except APIConnectionError as e:
-                print(f"Connection Failed (Attempt {attempt+1}): {e}")
-                if attempt < max_retries:
-                    block.text = f"(Connection Error: Retrying {attempt+1}/{max_retries} to {base_url}...)"
-                    db.add(block)
-                    db.commit()
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    block.text = f"[Error] Connection Failed: Could not connect to {base_url}."
-                    db.add(block)
-                    db.commit()
-                    return # Exit after final failure
-
-            except APIStatusError as e:
-                print(f"API Call failed (Attempt {attempt+1}): {e}")
-                error_code = e.status_code
-                
-                if attempt < max_retries:
-                    block.text = f"(HTTP {error_code}: Retrying {attempt+1}/{max_retries} to {base_url}...)"
-                    db.add(block)
-                    db.commit()
-                    time.sleep(retry_delay)
-                    retry_delay *= 2 # Exponential backoff
-                else:
-                    block.text = f"[Error] HTTP {error_code}: {e.message}"
-                    db.add(block)
-                    db.commit()
-                    return # Exit after final failure
-                    
+                # Success (unless the block was cancelled while the request was in flight)
+                token.check()
+                _store_transcript(db, block_id, start, transcription)
+                return False
+
+            except TranscriptionCancelled:
+                raise
             except Exception as e:
-                print(f"Unexpected error (Attempt {attempt+1}): {e}")
-                if attempt < max_retries:
-                    block.text = f"(Error: {str(e)}... Retrying {attempt+1}/{max_retries})"
-                    db.add(block)
-                    db.commit()
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
+                token.check()
+                action, value = _after_failure(e, attempt, start, block_id, base_url)
+                if action == "failover":
+                    start.switch_provider(value)
+                    client = None if start.provider == "gemini" else get_openai_client("stt", start.provider)
+                    base_url = str(client.base_url) if client else "Gemini"
+                    attempt = 0
+                elif action == "retry":
+                    token.sleep(value)
+                    attempt += 1
                 else:
-                    block.text = f"[Error] 認識に失敗しました: {str(e)}"
-                    db.add(block)
-                    db.commit()
-                    return # Exit after final failure
+                    _store_failed(db, block_id, value)
+                    return False # Exit after final failure
 
+    except TranscriptionCancelled:
+        raise
     except Exception as e:
         print(f"CRITICAL: Encoutered top-level error in transcription task: {e}")
-        # Need to re-query block if session might be stale?
-        # But we are in the same scope.
         try:
-             # Ensure we have the block reference
-             if 'block' in locals() and block:
-                block.text = f"[Error] System Error: {str(e)}"
-                db.add(block)
-                db.commit()
-        except:
-             print("Failed to update block with error status")
+            db.rollback()
+            _store_failed(db, block_id, f"System Error: {str(e)}")
+        except Exception:
+            print("Failed to update block with error status")
+    return False
@@ -0,0 +1,119 @@
+"""
+Transcription Result Cache
+
+Content-addressed cache of provider results, stored in the
+`transcription_cache` table. The key covers everything that influences the
+output: sha256 of the audio bytes, provider, model and the effective prompt
+(including the vocabulary suffix). Re-transcribing unchanged audio, or audio
+restored from a backup, is served without calling the provider.
+
+Usage:
+    from app.services.transcription_cache import transcription_cache, hash_file
+
+    key = transcription_cache.make_key(hash_file(path), provider, model, prompt)
+    text = transcription_cache.get(db, key)      # None on miss
+    transcription_cache.put(db, key, ..., text)  # evicts LRU entries over the size limit
+"""
+
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.transcription_cache import TranscriptionCacheEntry
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.STT_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(audio_sha256: str, provider: str, model: str, prompt: str) -> str:
+        material = "\x1f".join([audio_sha256, provider or "", model or "", (prompt or "").strip()])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, db: Session, key: str) -> Optional[str]:
+        entry = db.query(TranscriptionCacheEntry).filter(TranscriptionCacheEntry.key == key).first()
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+        return entry.text
+
+    def put(self, db: Session, key: str, audio_sha256: str, provider: str, model: str, text: str):
+        size = len((text or "").encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        entry = db.query(TranscriptionCacheEntry).filter(TranscriptionCacheEntry.key == key).first()
+        if entry is None:
+            entry = TranscriptionCacheEntry(key=key, audio_sha256=audio_sha256, provider=provider, model=model)
+            db.add(entry)
+        entry.text = text
+        entry.size_bytes = size
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+        self._evict(db)
+
+    def _evict(self, db: Session):
+        """Delete least recently used entries until the total size fits `max_bytes`."""
+        total = db.query(func.coalesce(func.sum(TranscriptionCacheEntry.size_bytes), 0)).scalar() or 0
+        if total <= self.max_bytes:
+            return
+        victims = []
+        rows = db.query(TranscriptionCacheEntry.key, TranscriptionCacheEntry.size_bytes).order_by(
+            TranscriptionCacheEntry.last_used_at
+        ).all()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= size or 0
+        db.query(TranscriptionCacheEntry).filter(
+            TranscriptionCacheEntry.key.in_(victims)
+        ).delete(synchronize_session=False)
+        db.commit()
+        with self._lock:
+            self.evictions += len(victims)
+        print(f"[Cache] Evicted {len(victims)} transcription cache entries")
+
+    def stats(self, db: Session) -> Dict[str, Any]:
+        entries, total = db.query(
+            func.count(TranscriptionCacheEntry.key),
+            func.coalesce(func.sum(TranscriptionCacheEntry.size_bytes), 0)
+        ).one()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.STT_CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": int(total),
+                "max_bytes": self.max_bytes,
+            }
+
+
+transcription_cache = TranscriptionCache()
@@ -0,0 +1,338 @@
+"""
+Transcription Job Store
+
+Durable queue of transcription work backed by the `transcription_jobs` table.
+Jobs survive API restarts: workers claim rows with
+`SELECT ... FOR UPDATE SKIP LOCKED`, hold a renewable lease while running, and
+expired leases are put back in the queue by `recover_expired_leases`.
+
+Usage:
+    from app.services.transcription_jobs import enqueue_transcription
+
+    job = enqueue_transcription(db, block_id)  # raises QueueFullError when saturated
+    batch_id, jobs = enqueue_batch(db, block_ids)  # low-priority bulk work
+    progress = batch_progress(db, batch_id)
+
+Jobs carry a priority: single-block requests are claimed before bulk batches,
+and workers keep `interactive_reserve` slots per provider free of bulk jobs so
+a fresh recording never waits behind a whole session being re-transcribed.
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.transcription_block import TranscriptionBlock, STATUS_QUEUED, STATUS_FAILED, STATUS_CANCELLED
+from app.models.transcription_job import (
+    TranscriptionJob, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, ACTIVE_JOB_STATES,
+    PRIORITY_BULK, PRIORITY_INTERACTIVE
+)
+from app.services.cancellation import cancellations, CANCELLED_MESSAGE
+from app.services.transcription_status import set_status, status_values
+from app.services.transcription_queue import transcription_queue, QueueFullError, get_stt_provider
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def count_queued(db: Session, bulk: bool = False) -> int:
+    """Waiting jobs of one class: interactive (default) or bulk."""
+    priority = TranscriptionJob.priority <= PRIORITY_BULK if bulk else TranscriptionJob.priority > PRIORITY_BULK
+    return db.query(func.count(TranscriptionJob.id)).filter(
+        TranscriptionJob.state == JOB_QUEUED,
+        priority
+    ).scalar() or 0
+
+
+def check_capacity(db: Session, provider: str = None, incoming: int = 1, bulk: bool = False):
+    """
+    Raise QueueFullError if `incoming` more jobs would exceed the waiting-job limit
+    (`STT_QUEUE_SIZE` for interactive jobs, `STT_BATCH_QUEUE_SIZE` for bulk ones).
+    """
+    provider = provider or get_stt_provider()
+    limit = settings.STT_BATCH_QUEUE_SIZE if bulk else settings.STT_QUEUE_SIZE
+    if count_queued(db, bulk=bulk) + incoming > limit:
+        raise QueueFullError(provider, transcription_queue.estimate_retry_after(provider))
+
+
+def _active_job(db: Session, block_id: str) -> Optional[TranscriptionJob]:
+    return db.query(TranscriptionJob).filter(
+        TranscriptionJob.block_id == block_id,
+        TranscriptionJob.state.in_(ACTIVE_JOB_STATES)
+    ).first()
+
+
+def _wake_worker():
+    # Inline mode: nudge the in-process worker so the job starts without waiting for a poll
+    from app.worker import transcription_worker
+    transcription_worker.wake()
+
+
+def enqueue_transcription(db: Session, block_id: str, provider: str = None) -> TranscriptionJob:
+    """
+    Persist an interactive transcription job for a block, mark the block as queued
+    (same transaction) and wake the local worker. An already queued/running job for
+    the same block is reused and the block status is left alone (a queued bulk job
+    is promoted to interactive priority).
+    """
+    provider = provider or get_stt_provider()
+
+    active = _active_job(db, block_id)
+    if active:
+        if active.state == JOB_QUEUED and (active.priority or 0) < PRIORITY_INTERACTIVE:
+            active.priority = PRIORITY_INTERACTIVE
+            db.commit()
+            _wake_worker()
+        return active
+
+    check_capacity(db, provider)
+
+    job = TranscriptionJob(
+        block_id=block_id,
+        provider=provider,
+        state=JOB_QUEUED,
+        priority=PRIORITY_INTERACTIVE,
+        max_attempts=settings.STT_JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    # The current text stays until a new result lands
+    db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).update(
+        status_values(STATUS_QUEUED), synchronize_session=False
+    )
+    db.commit()
+    db.refresh(job)
+    _wake_worker()
+
+    print(f"[Jobs] Enqueued job {job.id} for block {block_id} ({provider})")
+    return job
+
+
+def enqueue_batch(db: Session, block_ids: List[str], provider: str = None) -> Tuple[str, List[TranscriptionJob]]:
+    """
+    Enqueue bulk-priority jobs for several blocks under one batch id, in one transaction
+    that also marks the blocks as queued. Blocks that already have a queued/running job
+    keep it (and are not part of the batch).
+    Raises QueueFullError if the batch does not fit in `STT_BATCH_QUEUE_SIZE`.
+    """
+    provider = provider or get_stt_provider()
+    active = {
+        block_id for (block_id,) in db.query(TranscriptionJob.block_id).filter(
+            TranscriptionJob.block_id.in_(block_ids),
+            TranscriptionJob.state.in_(ACTIVE_JOB_STATES)
+        ).all()
+    } if block_ids else set()
+    pending = [block_id for block_id in dict.fromkeys(block_ids) if block_id not in active]
+
+    check_capacity(db, provider, incoming=len(pending), bulk=True)
+
+    batch_id = str(uuid.uuid4())
+    jobs = [
+        TranscriptionJob(
+            block_id=block_id,
+            provider=provider,
+            state=JOB_QUEUED,
+            priority=PRIORITY_BULK,
+            batch_id=batch_id,
+            max_attempts=settings.STT_JOB_MAX_ATTEMPTS,
+        )
+        for block_id in pending
+    ]
+    db.add_all(jobs)
+    if pending:
+        db.query(TranscriptionBlock).filter(TranscriptionBlock.id.in_(pending)).update(
+            status_values(STATUS_QUEUED), synchronize_session=False
+        )
+    db.commit()
+    if jobs:
+        _wake_worker()
+
+    print(f"[Jobs] Enqueued batch {batch_id}: {len(jobs)} job(s), {len(active)} already active ({provider})")
+    return batch_id, jobs
+
+
+def add_running_job(db: Session, block_id: str, worker_id: str, provider: str = None,
+                    lease_seconds: float = None) -> TranscriptionJob:
+    """
+    Add a job that this worker runs right away, bypassing the waiting queue
+    (live streaming utterances). It holds a lease like a claimed job, so a crash
+    mid-run is recovered by `recover_expired_leases`. The caller commits.
+    """
+    job = TranscriptionJob(
+        block_id=block_id,
+        provider=provider or get_stt_provider(),
+        state=JOB_RUNNING,
+        priority=PRIORITY_INTERACTIVE,
+        attempts=1,
+        max_attempts=settings.STT_JOB_MAX_ATTEMPTS,
+        lease_owner=worker_id,
+        lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds or settings.STT_JOB_LEASE),
+    )
+    db.add(job)
+    return job
+
+
+def claim_job(
+    db: Session,
+    worker_id: str,
+    providers: List[str],
+    lease_seconds: float = None,
+    bulk_providers: Optional[List[str]] = None,
+) -> Optional[TranscriptionJob]:
+    """
+    Atomically claim the highest-priority (then oldest) queued job for one of `providers`.
+    Bulk jobs are only taken for providers in `bulk_providers` (default: all of `providers`).
+    Concurrent workers skip rows another transaction already locked.
+    """
+    if not providers:
+        return None
+    lease_seconds = lease_seconds or settings.STT_JOB_LEASE
+    bulk_providers = providers if bulk_providers is None else bulk_providers
+
+    query = db.query(TranscriptionJob).filter(
+        TranscriptionJob.state == JOB_QUEUED,
+        TranscriptionJob.provider.in_(providers)
+    )
+    if not bulk_providers:
+        query = query.filter(TranscriptionJob.priority > PRIORITY_BULK)
+    elif set(bulk_providers) != set(providers):
+        query = query.filter(or_(
+            TranscriptionJob.priority > PRIORITY_BULK,
+            TranscriptionJob.provider.in_(bulk_providers)
+        ))
+    job = query.order_by(
+        TranscriptionJob.priority.desc(),
+        TranscriptionJob.created_at
+    ).with_for_update(skip_locked=True).first()
+
+    if not job:
+        db.rollback()
+        return None
+
+    job.state = JOB_RUNNING
+    job.attempts = (job.attempts or 0) + 1
+    job.lease_owner = worker_id
+    job.lease_expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def renew_lease(db: Session, job_id: str, worker_id: str, lease_seconds: float = None) -> bool:
+    """Extend the lease of a running job. Returns False if the lease was lost."""
+    lease_seconds = lease_seconds or settings.STT_JOB_LEASE
+    updated = db.query(TranscriptionJob).filter(
+        TranscriptionJob.id == job_id,
+        TranscriptionJob.state == JOB_RUNNING,
+        TranscriptionJob.lease_owner == worker_id
+    ).update({"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}, synchronize_session=False)
+    db.commit()
+    return updated > 0
+
+
+def finish_job(db: Session, job_id: str, worker_id: str, error: str = None, cache_hit: bool = False):
+    """Mark a claimed job as succeeded (or failed with `error`) and release its lease."""
+    db.query(TranscriptionJob).filter(
+        TranscriptionJob.id == job_id,
+        TranscriptionJob.lease_owner == worker_id
+    ).update({
+        "state": JOB_FAILED if error else JOB_SUCCEEDED,
+        "last_error": error,
+        "cache_hit": cache_hit,
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }, synchronize_session=False)
+    db.commit()
+
+
+def cancel_transcription(db: Session, block_ids: List[str]) -> List[str]:
+    """
+    Cancel the queued/running jobs of `block_ids` and signal transcriptions running
+    in this process (others notice the cancelled job row at their next checkpoint).
+    Cancelled blocks keep their text and get the `cancelled` status. Returns the ids of blocks that had work cancelled.
+    """
+    if not block_ids:
+        return []
+    jobs = db.query(TranscriptionJob).filter(
+        TranscriptionJob.block_id.in_(block_ids),
+        TranscriptionJob.state.in_(ACTIVE_JOB_STATES)
+    ).all()
+    for job in jobs:
+        job.state = JOB_CANCELLED
+        job.last_error = "Cancelled"
+        job.lease_owner = None
+        job.lease_expires_at = None
+
+    cancelled = {job.block_id for job in jobs}
+    cancelled.update(block_id for block_id in block_ids if cancellations.cancel(block_id))
+    if cancelled:
+        db.query(TranscriptionBlock).filter(TranscriptionBlock.id.in_(cancelled)).update(
+            status_values(STATUS_CANCELLED, message=CANCELLED_MESSAGE), synchronize_session=False
+        )
+    db.commit()
+
+    if cancelled:
+        print(f"[Jobs] Cancelled transcription of {len(cancelled)} block(s) ({len(jobs)} job(s))")
+    return sorted(cancelled)
+
+
+def recover_expired_leases(db: Session) -> int:
+    """
+    Requeue running jobs whose worker died (lease expired).
+    Jobs that exhausted `max_attempts` are failed and their block is marked.
+    Returns the number of recovered jobs.
+    """
+    now = datetime.utcnow()
+    expired = db.query(TranscriptionJob).filter(
+        TranscriptionJob.state == JOB_RUNNING,
+        TranscriptionJob.lease_expires_at < now
+    ).with_for_update(skip_locked=True).all()
+
+    for job in expired:
+        print(f"[Jobs] Lease expired for job {job.id} (owner {job.lease_owner}, attempt {job.attempts})")
+        job.lease_owner = None
+        job.lease_expires_at = None
+        if (job.attempts or 0) >= (job.max_attempts or 1):
+            job.state = JOB_FAILED
+            job.last_error = "Worker lease expired too many times"
+            block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == job.block_id).first()
+            if block:
+                set_status(block, STATUS_FAILED, message="Transcription worker stopped repeatedly. Please re-transcribe.")
+        else:
+            job.state = JOB_QUEUED
+    db.commit()
+    return len(expired)
+
+
+def job_counts(db: Session) -> Dict[str, int]:
+    rows = db.query(TranscriptionJob.state, func.count(TranscriptionJob.id)).group_by(TranscriptionJob.state).all()
+    return {state: count for state, count in rows}
+
+
+def batch_progress(db: Session, batch_id: str) -> Optional[Dict[str, Any]]:
+    """Aggregate job counts of a batch (None if no job carries `batch_id`)."""
+    rows = db.query(TranscriptionJob.state, func.count(TranscriptionJob.id)).filter(
+        TranscriptionJob.batch_id == batch_id
+    ).group_by(TranscriptionJob.state).all()
+    if not rows:
+        return None
+    counts = {state: count for state, count in rows}
+    total = sum(counts.values())
+    finished = counts.get(JOB_SUCCEEDED, 0) + counts.get(JOB_FAILED, 0) + counts.get(JOB_CANCELLED, 0)
+    return {
+        "batch_id": batch_id,
+        "total": total,
+        "queued": counts.get(JOB_QUEUED, 0),
+        "running": counts.get(JOB_RUNNING, 0),
+        "succeeded": counts.get(JOB_SUCCEEDED, 0),
+        "failed": counts.get(JOB_FAILED, 0),
+        "cancelled": counts.get(JOB_CANCELLED, 0),
+        "progress": round(finished / total, 3),
+        "done": finished == total,
+    }
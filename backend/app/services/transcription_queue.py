@@ -0,0 +1,183 @@
+"""
+Transcription Worker Pool
+
+Runs transcription jobs on dedicated, per-provider thread pools instead of the
+Starlette threadpool that serves sync endpoints. A job that sits in provider
+retry loops only occupies a slot in its own provider lane.
+
+Jobs are persisted by `app.services.transcription_jobs`; the worker
+(`app.worker`) claims them from the database and executes them here:
+
+    if transcription_queue.has_capacity("openai"):
+        transcription_queue.submit(job.id, "openai", job=process_job)
+
+Limits are configured in config.yaml (system.stt.concurrency / queue_size).
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+# Fallback concurrency for providers not listed in config.yaml
+DEFAULT_LANE_CONCURRENCY = 2
+
+
+class QueueFullError(Exception):
+    """Raised when the transcription queue cannot accept more jobs."""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"Transcription queue is full (provider: {provider})")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def get_stt_provider() -> str:
+    """Resolve the active STT provider (settings.yaml overrides config)."""
+    provider = settings.STT_PROVIDER
+    try:
+        from app.services.settings_file import settings_service
+        user_settings = settings_service.get_general_settings()
+        if user_settings.get("stt_provider"):
+            provider = user_settings.get("stt_provider")
+    except Exception as e:
+        print(f"[Queue] Error loading STT provider: {e}")
+    return provider
+
+
+class _ProviderLane:
+    """Thread pool and counters for a single STT provider."""
+
+    def __init__(self, provider: str, max_workers: int):
+        self.provider = provider
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"stt-{provider}")
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        # Exponentially weighted average job duration (seconds)
+        self.avg_duration: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.max_workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_duration": round(self.avg_duration, 2) if self.avg_duration is not None else None,
+        }
+
+
+class TranscriptionQueue:
+    """Bounded transcription executor with one concurrency-limited lane per provider."""
+
+    def __init__(self, concurrency: Dict[str, int] = None, max_queued: int = None):
+        self._concurrency = dict(concurrency if concurrency is not None else settings.STT_CONCURRENCY)
+        self.max_queued = max_queued if max_queued is not None else settings.STT_QUEUE_SIZE
+        self._lanes: Dict[str, _ProviderLane] = {}
+        self._lock = threading.Lock()
+
+    def _get_lane(self, provider: str) -> _ProviderLane:
+        # Caller must hold self._lock
+        lane = self._lanes.get(provider)
+        if lane is None:
+            workers = max(1, int(self._concurrency.get(provider, DEFAULT_LANE_CONCURRENCY)))
+            lane = _ProviderLane(provider, workers)
+            self._lanes[provider] = lane
+        return lane
+
+    def _total_queued(self) -> int:
+        return sum(lane.queued for lane in self._lanes.values())
+
+    def _retry_after(self, lane: _ProviderLane) -> int:
+        """Estimate seconds until the lane has drained enough to accept work again."""
+        if lane.avg_duration is None:
+            return settings.STT_QUEUE_RETRY_AFTER
+        waves = math.ceil(max(lane.queued, 1) / lane.max_workers)
+        return max(1, min(300, math.ceil(waves * lane.avg_duration)))
+
+    def estimate_retry_after(self, provider: str) -> int:
+        with self._lock:
+            return self._retry_after(self._get_lane(provider))
+
+    def providers(self) -> List[str]:
+        """Providers this pool serves (configured lanes plus any created on demand)."""
+        with self._lock:
+            return sorted(set(self._concurrency) | set(self._lanes))
+
+    def has_capacity(self, provider: str, reserve: int = 0) -> bool:
+        """
+        True if the provider lane has an idle worker slot beyond `reserve`
+        (at least one slot is always usable, so single-worker lanes still progress).
+        """
+        with self._lock:
+            lane = self._get_lane(provider)
+            reserve = min(reserve, lane.max_workers - 1)
+            return lane.queued + lane.running < lane.max_workers - reserve
+
+    def submit(self, job_id: str, provider: str, job: Callable[[str], None]):
+        """
+        Run `job(job_id)` on the provider lane.
+        Raises QueueFullError when `max_queued` jobs are already waiting in memory.
+        """
+        with self._lock:
+            lane = self._get_lane(provider)
+            if self._total_queued() >= self.max_queued:
+                raise QueueFullError(provider, self._retry_after(lane))
+            lane.queued += 1
+
+        def _run():
+            with self._lock:
+                lane.queued -= 1
+                lane.running += 1
+            started = time.monotonic()
+            ok = True
+            try:
+                job(job_id)
+            except Exception as e:
+                ok = False
+                print(f"[Queue] Transcription job {job_id} failed: {e}")
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    lane.running -= 1
+                    if ok:
+                        lane.completed += 1
+                    else:
+                        lane.failed += 1
+                    lane.avg_duration = elapsed if lane.avg_duration is None else 0.8 * lane.avg_duration + 0.2 * elapsed
+
+        try:
+            lane.executor.submit(_run)
+        except RuntimeError:
+            # Executor already shut down
+            with self._lock:
+                lane.queued -= 1
+            raise
+        print(f"[Queue] Queued job {job_id} on '{provider}' lane")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-depth snapshot for introspection endpoints."""
+        with self._lock:
+            lanes = {name: lane.stats() for name, lane in self._lanes.items()}
+            return {
+                "max_queued": self.max_queued,
+                "queued": self._total_queued(),
+                "running": sum(lane.running for lane in self._lanes.values()),
+                "lanes": lanes,
+            }
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            lanes = list(self._lanes.values())
+            self._lanes = {}
+        for lane in lanes:
+            lane.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+transcription_queue = TranscriptionQueue()
@@ -0,0 +1,53 @@
+"""
+Transcription Status
+
+`TranscriptionBlock.text` only ever holds transcripts. The transcription state
+lives in `status` / `progress` / `status_message` and is written to the
+database at state changes only:
+
+    queued -> processing -> completed | failed | cancelled
+
+Everything in between (retries, failover, segment progress) is pushed to
+clients as `transcription_progress` WebSocket events without touching the
+database, and a failed re-transcription keeps the previous transcript.
+
+Usage:
+    from app.services.transcription_status import set_status, publish_progress
+
+    set_status(block, STATUS_PROCESSING, progress=0.0)          # caller commits
+    publish_progress(block.session_id, block.id, "Retry 1/3", progress=0.5)
+"""
+
+from typing import Any, Dict, Optional
+
+from app.models.transcription_block import TranscriptionBlock, STATUS_PROCESSING
+
+
+def status_values(status: Optional[str], progress: Optional[float] = None, message: Optional[str] = None) -> Dict[str, Any]:
+    """Column values for a state change (for `query.update(...)`)."""
+    return {"status": status, "progress": progress, "status_message": message}
+
+
+def set_status(block: TranscriptionBlock, status: Optional[str], progress: Optional[float] = None, message: Optional[str] = None):
+    """Record a state change on the block (the caller commits)."""
+    block.status = status
+    block.progress = progress
+    block.status_message = message
+
+
+def publish_progress(session_id: Optional[str], block_id: str, message: str,
+                     progress: Optional[float] = None, status: str = STATUS_PROCESSING):
+    """Push transient progress to clients; nothing is stored."""
+    if not session_id:
+        return
+    from app.api.endpoints.websocket import broadcast_event_threadsafe
+    try:
+        broadcast_event_threadsafe("transcription_progress", {
+            "session_id": session_id,
+            "block_id": block_id,
+            "status": status,
+            "progress": round(progress, 3) if progress is not None else None,
+            "message": message,
+        })
+    except Exception as e:
+        print(f"[Broadcast] Error sending progress for block {block_id}: {e}")
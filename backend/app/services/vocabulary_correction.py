@@ -0,0 +1,210 @@
+"""
+Vocabulary Correction
+
+Deterministic post-processing of transcripts: readings registered in the
+vocabulary (`reading` -> `word`, plus the katakana spelling of a hiragana
+reading) are replaced by the word. All patterns are compiled into one
+Aho-Corasick automaton, so a transcript is corrected in a single pass over
+its characters no matter how large the vocabulary is. The automaton is
+rebuilt only when the vocabulary changes.
+
+Matching rules:
+- leftmost-longest, non-overlapping;
+- the words themselves are patterns too (mapping to themselves), so a reading
+  inside an already-correct word is left alone;
+- ASCII is matched case-insensitively and only on word boundaries;
+- readings shorter than `stt.vocabulary.correction_min_length` are ignored.
+
+Usage:
+    from app.services.vocabulary_correction import vocabulary_corrector
+
+    text, replaced = vocabulary_corrector.apply(text, settings_service.get_vocabulary())
+"""
+
+import string
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.vocabulary_prompt import vocabulary_fingerprint
+
+# Case folding that keeps string length (match offsets map 1:1 onto the original text)
+_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_ASCII_WORD = set(string.ascii_letters + string.digits)
+
+
+def _to_katakana(text: str) -> str:
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+class Automaton:
+    """Aho-Corasick automaton over normalised patterns, each with a replacement."""
+
+    def __init__(self, patterns: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Pattern ending at the node (index into self._patterns) and the nearest such node on the fail chain
+        self._terminal: List[Optional[int]] = [None]
+        self._output_link: List[int] = [0]
+        self._patterns: List[Tuple[int, str]] = []
+
+        for pattern, replacement in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._terminal.append(None)
+                    self._output_link.append(0)
+                node = nxt
+            self._terminal[node] = len(self._patterns)
+            self._patterns.append((len(pattern), replacement))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                fail = self._fail[child]
+                self._output_link[child] = fail if self._terminal[fail] is not None else self._output_link[fail]
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """All (start, end, replacement) occurrences in `text` (already normalised)."""
+        found = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            out = node if self._terminal[node] is not None else self._output_link[node]
+            while out:
+                length, replacement = self._patterns[self._terminal[out]]
+                found.append((i + 1 - length, i + 1, replacement))
+                out = self._output_link[out]
+        return found
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    """ASCII patterns must not start or end inside an ASCII word."""
+    if text[start] in _ASCII_WORD and start > 0 and text[start - 1] in _ASCII_WORD:
+        return False
+    if text[end - 1] in _ASCII_WORD and end < len(text) and text[end] in _ASCII_WORD:
+        return False
+    return True
+
+
+def build_patterns(vocabulary: List[Dict[str, Any]], min_length: int = 2) -> Dict[str, str]:
+    """Normalised pattern -> replacement word. Earlier entries win on conflicts."""
+    patterns: Dict[str, str] = {}
+    for v in vocabulary:
+        word = (v.get("word") or "").strip()
+        if word:
+            patterns.setdefault(word.translate(_FOLD), word)
+    for v in vocabulary:
+        word, reading = (v.get("word") or "").strip(), (v.get("reading") or "").strip()
+        if not word or len(reading) < min_length:
+            continue
+        for variant in (reading, _to_katakana(reading)):
+            patterns.setdefault(variant.translate(_FOLD), word)
+    return patterns
+
+
+def correct_text(automaton: Automaton, text: str) -> Tuple[str, int]:
+    """Apply the automaton to `text`; returns (corrected text, number of replacements)."""
+    if not text or not len(automaton):
+        return text, 0
+    folded = text.translate(_FOLD)
+    parts: List[str] = []
+    replaced = 0
+    position = 0
+    for start, end, replacement in sorted(automaton.matches(folded), key=lambda m: (m[0], m[0] - m[1])):
+        if start < position or not _on_word_boundary(folded, start, end):
+            continue
+        parts.append(text[position:start])
+        parts.append(replacement)
+        if text[start:end] != replacement:
+            replaced += 1
+        position = end
+    if not replaced:
+        return text, 0
+    parts.append(text[position:])
+    return "".join(parts), replaced
+
+
+class VocabularyCorrector:
+    def __init__(self):
+        self._fingerprint: Optional[str] = None
+        self._automaton: Optional[Automaton] = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def automaton(self, vocabulary: List[Dict[str, Any]]) -> Automaton:
+        """The compiled automaton for this vocabulary (rebuilt only when it changed)."""
+        fingerprint = vocabulary_fingerprint(vocabulary)
+        with self._lock:
+            if fingerprint != self._fingerprint or self._automaton is None:
+                self._automaton = Automaton(build_patterns(vocabulary, settings.STT_VOCAB_CORRECTION_MIN_LENGTH))
+                self._fingerprint = fingerprint
+                self.rebuilds += 1
+            return self._automaton
+
+    def apply(self, text: str, vocabulary: List[Dict[str, Any]]) -> Tuple[str, int]:
+        if not text or not vocabulary:
+            return text, 0
+        return correct_text(self.automaton(vocabulary), text)
+
+
+def apply_to_sessions(db, vocabulary: List[Dict[str, Any]], session_ids: Optional[List[str]] = None,
+                      dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Correct the transcripts (audio blocks) already stored in the given sessions,
+    or in every session. Returns counts and the ids of the sessions that changed.
+    """
+    from app.models.transcription_block import TranscriptionBlock
+
+    automaton = vocabulary_corrector.automaton(vocabulary)
+    query = db.query(TranscriptionBlock.id, TranscriptionBlock.session_id, TranscriptionBlock.text).filter(
+        TranscriptionBlock.type == "audio",
+        TranscriptionBlock.is_deleted == False,
+        TranscriptionBlock.text != None,
+        TranscriptionBlock.text != "",
+    )
+    if session_ids:
+        query = query.filter(TranscriptionBlock.session_id.in_(session_ids))
+
+    scanned = replacements = 0
+    changes: List[Dict[str, Any]] = []
+    changed_sessions = set()
+    for block_id, session_id, text in query.yield_per(500):
+        scanned += 1
+        corrected, replaced = correct_text(automaton, text)
+        if replaced:
+            replacements += replaced
+            changes.append({"id": block_id, "text": corrected})
+            changed_sessions.add(session_id)
+
+    if changes and not dry_run:
+        db.bulk_update_mappings(TranscriptionBlock, changes)
+        db.commit()
+    return {
+        "dry_run": dry_run,
+        "blocks_scanned": scanned,
+        "blocks_changed": len(changes),
+        "replacements": replacements,
+        "session_ids": sorted(changed_sessions),
+    }
+
+
+vocabulary_corrector = VocabularyCorrector()
@@ -0,0 +1,209 @@
+"""
+Vocabulary Prompt Builder
+
+With `use_vocabulary_for_stt` the vocabulary is appended to the STT prompt.
+Whisper only reads about 224 prompt tokens and silently drops the beginning
+of longer prompts, so the whole glossary cannot simply be concatenated.
+
+The builder:
+- pre-tokenises every entry once per vocabulary version (token estimates are
+  recomputed only when the vocabulary changes),
+- ranks entries by relevance: mentions in the session title and the latest
+  transcripts of the session first, then how often the entry showed up in
+  transcripts so far (hit frequency), then vocabulary order,
+- fills the provider's token budget (`stt.vocabulary.token_budget`) after the
+  user's own prompt,
+- caches built suffixes until the vocabulary or the ranking changes.
+
+For Whisper-style providers the most relevant entries go last, so they are
+the ones that survive if the server truncates anyway.
+
+Usage:
+    from app.services.vocabulary_prompt import vocabulary_prompts
+
+    suffix = vocabulary_prompts.build(provider, base_prompt, vocabulary, session_id)
+    vocabulary_prompts.record_hits(transcript)
+"""
+
+import hashlib
+import json
+import math
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from app.core.config import settings
+
+DEFAULT_TOKEN_BUDGET = 224
+
+# Separator between entries (", ") costs about one token
+SEPARATOR_TOKENS = 1
+
+GEMINI_INSTRUCTION = ("\n\nPlease verify whether the following terms are included in the audio "
+                      "and transcribe them correctly using the specified readings:\n")
+
+# Built suffixes kept per process before the cache is reset
+MAX_CACHED_PROMPTS = 256
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count estimate for BPE tokenizers (Whisper / GPT): about four ASCII
+    characters per token, and one to two tokens per kana / kanji character.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) * 1.5)
+
+
+@dataclass
+class VocabularyEntry:
+    id: str
+    word: str
+    reading: str
+    text: str
+    tokens: int
+    order: int
+
+    def found_in(self, text: str) -> bool:
+        return bool(self.word and self.word in text) or bool(self.reading and self.reading in text)
+
+
+def vocabulary_fingerprint(vocabulary: List[Dict[str, Any]]) -> str:
+    items = [(v.get("id"), v.get("word"), v.get("reading")) for v in vocabulary]
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _session_context(session_id: str) -> str:
+    """Session title plus the text of its latest transcribed blocks."""
+    from app.db.base import SessionLocal
+    from app.models.session import Session as SessionModel
+    from app.models.transcription_block import TranscriptionBlock
+
+    db = SessionLocal()
+    try:
+        title = db.query(SessionModel.title).filter(SessionModel.id == session_id).scalar() or ""
+        texts = (
+            db.query(TranscriptionBlock.text)
+            .filter(TranscriptionBlock.session_id == session_id, TranscriptionBlock.is_deleted == False)
+            .order_by(TranscriptionBlock.created_at.desc())
+            .limit(settings.STT_VOCAB_CONTEXT_BLOCKS)
+            .all()
+        )
+        return "\n".join([title] + [text for (text,) in texts if text])
+    finally:
+        db.close()
+
+
+class VocabularyPromptBuilder:
+    def __init__(self):
+        self._fingerprint: Optional[str] = None
+        self._entries: List[VocabularyEntry] = []
+        self._hits: Counter = Counter()
+        self._ranking: Optional[List[VocabularyEntry]] = None
+        self._prompts: Dict[Tuple[str, str, FrozenSet[str]], str] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.cache_hits = 0
+
+    def _load(self, vocabulary: List[Dict[str, Any]]) -> List[VocabularyEntry]:
+        """Pre-tokenised entries for this vocabulary version (caller holds the lock)."""
+        fingerprint = vocabulary_fingerprint(vocabulary)
+        if fingerprint != self._fingerprint:
+            entries = []
+            for order, v in enumerate(vocabulary):
+                word, reading = (v.get("word") or "").strip(), (v.get("reading") or "").strip()
+                if not word:
+                    continue
+                text = f"{word}({reading})" if reading else word
+                entries.append(VocabularyEntry(str(v.get("id") or word), word, reading, text, estimate_tokens(text), order))
+            self._fingerprint = fingerprint
+            self._entries = entries
+            self._ranking = None
+            self._prompts.clear()
+        return self._entries
+
+    def _ranked(self) -> List[VocabularyEntry]:
+        """Entries by hit frequency, then vocabulary order (caller holds the lock)."""
+        if self._ranking is None:
+            self._ranking = sorted(self._entries, key=lambda e: (-self._hits[e.id], e.order))
+        return self._ranking
+
+    def build(self, provider: str, base_prompt: str, vocabulary: List[Dict[str, Any]],
+              session_id: Optional[str] = None) -> str:
+        """Vocabulary suffix for `base_prompt`, within the provider's token budget."""
+        context = ""
+        if session_id and vocabulary:
+            try:
+                context = _session_context(session_id)
+            except Exception as e:
+                print(f"[Vocabulary] Could not load context of session {session_id}: {e}")
+
+        with self._lock:
+            entries = self._load(vocabulary)
+            if not entries:
+                return ""
+            mentioned = frozenset(e.id for e in entries if context and e.found_in(context))
+            key = (provider, base_prompt, mentioned)
+            cached = self._prompts.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+            ranked = self._ranked()
+            ranked = [e for e in ranked if e.id in mentioned] + [e for e in ranked if e.id not in mentioned]
+            budget = int(settings.STT_VOCAB_TOKEN_BUDGET.get(provider, DEFAULT_TOKEN_BUDGET))
+            budget -= estimate_tokens(base_prompt) + estimate_tokens(GEMINI_INSTRUCTION if provider == "gemini" else " ")
+
+            selected: List[VocabularyEntry] = []
+            for entry in ranked:
+                cost = entry.tokens + (SEPARATOR_TOKENS if selected else 0)
+                if cost <= budget:
+                    selected.append(entry)
+                    budget -= cost
+
+            if not selected:
+                suffix = ""
+            elif provider == "gemini":
+                suffix = GEMINI_INSTRUCTION + ", ".join(e.text for e in selected)
+            else:
+                # Whisper keeps the end of an over-long prompt: most relevant last
+                suffix = " " + ", ".join(e.text for e in reversed(selected))
+
+            if len(self._prompts) >= MAX_CACHED_PROMPTS:
+                self._prompts.clear()
+            self._prompts[key] = suffix
+            self.builds += 1
+            if len(selected) < len(entries):
+                print(f"[Vocabulary] {provider}: {len(selected)}/{len(entries)} entries fit the prompt budget")
+            return suffix
+
+    def record_hits(self, text: str):
+        """Count the entries found in a finished transcript (feeds the ranking)."""
+        if not text:
+            return
+        with self._lock:
+            found = [e.id for e in self._entries if e.found_in(text)]
+            if not found:
+                return
+            self._hits.update(found)
+            ranking = sorted(self._entries, key=lambda e: (-self._hits[e.id], e.order))
+            if self._ranking is None or [e.id for e in ranking] != [e.id for e in self._ranking]:
+                self._ranking = ranking
+                self._prompts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_tokens": sum(e.tokens for e in self._entries),
+                "cached_prompts": len(self._prompts),
+                "builds": self.builds,
+                "cache_hits": self.cache_hits,
+                "top_hits": self._hits.most_common(10),
+            }
+
+
+vocabulary_prompts = VocabularyPromptBuilder()
@@ -0,0 +1,272 @@
+"""
+Transcription Worker
+
+Claims jobs from the `transcription_jobs` table and runs them on the
+per-provider worker pool (or the async engine when `system.stt.engine: async`). Runs either inside the API process
+(`system.stt.worker_mode: inline`) or standalone so transcription can scale
+across processes and nodes:
+
+    python -m app.worker
+    python -m app.worker --providers azure,openai --worker-id node-2
+
+Expired leases (jobs whose worker died mid-run) are recovered when a worker
+starts and periodically while it runs.
+"""
+
+import argparse
+import signal
+import threading
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.transcription_block import TranscriptionBlock, STATUS_FAILED
+from app.models.transcription_job import TranscriptionJob
+from app.services.transcription_queue import transcription_queue
+from app.services import transcription_jobs
+
+# How often (seconds) a running worker sweeps for expired leases
+LEASE_RECOVERY_INTERVAL = 30.0
+
+
+class TranscriptionWorker:
+    def __init__(self, worker_id: str = None, providers: Optional[List[str]] = None, poll_interval: float = None):
+        self.worker_id = worker_id or transcription_jobs.default_worker_id()
+        self.providers = providers  # None = every configured provider
+        self.poll_interval = poll_interval if poll_interval is not None else settings.STT_WORKER_POLL_INTERVAL
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_recovery = 0.0
+
+    def wake(self):
+        """Skip the current poll wait (a job was just enqueued)."""
+        self._wake.set()
+
+    def start(self):
+        """Run the claim loop in a daemon thread (inline mode)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="stt-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _recover_leases(self):
+        db = SessionLocal()
+        try:
+            recovered = transcription_jobs.recover_expired_leases(db)
+            if recovered:
+                print(f"[Worker] Recovered {recovered} job(s) with expired leases")
+        except Exception as e:
+            print(f"[Worker] Lease recovery failed: {e}")
+        finally:
+            db.close()
+        self._last_recovery = time.monotonic()
+
+    def _pool(self):
+        """Executor for claimed jobs: thread lanes or the async engine (system.stt.engine)."""
+        if settings.STT_ENGINE == "async":
+            from app.services.async_transcription import async_engine
+            return async_engine, self.process_job_async
+        return transcription_queue, self.process_job
+
+    def _claim_available(self) -> int:
+        """
+        Claim one job per idle provider slot. Returns how many were dispatched.
+        Bulk (batch) jobs may not take the last `STT_INTERACTIVE_RESERVE` slots of a lane.
+        """
+        pool, handler = self._pool()
+        claimed = 0
+        db = SessionLocal()
+        try:
+            while True:
+                candidates = self.providers or pool.providers()
+                providers = [p for p in candidates if pool.has_capacity(p)]
+                bulk_providers = [p for p in providers
+                                  if pool.has_capacity(p, reserve=settings.STT_INTERACTIVE_RESERVE)]
+                job = transcription_jobs.claim_job(db, self.worker_id, providers, bulk_providers=bulk_providers)
+                if not job:
+                    break
+                pool.submit(job.id, job.provider, job=handler)
+                claimed += 1
+        finally:
+            db.close()
+        return claimed
+
+    def run_forever(self):
+        print(f"[Worker] {self.worker_id} started (providers: {self.providers or 'all'})")
+        self._recover_leases()
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._last_recovery > LEASE_RECOVERY_INTERVAL:
+                    self._recover_leases()
+                self._claim_available()
+            except Exception as e:
+                print(f"[Worker] Claim loop error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+        print(f"[Worker] {self.worker_id} stopped")
+
+    def _renew_lease(self, job_id: str) -> bool:
+        """Renew the job lease once; False if it was lost."""
+        db = SessionLocal()
+        try:
+            if not transcription_jobs.renew_lease(db, job_id, self.worker_id):
+                print(f"[Worker] Lost lease for job {job_id}")
+                return False
+        except Exception as e:
+            print(f"[Worker] Lease renewal failed for job {job_id}: {e}")
+        finally:
+            db.close()
+        return True
+
+    def _keep_lease(self, job_id: str, done: threading.Event):
+        """Renew the job lease until `done` is set."""
+        interval = max(1.0, settings.STT_JOB_LEASE / 3)
+        while not done.wait(interval):
+            if not self._renew_lease(job_id):
+                return
+
+    async def keep_lease_async(self, job_id: str):
+        """Renew the job lease until cancelled; only the DB call uses a thread."""
+        import asyncio
+        interval = max(1.0, settings.STT_JOB_LEASE / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self._renew_lease, job_id):
+                return
+
+    @staticmethod
+    def _job_block_id(job_id: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+            return job.block_id if job else None
+        finally:
+            db.close()
+
+    def _complete(self, job_id: str, block_id: Optional[str], cache_hit: bool, error: Optional[str]):
+        """Record the job outcome (failed if the block ended in an error) and notify clients."""
+        from app.api.endpoints.websocket import broadcast_event_threadsafe
+
+        session_id = None
+        progress = None
+        db = SessionLocal()
+        try:
+            if block_id and error is None:
+                block = db.query(TranscriptionBlock).filter(TranscriptionBlock.id == block_id).first()
+                if block:
+                    session_id = block.session_id
+                    if block.status == STATUS_FAILED:
+                        error = block.status_message or "Transcription failed"
+                else:
+                    error = "Block not found"
+            transcription_jobs.finish_job(db, job_id, self.worker_id, error=error, cache_hit=cache_hit)
+            batch_id = db.query(TranscriptionJob.batch_id).filter(TranscriptionJob.id == job_id).scalar()
+            if batch_id:
+                progress = transcription_jobs.batch_progress(db, batch_id)
+        except Exception as e:
+            print(f"[Worker] Failed to record result of job {job_id}: {e}")
+        finally:
+            db.close()
+
+        if session_id:
+            try:
+                broadcast_event_threadsafe("block_updated", {"session_id": session_id, "block_id": block_id, "cached": cache_hit})
+                if progress:
+                    broadcast_event_threadsafe("batch_progress", {"session_id": session_id, **progress})
+            except Exception as e:
+                print(f"[Broadcast] Error after transcription: {e}")
+
+    def process_job(self, job_id: str):
+        """Transcribe the job's block, record the outcome and notify clients."""
+        from app.services.transcription import transcribe_audio_task
+
+        done = threading.Event()
+        threading.Thread(target=self._keep_lease, args=(job_id, done), daemon=True).start()
+
+        block_id = None
+        error = None
+        cache_hit = False
+        try:
+            block_id = self._job_block_id(job_id)
+            if not block_id:
+                return
+            db = SessionLocal()
+            try:
+                cache_hit = transcribe_audio_task(block_id, db, job_id=job_id)
+            finally:
+                db.close()
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            done.set()
+            if block_id:
+                self._complete(job_id, block_id, cache_hit, error)
+
+    async def process_job_async(self, job_id: str):
+        """Coroutine variant of process_job for the async engine."""
+        import asyncio
+        from app.services.async_transcription import transcribe_audio_task_async
+
+        # A sleeping coroutine, not a parked executor thread per in-flight job
+        lease = asyncio.create_task(self.keep_lease_async(job_id))
+
+        block_id = None
+        error = None
+        cache_hit = False
+        try:
+            block_id = await asyncio.to_thread(self._job_block_id, job_id)
+            if not block_id:
+                return
+            cache_hit = await transcribe_audio_task_async(block_id, job_id=job_id)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            lease.cancel()
+            if block_id:
+                await asyncio.to_thread(self._complete, job_id, block_id, cache_hit, error)
+
+
+transcription_worker = TranscriptionWorker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vox transcription worker")
+    parser.add_argument("--providers", help="Comma-separated STT providers to serve (default: all)")
+    parser.add_argument("--worker-id", help="Worker identity recorded on leases (default: host:pid)")
+    parser.add_argument("--poll-interval", type=float, help="Seconds between polls when idle")
+    args = parser.parse_args()
+
+    from app.core.logging import configure_logging
+    from app.services.settings_file import settings_service
+    configure_logging(settings_service.get_general_settings().get("debug_mode", False))
+
+    providers = [p.strip() for p in args.providers.split(",") if p.strip()] if args.providers else None
+    worker = TranscriptionWorker(worker_id=args.worker_id, providers=providers, poll_interval=args.poll_interval)
+
+    def _handle_signal(signum, frame):
+        print(f"[Worker] Signal {signum} received, finishing running jobs...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    worker.run_forever()
+    transcription_queue.shutdown(wait=True)
+    if settings.STT_ENGINE == "async":
+        from app.services.async_transcription import async_engine
+        async_engine.shutdown(wait=True)
+    from app.services.gemini_service import gemini_service
+    gemini_service.files.shutdown()
+
+
+if __name__ == "__main__":
+    main()
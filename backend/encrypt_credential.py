@@ -5,6 +5,7 @@ CLI tool to encrypt credentials using the public key.
 Usage:
     python encrypt_credential.py "your-api-key"
     python encrypt_credential.py --file secrets.txt
+    python encrypt_credential.py --hybrid "key-1" "key-2"
 """
 
 import sys
@@ -14,7 +15,7 @@ from pathlib import Path
 # Add app to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.services.crypto import encrypt, ensure_keypair, PUBLIC_KEY_FILE
+from app.services.crypto import encrypt, encrypt_many, ensure_keypair, PUBLIC_KEY_FILE
 
 
 def main():
@@ -22,9 +23,9 @@ def main():
         description="Encrypt credentials using the public key"
     )
     parser.add_argument(
-        "value",
-        nargs="?",
-        help="The value to encrypt"
+        "values",
+        nargs="*",
+        help="The value(s) to encrypt"
     )
     parser.add_argument(
         "--file", "-f",
@@ -35,6 +36,11 @@ def main():
         action="store_true",
         help="Generate keypair if not exists"
     )
+    parser.add_argument(
+        "--hybrid",
+        action="store_true",
+        help="Hybrid format (AES-GCM + RSA-wrapped key, ENC:v2:); several values share one RSA operation"
+    )
     
     args = parser.parse_args()
     
@@ -43,32 +49,33 @@ def main():
         print("Checking keypair...")
         ensure_keypair()
     
-    # Get value to encrypt
+    # Get value(s) to encrypt
     if args.file:
         with open(args.file, "r") as f:
-            value = f.read().strip()
-    elif args.value:
-        value = args.value
+            values = [f.read().strip()]
+    elif args.values:
+        values = args.values
     else:
         # Interactive mode
         print("Enter the value to encrypt (will not be echoed):")
         import getpass
-        value = getpass.getpass(prompt="")
+        values = [getpass.getpass(prompt="")]
     
-    if not value:
+    if not all(values):
         print("Error: No value provided", file=sys.stderr)
         sys.exit(1)
     
     # Encrypt
     try:
-        encrypted = encrypt(value)
+        encrypted_values = encrypt_many(values) if args.hybrid else [encrypt(value) for value in values]
         print("\n" + "=" * 60)
-        print("Encrypted value:")
+        print("Encrypted value:" if len(values) == 1 else "Encrypted values:")
         print("=" * 60)
-        print(encrypted)
+        for encrypted in encrypted_values:
+            print(encrypted)
         print("=" * 60)
         print("\nCopy this value to your .env file, e.g.:")
-        print(f"OPENAI_API_KEY={encrypted}")
+        print(f"OPENAI_API_KEY={encrypted_values[0]}")
     except FileNotFoundError as e:
         print(f"Error: {e}", file=sys.stderr)
         print("Run with --generate-keys to create the keypair first.", file=sys.stderr)
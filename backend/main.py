@@ -41,6 +41,54 @@ app.include_router(settings_endpoint.router, prefix="/api/settings", tags=["sett
 from app.api.endpoints import websocket as ws_endpoint
 app.include_router(ws_endpoint.router, tags=["websocket"])
 
+@app.on_event("startup")
+def start_workers():
+    # Inline mode: claim durable jobs in-process (also resumes jobs left over from a restart)
+    if settings.STT_WORKER_MODE == "inline":
+        from app.worker import transcription_worker
+        transcription_worker.start()
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    # Lag of the loop serving the API / WebSockets (exposed at /api/system/loop_lag)
+    from app.services.loop_monitor import loop_monitor
+    loop_monitor.start()
+
+@app.on_event("startup")
+async def prewarm_clients():
+    # Open provider connections before the first request (system.clients.prewarm), in the background
+    if not settings.CLIENT_PREWARM:
+        return
+    import asyncio
+    import threading
+    from app.services.openai_factory import client_registry
+    # LLM calls use async clients on this loop, STT uses the worker threads or the async engine loop
+    app.state.prewarm_task = asyncio.create_task(client_registry.prewarm_async(("llm",)))
+    if settings.STT_ENGINE == "async":
+        from app.services.async_transcription import async_engine
+        async_engine.run(client_registry.prewarm_async(("stt",)))
+    else:
+        threading.Thread(target=client_registry.prewarm, args=(("stt",),), name="client-prewarm", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    from app.worker import transcription_worker
+    from app.services.transcription_queue import transcription_queue
+    from app.services.async_transcription import async_engine
+    transcription_worker.stop()
+    transcription_queue.shutdown(wait=False)
+    async_engine.shutdown(wait=False)
+    # Don't leave uploaded audio behind in the Gemini File API
+    from app.services.gemini_service import gemini_service
+    gemini_service.files.shutdown()
+    from app.services.openai_factory import client_registry
+    client_registry.close()
+
+@app.on_event("shutdown")
+async def close_async_clients():
+    from app.services.openai_factory import client_registry
+    await client_registry.aclose()
+
 @app.get("/")
 def read_root():
     return {"Hello": "Vox Backend API"}
@@ -2,9 +2,11 @@ import { useEffect, useState, useRef } from 'react';
 import { Mic, Square, Send, Loader2, Upload } from 'lucide-react';
 
 import { client, endpoints } from './api/client';
+import { uploadAudio } from './api/upload';
 import { useSessions } from './hooks/useSessions';
 import { useBlocks } from './hooks/useBlocks';
 import { useAudioRecorder } from './hooks/useAudioRecorder';
+import { useStreamingRecorder } from './hooks/useStreamingRecorder';
 import { useLLM } from './hooks/useLLM';
 import { useSettingsData } from './hooks/useSettingsData';
 import { useWebSocket } from './hooks/useWebSocket';
@@ -48,6 +50,12 @@ export default function App() {
     onSettingsChange: () => {
       console.log('[Sync] Settings changed, refreshing...');
       settingsData.fetchSettings();
+    },
+    onTranscriptionProgress: (p) => {
+      // Live progress only; final results arrive as block_updated
+      setBlocks(prev => prev.map(b => b.id === p.block_id
+        ? { ...b, status: 'processing', progress: p.progress ?? b.progress, statusMessage: p.message }
+        : b));
     }
   });
 
@@ -58,13 +66,26 @@ export default function App() {
 
   // Audio Recorder
   const {
-    isRecording,
-    duration: recordingDuration,
+    isRecording: isClipRecording,
+    duration: clipDuration,
     startRecording,
     stopRecording,
-    error: recordingError
+    error: clipRecordingError
   } = useAudioRecorder();
 
+  // Live transcription (one block per utterance via /ws/stt)
+  const {
+    isStreaming,
+    duration: streamDuration,
+    startStreaming,
+    stopStreaming,
+    error: streamingError
+  } = useStreamingRecorder();
+
+  const isRecording = isClipRecording || isStreaming;
+  const recordingDuration = isStreaming ? streamDuration : clipDuration;
+  const recordingError = clipRecordingError || streamingError;
+
   // Fetch blocks when session selected
   // Fetch blocks when session selected
   useEffect(() => {
@@ -123,7 +144,7 @@ export default function App() {
   // Monitor blocks to update tasks
   useEffect(() => {
     // 1. Detect new processing blocks
-    const processingBlocks = blocks.filter(b => !b.isDeleted && (b.text === '(Transcription queued...)' || b.text === '(Processing...)'));
+    const processingBlocks = blocks.filter(b => !b.isDeleted && (b.status === 'queued' || b.status === 'processing'));
 
     setTasks(prevTasks => {
       let newTasks = [...prevTasks];
@@ -160,49 +181,31 @@ export default function App() {
           return { ...t, type: 'error', message: 'ブロックが見つかりません', endTime: Date.now() };
         }
 
-        console.log(`[Debug] Checking block ${block.id}: text="${block.text}"`);
+        console.log(`[Debug] Checking block ${block.id}: status="${block.status}"`);
 
-        // Check for specific processing states (queued, retrying, etc.)
-        // Backend now sends: "(Transcription queued...)", "(Retry 1/3...)", "(Error 500: Retrying...)"
-        // All start with "(".
-        if (block.text.startsWith('(') && block.text.endsWith(')')) {
-          console.log(`[Debug] Processing: ${block.id}, text: ${block.text}`);
-          // Still processing, update message if changed
-          if (block.text !== t.message) {
+        // Still queued / running: show the latest progress message
+        if (block.status === 'queued' || block.status === 'processing') {
+          const percent = block.progress ? ` (${Math.round(block.progress * 100)}%)` : '';
+          const message = block.statusMessage
+            ? `${block.statusMessage}${percent}`
+            : (block.status === 'queued' ? '待機中...' : `認識中...${percent}`);
+          if (message !== t.message) {
             changed = true;
-            return { ...t, type: 'processing', message: block.text, endTime: undefined };
+            return { ...t, type: 'processing', message, endTime: undefined };
           }
           return t;
         }
 
         changed = true;
 
-        // Define explicit error conditions
-        const isError = block.text.startsWith('[Error]') ||
-          block.text.includes('Error:') ||
-          block.text.includes('Failed:') ||
-          // If text is very short/empty and NOT processing, it might be an empty transcription or failure
-          (!block.text && !block.filePath); // Just a heuristic, maybe not reliable
-
-        if (isError) {
-          console.log(`[Debug] Error detected: ${block.id}, text: ${block.text}`);
-          return { ...t, type: 'error', message: block.text || '認識エラー', endTime: Date.now() };
-        } else if (block.text.startsWith('(') && block.text.includes('Connection Error')) {
-          // Should be caught by the first if, but just in case
-          console.log(`[Debug] Connection Error Retry: ${block.id}, text: ${block.text}`);
-          if (block.text !== t.message) {
-            changed = true;
-            return { ...t, type: 'processing', message: block.text, endTime: undefined };
-          }
-          return t;
-        } else {
-          // Success case
-          // Assuming if it's not processing (starts with paren) and not explicit error, it's content.
-          // However, if we crashed, we might have garbage or old text? 
-          // We rely on backend updating to [Error] on crash.
-          console.log(`[Debug] Success: ${block.id}, text: ${block.text}`);
-          return { ...t, type: 'success', message: '認識が完了しました', endTime: Date.now() };
+        if (block.status === 'failed' || block.status === 'cancelled') {
+          console.log(`[Debug] Error detected: ${block.id}, status: ${block.status}`);
+          return { ...t, type: 'error', message: block.statusMessage || '認識エラー', endTime: Date.now() };
         }
+
+        console.log(`[Debug] Success: ${block.id}`);
+        // Completed with a note (e.g. no speech detected in the clip)
+        return { ...t, type: 'success', message: block.statusMessage || '認識が完了しました', endTime: Date.now() };
       });
 
       return changed ? newTasks : prevTasks;
@@ -315,17 +318,8 @@ export default function App() {
   };
 
   const handleFileUpload = async (file: File) => {
-    const formData = new FormData();
-    formData.append('file', file);
-    if (selectedSessionId) {
-      formData.append('session_id', selectedSessionId);
-    }
-
     try {
-      const response = await client.post(endpoints.audio.upload, formData, {
-        headers: { 'Content-Type': 'multipart/form-data' }
-      });
-      const { session_id } = response.data;
+      const { session_id } = await uploadAudio(file, selectedSessionId);
 
       if (session_id !== selectedSessionId) {
         // New session created
@@ -372,7 +366,7 @@ export default function App() {
     // `blocks` is already sorted by backend response (usually creation time or index).
     // If user wants specific drag-order, `blocks` state should reflect that.
     const targetBlocks = (checkedBlocks.length > 0 ? checkedBlocks : blocks.filter(b => !b.isDeleted))
-      .filter(b => !b.text.startsWith("[Error]") && !b.text.includes("Error:") && !b.text.includes("Failed:"));
+      .filter(b => b.text.trim());
 
     if (targetBlocks.length === 0 && !editorContent.trim() && !extraPrompt.trim()) {
       addNotification("error", "コンテキスト（文字起こし、エディタ、またはプロンプト）が空です。");
@@ -500,11 +494,16 @@ export default function App() {
   };
 
   const handleMainRecordingToggle = async () => {
-    if (isRecording) {
+    if (isStreaming) {
+      stopStreaming();
+    } else if (isClipRecording) {
       const file = await stopRecording();
       if (file) {
         await handleFileUpload(file);
       }
+    } else if ((generalSettings as any).stt_streaming && selectedSessionId) {
+      // Streaming needs an existing session; new sessions are still created by upload
+      await startStreaming(selectedSessionId);
     } else {
       await startRecording();
     }
@@ -41,9 +41,14 @@ export const client = axios.create({
 export const endpoints = {
     audio: {
         upload: '/api/audio/upload',
+        uploads: '/api/audio/uploads',
+        uploadDetail: (id: string) => `/api/audio/uploads/${id}`,
+        uploadFinalize: (id: string) => `/api/audio/uploads/${id}/finalize`,
     },
     stt: {
         transcribe: (id: string) => `/api/stt/transcribe/${id}`,
+        transcribeBatch: '/api/stt/transcribe',
+        batch: (batchId: string) => `/api/stt/batches/${batchId}`,
     },
     llm: {
         stream: '/api/llm/chat/stream',
@@ -58,6 +63,7 @@ export const endpoints = {
         update: (id: string) => `/api/sessions/${id}`,
         delete: (id: string) => `/api/sessions/${id}`,
         restore: (id: string) => `/api/sessions/${id}/restore`,
+        transcribe: (id: string) => `/api/sessions/${id}/transcribe`,
         emptyTrash: '/api/sessions/trash/empty',
         blocks: {
             list: (sessionId: string) => `/api/sessions/${sessionId}/blocks`,
@@ -79,6 +85,7 @@ export const endpoints = {
     vocabulary: {
         list: '/api/vocabulary/',
         detail: (id: string) => `/api/vocabulary/${id}`,
+        apply: '/api/vocabulary/apply',
     },
     settings: {
         list: '/api/settings/',
@@ -0,0 +1,67 @@
+import { client, endpoints } from './client';
+
+// Resumable audio upload: create -> PATCH chunks at offsets -> finalize.
+// After a dropped connection the server keeps every byte it received, so we ask
+// for its offset and send only the rest.
+
+const MAX_RETRIES = 8;
+
+export interface AudioUploadResult {
+    block_id: string;
+    session_id: string;
+    file_path: string;
+    sha256: string;
+}
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+const serverOffset = async (uploadId: string): Promise<number> => {
+    const res = await client.get(endpoints.audio.uploadDetail(uploadId));
+    return res.data.offset;
+};
+
+export const uploadAudio = async (
+    file: File,
+    sessionId?: string | null,
+    onProgress?: (fraction: number) => void,
+): Promise<AudioUploadResult> => {
+    const created = await client.post(endpoints.audio.uploads, {
+        filename: file.name,
+        size: file.size,
+        session_id: sessionId || null,
+    });
+    const uploadId: string = created.data.id;
+    const chunkSize: number = created.data.chunk_size;
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+        try {
+            const res = await client.patch(
+                endpoints.audio.uploadDetail(uploadId),
+                file.slice(offset, Math.min(offset + chunkSize, file.size)),
+                { headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) } },
+            );
+            offset = res.data.offset;
+            failures = 0;
+            onProgress?.(offset / file.size);
+        } catch (err: any) {
+            if (err.response?.status === 409 && typeof err.response.data?.detail?.offset === 'number') {
+                offset = err.response.data.detail.offset;
+                continue;
+            }
+            if (err.response && err.response.status < 500) throw err;
+            if (++failures > MAX_RETRIES) throw err;
+            // Network drop / server error: back off, then resume from what the server has
+            await sleep(Math.min(30000, 1000 * 2 ** (failures - 1)));
+            try {
+                offset = await serverOffset(uploadId);
+            } catch (e) {
+                console.warn('[Upload] Could not fetch upload offset, retrying', e);
+            }
+        }
+    }
+
+    const finalized = await client.post(endpoints.audio.uploadFinalize(uploadId), {});
+    return finalized.data;
+};
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Settings, X, Plus, Trash2, Database, Download, Upload, HardDrive, FileArchive, Save, RotateCcw, AlertTriangle, FileUp } from 'lucide-react';
-import { client } from '../api/client';
+import { client, endpoints } from '../api/client';
 import { useSettingsData } from '../hooks/useSettingsData';
 import type { PromptTemplate, VocabularyItem, ApiConfig } from '../types';
 
@@ -180,6 +180,14 @@ export const SettingsModal: React.FC<SettingsModalProps> = ({
         } catch (e) { alert("削除に失敗しました"); }
     };
 
+    const applyVocabToSessions = async () => {
+        if (!confirm("既存のすべての文字起こし結果に、読み→単語の置き換えを適用しますか？")) return;
+        try {
+            const res = await client.post(endpoints.vocabulary.apply, {});
+            alert(`${res.data.blocks_changed} 件のブロックで ${res.data.replacements} 箇所を置き換えました`);
+        } catch (e) { alert("適用に失敗しました"); }
+    };
+
     const handleExport = async () => {
         if (!exportFrom || !exportTo) {
             alert("期間（開始日・終了日）を指定してください。");
@@ -610,6 +618,24 @@ export const SettingsModal: React.FC<SettingsModalProps> = ({
                                             />
                                             登録済みの単語（用語集）をプロンプトに含める
                                         </label>
+                                        <label className="flex items-center gap-2 text-sm font-medium text-gray-700 mb-3 cursor-pointer">
+                                            <input
+                                                type="checkbox"
+                                                checked={(generalSettings as any).use_vocabulary_correction || false}
+                                                onChange={(e) => setGeneralSettings({ ...generalSettings, use_vocabulary_correction: e.target.checked } as any)}
+                                                className="w-4 h-4 text-blue-600 rounded"
+                                            />
+                                            文字起こし結果の読みを登録済みの単語に置き換える
+                                        </label>
+                                        <label className="flex items-center gap-2 text-sm font-medium text-gray-700 mb-3 cursor-pointer">
+                                            <input
+                                                type="checkbox"
+                                                checked={(generalSettings as any).stt_streaming || false}
+                                                onChange={(e) => setGeneralSettings({ ...generalSettings, stt_streaming: e.target.checked } as any)}
+                                                className="w-4 h-4 text-blue-600 rounded"
+                                            />
+                                            リアルタイム文字起こし（発話ごとにブロックを追加）
+                                        </label>
 
                                         <div className="space-y-3">
                                             <label className="block text-sm font-medium text-gray-700">認識用プロンプト (システム指示)</label>
@@ -903,7 +929,10 @@ export const SettingsModal: React.FC<SettingsModalProps> = ({
                             <div className="space-y-4 max-w-3xl">
                                 <div className="flex justify-between items-center border-b pb-2 mb-4">
                                     <div><h4 className="text-md font-bold text-gray-900">単語登録 (辞書)</h4><p className="text-xs text-gray-500 mt-1">音声認識時に優先して認識させたい社内用語を登録。</p></div>
-                                    <button onClick={addVocab} className="text-sm bg-blue-600 text-white px-3 py-1.5 rounded hover:bg-blue-700 flex items-center gap-1"><Plus size={14} /> 単語を追加</button>
+                                    <div className="flex gap-2">
+                                        <button onClick={applyVocabToSessions} className="text-sm border border-gray-300 text-gray-700 px-3 py-1.5 rounded hover:bg-gray-100">既存の文字起こしに適用</button>
+                                        <button onClick={addVocab} className="text-sm bg-blue-600 text-white px-3 py-1.5 rounded hover:bg-blue-700 flex items-center gap-1"><Plus size={14} /> 単語を追加</button>
+                                    </div>
                                 </div>
                                 <div className="bg-gray-50 border border-gray-200 rounded-lg overflow-hidden">
                                     <table className="w-full text-sm text-left">
@@ -290,8 +290,8 @@ export const TranscriptionList: React.FC<TranscriptionListProps> = ({
 
                 {displayBlocks.map((block, index) => {
                     // Detect status
-                    const isProcessing = (!block.isDeleted) && block.text.startsWith('(') && block.text.endsWith(')');
-                    const isError = block.text.startsWith('[Error]') || block.text.includes('Error:') || block.text.includes('Failed:');
+                    const isProcessing = (!block.isDeleted) && (block.status === 'queued' || block.status === 'processing');
+                    const isError = block.status === 'failed' || block.status === 'cancelled';
 
                     const isReadOnly = isProcessing || showTrash;
 
@@ -412,19 +412,24 @@ export const TranscriptionList: React.FC<TranscriptionListProps> = ({
                                     {isProcessing && (
                                         <div className="mb-2 bg-blue-100 border border-blue-200 text-blue-800 text-xs px-2 py-1.5 rounded-md flex items-center gap-2 animate-pulse">
                                             <RefreshCw size={12} className="animate-spin" />
-                                            <span className="font-bold">処理中:</span> {block.text.replace(/^\(|\)$/g, '')}
+                                            <span className="font-bold">処理中:</span> {block.statusMessage || (block.status === 'queued' ? '待機中...' : '認識中...')}
+                                            {block.progress ? <span className="ml-auto font-mono">{Math.round(block.progress * 100)}%</span> : null}
                                         </div>
                                     )}
                                     {isError && (
                                         <div className="mb-2 bg-red-50 border border-red-200 text-red-800 text-xs px-2 py-1.5 rounded-md">
-                                            <span className="font-bold">エラー:</span> {block.text}
+                                            <span className="font-bold">{block.status === 'cancelled' ? 'キャンセル:' : 'エラー:'}</span> {block.statusMessage}
+                                        </div>
+                                    )}
+                                    {block.status === 'completed' && block.statusMessage && (
+                                        <div className="mb-2 bg-gray-50 border border-gray-200 text-gray-600 text-xs px-2 py-1.5 rounded-md">
+                                            <span className="font-bold">情報:</span> {block.statusMessage}
                                         </div>
                                     )}
 
                                     <textarea
                                         className={`w-full text-sm text-gray-800 leading-relaxed outline-none focus:bg-yellow-50 rounded px-2 py-1 -mx-2 resize-y bg-transparent min-h-[4rem]
                                             ${isProcessing ? 'opacity-50 cursor-not-allowed select-none' : ''}
-                                            ${isError ? 'text-red-600' : ''}
                                         `}
                                         rows={Math.min(Math.max(3, block.text.split('\n').length), 10)}
                                         value={block.text}
@@ -1,5 +1,6 @@
 import { useState, useCallback } from 'react';
 import { client, endpoints } from '../api/client';
+import { uploadAudio } from '../api/upload';
 import type { TranscriptionBlock } from '../types';
 
 export const useBlocks = () => {
@@ -37,9 +38,18 @@ export const useBlocks = () => {
                 duration: b.duration,
                 fileName: b.file_name,
                 isDeleted: b.is_deleted,
-                color: b.color
+                color: b.color,
+                status: b.status,
+                progress: b.progress,
+                statusMessage: b.status_message
+            }));
+            // Keep live progress (pushed over WebSocket, not stored) while a block is still running
+            setBlocks(prev => fetchedBlocks.map((b: TranscriptionBlock) => {
+                const current = prev.find(p => p.id === b.id);
+                return current && b.status === 'processing' && current.status === 'processing'
+                    ? { ...b, progress: current.progress, statusMessage: current.statusMessage }
+                    : b;
             }));
-            setBlocks(fetchedBlocks);
         } catch (err) {
             console.error(err);
             setError('Failed to fetch blocks');
@@ -71,7 +81,10 @@ export const useBlocks = () => {
                     duration: b.duration,
                     fileName: b.file_name,
                     isDeleted: b.is_deleted,
-                    color: b.color
+                    color: b.color,
+                    status: b.status,
+                    progress: b.progress,
+                    statusMessage: b.status_message
                 };
 
                 setBlocks(prev => [...prev, newBlock]);
@@ -84,12 +97,7 @@ export const useBlocks = () => {
     const addAudioBlock = async (sessionId: string, file: File) => {
         if (!sessionId) return;
         try {
-            const formData = new FormData();
-            formData.append('file', file);
-            formData.append('session_id', sessionId);
-            await client.post(endpoints.audio.upload, formData, {
-                headers: { 'Content-Type': 'multipart/form-data' }
-            });
+            await uploadAudio(file, sessionId);
             await fetchBlocks(sessionId);
         } catch (err) {
             console.error(err);
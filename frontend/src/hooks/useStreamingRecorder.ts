@@ -0,0 +1,114 @@
+import { useState, useRef, useCallback } from 'react';
+import { getWsUrl } from './useWebSocket';
+
+interface StreamingRecorderState {
+    isStreaming: boolean;
+    duration: number;
+    error: string | null;
+}
+
+const TARGET_SAMPLE_RATE = 16000;
+
+// Downsample Float32 microphone samples to 16 kHz s16le PCM
+const toPcm16 = (input: Float32Array, inputRate: number): ArrayBuffer => {
+    const ratio = inputRate / TARGET_SAMPLE_RATE;
+    const length = Math.floor(input.length / ratio);
+    const output = new Int16Array(length);
+    for (let i = 0; i < length; i++) {
+        const sample = Math.max(-1, Math.min(1, input[Math.floor(i * ratio)]));
+        output[i] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+    }
+    return output.buffer;
+};
+
+/**
+ * Live recording: streams microphone PCM to /ws/stt/{sessionId}.
+ * The server splits speech into utterances and creates one block per utterance
+ * as soon as it is spoken (blocks arrive through the regular sync WebSocket).
+ */
+export const useStreamingRecorder = () => {
+    const [state, setState] = useState<StreamingRecorderState>({
+        isStreaming: false,
+        duration: 0,
+        error: null
+    });
+
+    const wsRef = useRef<WebSocket | null>(null);
+    const audioContextRef = useRef<AudioContext | null>(null);
+    const processorRef = useRef<ScriptProcessorNode | null>(null);
+    const streamRef = useRef<MediaStream | null>(null);
+    const timerRef = useRef<ReturnType<typeof setInterval> | null>(null);
+
+    const releaseAudio = useCallback(() => {
+        processorRef.current?.disconnect();
+        processorRef.current = null;
+        audioContextRef.current?.close();
+        audioContextRef.current = null;
+        streamRef.current?.getTracks().forEach(track => track.stop());
+        streamRef.current = null;
+        if (timerRef.current) {
+            clearInterval(timerRef.current);
+            timerRef.current = null;
+        }
+    }, []);
+
+    const startStreaming = useCallback(async (sessionId: string) => {
+        try {
+            const stream = await navigator.mediaDevices.getUserMedia({ audio: { channelCount: 1 } });
+            streamRef.current = stream;
+
+            const ws = new WebSocket(getWsUrl(`/ws/stt/${sessionId}?sample_rate=${TARGET_SAMPLE_RATE}`));
+            ws.binaryType = 'arraybuffer';
+            wsRef.current = ws;
+
+            ws.onclose = (event) => {
+                if (event.code === 4403 || event.code === 4404) {
+                    setState(prev => ({ ...prev, error: "リアルタイム文字起こしを開始できませんでした。" }));
+                }
+                releaseAudio();
+                setState(prev => ({ ...prev, isStreaming: false }));
+            };
+
+            const audioContext = new AudioContext();
+            audioContextRef.current = audioContext;
+            const source = audioContext.createMediaStreamSource(stream);
+            const processor = audioContext.createScriptProcessor(4096, 1, 1);
+            processorRef.current = processor;
+
+            processor.onaudioprocess = (e) => {
+                if (ws.readyState === WebSocket.OPEN) {
+                    ws.send(toPcm16(e.inputBuffer.getChannelData(0), audioContext.sampleRate));
+                }
+            };
+            source.connect(processor);
+            processor.connect(audioContext.destination);
+
+            setState({ isStreaming: true, error: null, duration: 0 });
+            timerRef.current = setInterval(() => {
+                setState(prev => ({ ...prev, duration: prev.duration + 1 }));
+            }, 1000);
+
+        } catch (err: any) {
+            console.error("Error starting streaming transcription:", err);
+            releaseAudio();
+            setState(prev => ({ ...prev, error: "マイクへのアクセスが拒否されました。" }));
+        }
+    }, [releaseAudio]);
+
+    const stopStreaming = useCallback(() => {
+        releaseAudio();
+        const ws = wsRef.current;
+        if (ws && ws.readyState === WebSocket.OPEN) {
+            // Server flushes the last utterance and closes after its transcript
+            ws.send(JSON.stringify({ type: 'stop' }));
+        }
+        wsRef.current = null;
+        setState(prev => ({ ...prev, isStreaming: false }));
+    }, [releaseAudio]);
+
+    return {
+        ...state,
+        startStreaming,
+        stopStreaming
+    };
+};
@@ -1,7 +1,7 @@
 import { useEffect, useRef, useCallback } from 'react';
 
 // Get WebSocket URL based on current page location
-const getWsUrl = (): string => {
+export const getWsUrl = (path: string = '/ws'): string => {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const hostname = window.location.hostname;
     const port = window.location.port;
@@ -9,13 +9,13 @@ const getWsUrl = (): string => {
     // Check if we're behind nginx (ports 80, 443, or empty)
     if (port === '' || port === '80' || port === '443') {
         // Connect via nginx proxy
-        const url = `${protocol}//${window.location.host}/ws`;
+        const url = `${protocol}//${window.location.host}${path}`;
         console.log('[WebSocket] Using nginx proxy:', url);
         return url;
     }
 
     // Direct connection (development on port 5173)
-    const url = `${protocol}//${hostname}:8000/ws`;
+    const url = `${protocol}//${hostname}:8000${path}`;
     console.log('[WebSocket] Direct connection:', url);
     return url;
 };
@@ -23,7 +23,7 @@ const getWsUrl = (): string => {
 export interface SyncMessage {
     type: 'session_created' | 'session_updated' | 'session_deleted' |
     'block_created' | 'block_updated' | 'block_deleted' |
-    'revision_created' | 'settings_updated';
+    'revision_created' | 'settings_updated' | 'batch_progress' | 'transcription_progress';
     payload: {
         session_id?: string;
         block_id?: string;
@@ -36,6 +36,16 @@ interface UseWebSocketOptions {
     onBlockChange?: (sessionId: string) => void;
     onSettingsChange?: () => void;
     onRevisionChange?: (sessionId: string) => void;
+    onTranscriptionProgress?: (progress: TranscriptionProgress) => void;
+}
+
+// Transient transcription progress (retries, segments); not stored on the server
+export interface TranscriptionProgress {
+    session_id: string;
+    block_id: string;
+    status: string;
+    progress: number | null;
+    message: string;
 }
 
 export function useWebSocket(options: UseWebSocketOptions) {
@@ -90,6 +100,9 @@ export function useWebSocket(options: UseWebSocketOptions) {
                     case 'settings_updated':
                         opts.onSettingsChange?.();
                         break;
+                    case 'transcription_progress':
+                        opts.onTranscriptionProgress?.(message.payload as TranscriptionProgress);
+                        break;
                 }
             } catch (err) {
                 console.error('[WebSocket] Failed to parse message:', err);
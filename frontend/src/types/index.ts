@@ -1,7 +1,12 @@
+export type TranscriptionStatus = 'queued' | 'processing' | 'completed' | 'failed' | 'cancelled';
+
 export interface TranscriptionBlock {
     id: string;
     type: 'audio' | 'text';
     text: string;
+    status?: TranscriptionStatus | null;  // Transcription state (text only changes on success)
+    progress?: number | null;  // 0..1, live updates arrive over WebSocket
+    statusMessage?: string | null;  // Progress / error message
     timestamp: string;
     isChecked: boolean;
     duration?: string;
@@ -0,0 +1,101 @@
+"""
+Upload -> transcribe -> broadcast.
+
+Uploads `--requests` distinct clips with `--concurrency` parallel clients and
+waits for the worker's `block_updated` broadcast of each block on a WebSocket
+listener (falls back to polling the blocks without `websockets`).
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench_utils import close_listeners, open_listeners, rate, speech_wav, summarize_ms
+
+NAME = "upload_transcribe"
+
+
+def _upload(base_url: str, session_id: str, index: int, clip_seconds: float):
+    audio = speech_wav(clip_seconds, seed=index)
+    start = time.perf_counter()
+    resp = requests.post(f"{base_url}/api/audio/upload", data={"session_id": session_id},
+                         files={"file": (f"bench_{index:04d}.wav", audio, "audio/wav")}, timeout=120)
+    finished = time.perf_counter()
+    block_id = resp.json().get("block_id") if resp.status_code == 200 else None
+    return index, start, finished, resp.status_code, block_id
+
+
+def _final_states(base_url: str, session_id: str):
+    blocks = requests.get(f"{base_url}/api/sessions/{session_id}/blocks", timeout=30).json()
+    return {b["id"]: b.get("status") for b in blocks}
+
+
+def run(ctx):
+    resp = requests.post(f"{ctx.base_url}/api/sessions/", json={"title": "Benchmark: upload/transcribe"}, timeout=30)
+    resp.raise_for_status()
+    session_id = resp.json()["id"]
+
+    listeners = []
+    try:
+        listeners = open_listeners(ctx.ws_url, 1)
+    except ImportError:
+        print("  websockets not installed: completion is detected by polling")
+
+    try:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=ctx.concurrency) as pool:
+            uploads = list(pool.map(lambda i: _upload(ctx.base_url, session_id, i, ctx.clip_seconds), range(ctx.requests)))
+        uploaded_at = time.perf_counter()
+
+        started = {block_id: start for _, start, _, status, block_id in uploads if block_id}
+        upload_errors = {}
+        for _, _, _, status, block_id in uploads:
+            if not block_id:
+                upload_errors[str(status)] = upload_errors.get(str(status), 0) + 1
+
+        # Wait for every block to finish (broadcast, or polling without a listener)
+        completed_at = {}
+        deadline = time.monotonic() + ctx.timeout
+        while len(completed_at) < len(started) and time.monotonic() < deadline:
+            if listeners:
+                for block_id, received in listeners[0].received("block_updated", "block_id").items():
+                    if block_id in started:
+                        completed_at.setdefault(block_id, received)
+                time.sleep(0.1)
+            else:
+                now = time.perf_counter()
+                for block_id, status in _final_states(ctx.base_url, session_id).items():
+                    if block_id in started and status not in ("queued", "processing"):
+                        completed_at.setdefault(block_id, now)
+                time.sleep(0.5)
+
+        states = _final_states(ctx.base_url, session_id)
+        outcome = {}
+        for block_id in started:
+            state = states.get(block_id) if block_id in completed_at else "timeout"
+            outcome[state or "unknown"] = outcome.get(state or "unknown", 0) + 1
+        finished = [completed_at[b] for b in started if b in completed_at]
+        wall = (max(finished) if finished else time.perf_counter()) - wall_start
+
+        return {
+            "requests": ctx.requests,
+            "concurrency": ctx.concurrency,
+            "clip_seconds": ctx.clip_seconds,
+            "upload": {
+                "ok": len(started),
+                "errors": upload_errors,
+                "throughput_per_s": rate(len(started), uploaded_at - wall_start),
+                "latency": summarize_ms([done - start for _, start, done, _, block_id in uploads if block_id]),
+            },
+            "transcription": {
+                "outcome": outcome,
+                "throughput_per_s": rate(len(finished), wall),
+                # Upload start -> completion broadcast received
+                "end_to_end": summarize_ms([completed_at[b] - started[b] for b in started if b in completed_at]),
+            },
+            "wall_seconds": round(wall, 3),
+        }
+    finally:
+        close_listeners(listeners)
+        requests.delete(f"{ctx.base_url}/api/sessions/{session_id}", timeout=30)
@@ -0,0 +1,73 @@
+"""
+LLM streaming (`/api/llm/chat/stream`).
+
+Runs `--requests` chat streams with `--concurrency` parallel clients and
+measures time to first token, total stream time and the gap between tokens.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench_utils import rate, summarize_ms
+
+NAME = "llm_stream"
+
+
+def _stream(base_url: str, index: int):
+    body = {"messages": [{"role": "user", "content": f"Benchmark request {index}: summarise the meeting."}]}
+    start = time.perf_counter()
+    first_token = None
+    tokens = 0
+    error = None
+    try:
+        with requests.post(f"{base_url}/api/llm/chat/stream", json=body, stream=True, timeout=300) as resp:
+            if resp.status_code != 200:
+                return start, None, time.perf_counter(), 0, f"HTTP {resp.status_code}"
+            for line in resp.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:]
+                if data == b"[DONE]":
+                    break
+                event = json.loads(data)
+                if "content" in event:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    tokens += 1
+                elif event.get("type") == "error":
+                    error = event.get("message") or "error"
+    except requests.RequestException as e:
+        error = type(e).__name__
+    return start, first_token, time.perf_counter(), tokens, error
+
+
+def run(ctx):
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=ctx.concurrency) as pool:
+        streams = list(pool.map(lambda i: _stream(ctx.base_url, i), range(ctx.requests)))
+    wall = time.perf_counter() - wall_start
+
+    ok = [s for s in streams if not s[4] and s[1] is not None]
+    errors = {}
+    for s in streams:
+        if s[4] or s[1] is None:
+            key = (s[4] or "no tokens")[:80]
+            errors[key] = errors.get(key, 0) + 1
+    total_tokens = sum(s[3] for s in ok)
+
+    return {
+        "requests": ctx.requests,
+        "concurrency": ctx.concurrency,
+        "ok": len(ok),
+        "errors": errors,
+        "throughput_per_s": rate(len(ok), wall),
+        "tokens_per_s": rate(total_tokens, wall),
+        "ttft": summarize_ms([first - start for start, first, _, _, _ in ok]),
+        "stream_duration": summarize_ms([end - start for start, _, end, _, _ in ok]),
+        # Mean gap between tokens of each stream, after the first token
+        "inter_token": summarize_ms([(end - first) / max(1, tokens - 1) for _, first, end, tokens, _ in ok]),
+        "wall_seconds": round(wall, 3),
+    }
@@ -0,0 +1,72 @@
+"""
+WebSocket fan-out.
+
+Keeps `--listeners` clients on `/ws` and renames a session `--requests` times
+(`--concurrency` in parallel); every rename is broadcast as `session_updated`.
+Measures delivery latency (request start -> event received, per listener)
+and how many of the expected deliveries arrived.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench_utils import close_listeners, open_listeners, rate, summarize_ms
+
+NAME = "websocket_fanout"
+
+
+def run(ctx):
+    try:
+        listeners = open_listeners(ctx.ws_url, ctx.listeners)
+    except ImportError:
+        return {"skipped": "websockets not installed"}
+
+    resp = requests.post(f"{ctx.base_url}/api/sessions/", json={"title": "Benchmark: fan-out"}, timeout=30)
+    resp.raise_for_status()
+    session_id = resp.json()["id"]
+    try:
+        def _rename(index):
+            start = time.perf_counter()
+            resp = requests.patch(f"{ctx.base_url}/api/sessions/{session_id}", json={"title": f"Benchmark {index}"}, timeout=60)
+            return start, time.perf_counter(), resp.status_code
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=ctx.concurrency) as pool:
+            renames = list(pool.map(_rename, range(ctx.requests)))
+        sent = [r for r in renames if r[2] == 200]
+
+        # Let the last broadcasts arrive
+        expected = len(sent)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if all(len(l.times("session_updated", session_id=session_id)) >= expected for l in listeners):
+                break
+            time.sleep(0.1)
+        wall = time.perf_counter() - wall_start
+
+        # Events of concurrent renames can arrive in any order: match the n-th event to the n-th request start
+        starts = sorted(start for start, _, _ in sent)
+        latencies = []
+        delivered = 0
+        for listener in listeners:
+            received = listener.times("session_updated", session_id=session_id)
+            delivered += min(len(received), expected)
+            latencies.extend(max(0.0, r - s) for r, s in zip(received, starts))
+
+        return {
+            "listeners": len(listeners),
+            "broadcasts": expected,
+            "request_errors": len(renames) - expected,
+            "delivered": delivered,
+            "delivery_ratio": round(delivered / (expected * len(listeners)), 4) if expected and listeners else 0.0,
+            "deliveries_per_s": rate(delivered, wall),
+            "request_latency": summarize_ms([end - start for start, end, _ in sent]),
+            "delivery_latency": summarize_ms(latencies),
+            "wall_seconds": round(wall, 3),
+        }
+    finally:
+        close_listeners(listeners)
+        requests.delete(f"{ctx.base_url}/api/sessions/{session_id}", timeout=30)
+
@@ -0,0 +1,139 @@
+"""
+Shared helpers for the load benchmarks (`run_benchmarks.py`, `bench_*.py`).
+
+Latencies are measured with `time.perf_counter()` in this process, so times
+taken on WebSocket listener threads and on request threads are comparable.
+"""
+
+import io
+import json
+import math
+import random
+import threading
+import time
+import wave
+from typing import Any, Dict, List, Optional
+
+import requests
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def summarize_ms(seconds: List[float]) -> Dict[str, Any]:
+    """count / mean / p50 / p95 / p99 / max of durations given in seconds, reported in ms."""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 3) if seconds > 0 else 0.0
+
+
+def speech_wav(seconds: float, seed: int, sample_rate: int = 16000) -> bytes:
+    """
+    Loud, voice-like mono WAV (modulated tones plus noise). Every seed gives
+    different bytes, so clips are neither served from the transcription cache
+    nor skipped by the silence check.
+    """
+    rng = random.Random(seed)
+    base = rng.uniform(120, 260)
+    samples = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        envelope = 0.55 + 0.45 * math.sin(2 * math.pi * 3.0 * t)
+        value = envelope * (0.5 * math.sin(2 * math.pi * base * t) + 0.25 * math.sin(2 * math.pi * 2.7 * base * t))
+        value += rng.uniform(-0.05, 0.05)
+        samples += int(max(-1.0, min(1.0, value)) * 20000).to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(samples))
+    return buffer.getvalue()
+
+
+def loop_lag(base_url: str, reset: bool = False) -> Optional[Dict[str, Any]]:
+    """Server-side event loop lag (`/api/system/loop_lag`); None if unavailable."""
+    try:
+        resp = requests.get(f"{base_url}/api/system/loop_lag", params={"reset": str(reset).lower()}, timeout=10)
+        return resp.json() if resp.status_code == 200 else None
+    except requests.RequestException:
+        return None
+
+
+class EventListener:
+    """
+    Client of the sync WebSocket (`/ws`) on its own thread, recording
+    (receive time, event) pairs. Needs the `websockets` package.
+    """
+
+    def __init__(self, ws_url: str):
+        from websockets.sync.client import connect
+
+        self.events: List[tuple] = []
+        self._lock = threading.Lock()
+        self._ws = connect(f"{ws_url}/ws", open_timeout=10, max_queue=None)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for message in self._ws:
+                received = time.perf_counter()
+                try:
+                    event = json.loads(message)
+                except ValueError:
+                    continue
+                with self._lock:
+                    self.events.append((received, event))
+        except Exception:
+            pass
+
+    def received(self, event_type: str, key: str) -> Dict[str, float]:
+        """First receive time of `event_type` events, by payload[key]."""
+        first: Dict[str, float] = {}
+        with self._lock:
+            events = list(self.events)
+        for received, event in events:
+            if event.get("type") == event_type:
+                first.setdefault(str((event.get("payload") or {}).get(key)), received)
+        return first
+
+    def times(self, event_type: str, **payload) -> List[float]:
+        """Receive times (in order) of `event_type` events whose payload has the given values."""
+        with self._lock:
+            events = list(self.events)
+        return sorted(received for received, event in events
+                      if event.get("type") == event_type
+                      and all((event.get("payload") or {}).get(k) == v for k, v in payload.items()))
+
+    def close(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        self._thread.join(timeout=5)
+
+
+def open_listeners(ws_url: str, count: int) -> List[EventListener]:
+    return [EventListener(ws_url) for _ in range(count)]
+
+
+def close_listeners(listeners: List[EventListener]):
+    for listener in listeners:
+        listener.close()
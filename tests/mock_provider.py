@@ -0,0 +1,382 @@
+"""
+Mock STT / LLM Provider
+
+OpenAI-compatible stand-in for the external APIs, for load tests and
+benchmarks without API costs. Implements:
+
+- POST /v1/audio/transcriptions   (multipart; response_format text / json / verbose_json / srt / vtt)
+- POST /v1/chat/completions       (plain or `stream: true` SSE, `stream_options.include_usage`)
+- GET  /v1/models
+
+Paths are matched by suffix, so Azure-style deployment URLs work too.
+Behaviour is configurable per server and can be changed at runtime:
+
+- latency / jitter: seconds before the transcript or the first token (TTFT)
+- stt_seconds_per_mb: extra STT processing time per MB uploaded
+- tokens_per_second / completion_tokens: streaming speed and reply length
+- error_rate: fraction of requests answered with 500
+- rate_limit_rate: fraction answered with 429 (+ Retry-After: retry_after)
+- max_concurrency: requests beyond this many in flight get 429 (0 = unlimited)
+- drop_after_tokens: streams are cut off (connection closed, no final chunk) after this many tokens (0 = never)
+
+Control endpoints: GET /mock/stats, POST /mock/config (partial JSON), POST /mock/reset.
+
+Usage:
+    # Standalone (point system.stt.openai_api_url / system.llm.openai_api_url at it;
+    # from the backend container use http://host.docker.internal:9100/v1)
+    python tests/mock_provider.py --port 9100 --latency 0.5 --tokens-per-second 40 --rate-limit-rate 0.05
+
+    # From tests / benchmarks
+    from mock_provider import MockProvider
+
+    with MockProvider(latency=0.2, error_rate=0.1) as mock:
+        mock.url                       # "http://127.0.0.1:<port>/v1"
+        mock.configure(latency=1.0)
+        mock.stats()                   # {"requests": {...}, "status": {...}, "max_in_flight": ...}
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+DEFAULT_TRANSCRIPT = "これはモックサーバーによる文字起こし結果です。"
+
+# Tokens streamed by /chat/completions (cycled)
+_WORDS = ("本日の", "会議では", "次の", "議題について", "話し合いました。", "The", "mock", "provider",
+          "streams", "tokens", "at", "a", "fixed", "rate.", "以上です。")
+
+_FIELD_RE = re.compile(rb'name="([^"]+)"\r\n\r\n(.*?)\r\n--', re.S)
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.2
+    jitter: float = 0.0
+    stt_seconds_per_mb: float = 0.0
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 100
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    max_concurrency: int = 0
+    drop_after_tokens: int = 0
+    transcript: str = DEFAULT_TRANSCRIPT
+
+    def update(self, values: Dict[str, Any]):
+        for f in fields(self):
+            if f.name in values and values[f.name] is not None:
+                setattr(self, f.name, type(getattr(self, f.name))(values[f.name]))
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests: Dict[str, int] = {}
+            self.status: Dict[str, int] = {}
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.bytes_received = 0
+            self.tokens_sent = 0
+            self.aborted_streams = 0
+
+    def enter(self, endpoint: str, size: int) -> int:
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes_received += size
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.in_flight
+
+    def leave(self, status: int, tokens: int = 0, aborted: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            self.status[str(status)] = self.status.get(str(status), 0) + 1
+            self.tokens_sent += tokens
+            self.aborted_streams += int(aborted)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "status": dict(self.status),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "bytes_received": self.bytes_received,
+                "tokens_sent": self.tokens_sent,
+                "aborted_streams": self.aborted_streams,
+            }
+
+
+def _error_body(message: str, error_type: str, code: Optional[str] = None) -> bytes:
+    return json.dumps({"error": {"message": message, "type": error_type, "param": None, "code": code}}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_MockHTTPServer"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- plumbing ---
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                body.extend(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _delay(self, extra: float = 0.0):
+        config = self.server.config
+        time.sleep(max(0.0, config.latency + random.uniform(0, config.jitter) + extra))
+
+    def _injected_error(self, in_flight: int) -> Optional[int]:
+        """Send an injected 429 / 500 if this request draws one; returns its status."""
+        config = self.server.config
+        if (config.max_concurrency and in_flight > config.max_concurrency) or random.random() < config.rate_limit_rate:
+            self._send(429, _error_body("Rate limit reached (mock)", "requests", "rate_limit_exceeded"),
+                       headers={"Retry-After": f"{config.retry_after:g}"})
+            return 429
+        if random.random() < config.error_rate:
+            self._delay()
+            self._send(500, _error_body("The server had an error while processing your request (mock)", "server_error"))
+            return 500
+        return None
+
+    # --- routes ---
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/mock/stats":
+            self._send(200, json.dumps(self.server.stats.snapshot()).encode())
+        elif path == "/mock/config":
+            self._send(200, json.dumps(asdict(self.server.config)).encode())
+        elif path.endswith("/models"):
+            models = ["whisper-1", "gpt-4o", "gpt-4o-mini"]
+            body = {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "mock"} for m in models]}
+            self._send(200, json.dumps(body).encode())
+        else:
+            self._send(404, _error_body(f"Unknown path {path}", "invalid_request_error"))
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._read_body()
+        if path == "/mock/config":
+            self.server.config.update(json.loads(body or b"{}"))
+            self._send(200, json.dumps(asdict(self.server.config)).encode())
+        elif path == "/mock/reset":
+            self.server.stats.reset()
+            self._send(200, b"{}")
+        elif path.endswith("/audio/transcriptions"):
+            self._transcription(body)
+        elif path.endswith("/chat/completions"):
+            self._chat(body)
+        else:
+            self._send(404, _error_body(f"Unknown path {path}", "invalid_request_error"))
+
+    def _transcription(self, body: bytes):
+        stats = self.server.stats
+        status = 500
+        try:
+            status = self._injected_error(stats.enter("audio/transcriptions", len(body)))
+            if status:
+                return
+            form = {name.decode(): value.decode("utf-8", errors="ignore") for name, value in _FIELD_RE.findall(body)}
+            config = self.server.config
+            self._delay(config.stt_seconds_per_mb * len(body) / (1024 * 1024))
+
+            text = config.transcript
+            response_format = form.get("response_format", "json")
+            if response_format in ("text", "srt", "vtt"):
+                self._send(200, text.encode(), "text/plain; charset=utf-8")
+            elif response_format == "verbose_json":
+                payload = {"task": "transcribe", "language": "japanese", "duration": 0.0, "text": text, "segments": []}
+                self._send(200, json.dumps(payload, ensure_ascii=False).encode())
+            else:
+                self._send(200, json.dumps({"text": text}, ensure_ascii=False).encode())
+            status = 200
+        finally:
+            stats.leave(status)
+
+    def _chat(self, body: bytes):
+        stats = self.server.stats
+        status, tokens, aborted = 500, 0, False
+        try:
+            status = self._injected_error(stats.enter("chat/completions", len(body)))
+            if status:
+                return
+            request = json.loads(body or b"{}")
+            config = self.server.config
+            model = request.get("model") or "mock"
+            count = max(1, min(config.completion_tokens, int(request.get("max_tokens") or config.completion_tokens)))
+            words = [_WORDS[i % len(_WORDS)] + " " for i in range(count)]
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            created = int(time.time())
+
+            if not request.get("stream"):
+                self._delay(count / config.tokens_per_second if config.tokens_per_second > 0 else 0.0)
+                payload = {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+                }
+                self._send(200, json.dumps(payload, ensure_ascii=False).encode())
+                tokens, status = count, 200
+                return
+
+            def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage: Dict[str, int] = None) -> bytes:
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else []}
+                if usage is not None:
+                    data["usage"] = usage
+                return b"data: " + json.dumps(data, ensure_ascii=False).encode() + b"\n\n"
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            status = 200
+            try:
+                self._delay()
+                self._write_chunk(chunk({"role": "assistant", "content": ""}))
+                # Tokens follow a schedule from the first one, so slow writes do not add up
+                start = time.monotonic()
+                interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+                for i, word in enumerate(words):
+                    wait = start + i * interval - time.monotonic()
+                    if wait > 0:
+                        time.sleep(wait)
+                    self._write_chunk(chunk({"content": word}))
+                    tokens += 1
+                    if config.drop_after_tokens and tokens >= config.drop_after_tokens:
+                        # Simulated connection drop mid-answer: no terminating chunk
+                        aborted = True
+                        self.close_connection = True
+                        return
+                self._write_chunk(chunk({}, "stop"))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    self._write_chunk(chunk({}, usage={"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count}))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                aborted = True
+                self.close_connection = True
+        finally:
+            stats.leave(status, tokens, aborted)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once
+    request_queue_size = 1024
+
+    def __init__(self, address, config: MockConfig, verbose: bool = False):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.stats = MockStats()
+        self.verbose = verbose
+
+
+class MockProvider:
+    """Runs the mock server on a background thread (port 0 picks a free port)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, verbose: bool = False, **config):
+        self.config = MockConfig()
+        self.config.update(config)
+        self._server = _MockHTTPServer((host, port), self.config, verbose)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        """Base URL for OpenAI clients (`base_url` / `openai_api_url`)."""
+        host = self._server.server_address[0]
+        return f"http://{'127.0.0.1' if host in ('0.0.0.0', '') else host}:{self.port}/v1"
+
+    def start(self) -> "MockProvider":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-provider", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def configure(self, **values):
+        self.config.update(values)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._server.stats.snapshot()
+
+    def reset_stats(self):
+        self._server.stats.reset()
+
+    def __enter__(self) -> "MockProvider":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock STT / LLM provider")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    defaults = MockConfig()
+    for f in fields(MockConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(getattr(defaults, f.name)), default=getattr(defaults, f.name))
+    args = parser.parse_args()
+
+    config = {f.name: getattr(args, f.name) for f in fields(MockConfig)}
+    mock = MockProvider(args.host, args.port, args.verbose, **config)
+    print(f"Mock provider listening on {mock.url} ({json.dumps(config, ensure_ascii=False)})")
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from glob import glob
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import requests
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_utils import BASE_URL
+from bench_utils import loop_lag
+from mock_provider import MockConfig, MockProvider
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "bench_results")
+
+# Provider URLs considered local (mock); anything else needs --allow-real-provider
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0", "host.docker.internal", "mock", "mock-provider"}
+
+# Metrics shown by --compare (higher is better for throughput, lower for the rest)
+COMPARE_SUFFIXES = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "tokens_per_s", "deliveries_per_s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="VoxDraft load benchmarks (against a live backend and a mock provider)")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--only", default="", help="comma-separated benchmark names (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel clients")
+    parser.add_argument("--requests", type=int, default=40, help="requests per benchmark")
+    parser.add_argument("--listeners", type=int, default=20, help="WebSocket clients for the fan-out benchmark")
+    parser.add_argument("--clip-seconds", type=float, default=3.0, help="length of each uploaded clip")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for transcriptions")
+    parser.add_argument("--output", help="result file (default: tests/bench_results/bench-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--no-mock", action="store_true", help="do not start the mock provider here")
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--allow-real-provider", action="store_true", help="run even if the backend points at a remote API")
+    defaults = MockConfig()
+    for name in ("latency", "jitter", "tokens_per_second", "completion_tokens", "error_rate", "rate_limit_rate"):
+        parser.add_argument(f"--mock-{name.replace('_', '-')}", type=type(getattr(defaults, name)), default=getattr(defaults, name))
+    return parser.parse_args()
+
+
+def provider_urls(base_url):
+    config = requests.get(f"{base_url}/api/system/config", timeout=10).json()
+    return {kind: (config.get(kind) or {}).get("url") or "" for kind in ("stt", "llm")}
+
+
+def remote_providers(urls):
+    return {kind: url for kind, url in urls.items() if urlparse(url).hostname not in LOCAL_HOSTS}
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_benchmarks(only):
+    modules = []
+    for fpath in sorted(glob(os.path.join(BENCH_DIR, "bench_*.py"))):
+        if fpath.endswith("bench_utils.py"):
+            continue
+        module_name = os.path.basename(fpath).replace(".py", "")
+        spec = importlib.util.spec_from_file_location(module_name, fpath)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if hasattr(module, "run") and (not only or module.NAME in only):
+            modules.append(module)
+    return modules
+
+
+def flatten(data, prefix=""):
+    items = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            items.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            items[name] = value
+    return items
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparison with {baseline_path} ({baseline.get('version')} -> {current.get('version')})")
+    old, new = flatten(baseline.get("results", {})), flatten(current.get("results", {}))
+    for key in sorted(new):
+        if not key.endswith(COMPARE_SUFFIXES) or key not in old:
+            continue
+        before, after = old[key], new[key]
+        change = (after - before) / before * 100 if before else 0.0
+        better = change > 0 if "per_s" in key else change < 0
+        marker = "" if abs(change) < 5 else ("  (better)" if better else "  (WORSE)")
+        print(f"  {key:<55} {before:>10.2f} -> {after:>10.2f}  {change:+6.1f}%{marker}")
+
+
+def main():
+    args = parse_args()
+    print("========================================")
+    print("VOX-DRAFT LOAD BENCHMARKS")
+    print("========================================")
+
+    try:
+        urls = provider_urls(args.base_url)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Backend not reachable at {args.base_url}: {e}")
+        sys.exit(1)
+    remote = remote_providers(urls)
+    if remote and not args.allow_real_provider:
+        print(f"The backend points at remote providers {remote}: refusing to run (API costs).")
+        print("Set system.stt.openai_api_url / system.llm.openai_api_url to the mock provider, or pass --allow-real-provider.")
+        sys.exit(1)
+
+    mock = None
+    if not args.no_mock:
+        mock = MockProvider("0.0.0.0", args.mock_port, latency=args.mock_latency, jitter=args.mock_jitter,
+                            tokens_per_second=args.mock_tokens_per_second, completion_tokens=args.mock_completion_tokens,
+                            error_rate=args.mock_error_rate, rate_limit_rate=args.mock_rate_limit_rate).start()
+        print(f"Mock provider on {mock.url}")
+
+    ctx = SimpleNamespace(
+        base_url=args.base_url,
+        ws_url=args.base_url.replace("http", "ws", 1),
+        concurrency=args.concurrency,
+        requests=args.requests,
+        listeners=args.listeners,
+        clip_seconds=args.clip_seconds,
+        timeout=args.timeout,
+    )
+    only = {name.strip() for name in args.only.split(",") if name.strip()}
+    report = {
+        "version": git_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "base_url": args.base_url,
+        "provider_urls": urls,
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": {},
+    }
+
+    try:
+        for module in load_benchmarks(only):
+            print(f"\nRunning {module.NAME}...")
+            loop_lag(args.base_url, reset=True)
+            if mock:
+                mock.reset_stats()
+            try:
+                result = module.run(ctx)
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            result["loop_lag"] = loop_lag(args.base_url)
+            if mock:
+                result["mock"] = mock.stats()
+            report["results"][module.NAME] = result
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+    finally:
+        if mock:
+            mock.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+    failed = [name for name, result in report["results"].items() if "error" in result]
+    if failed:
+        print(f"FAILED: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
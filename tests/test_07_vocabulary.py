@@ -34,3 +34,27 @@ def run(result):
         result.fail("Delete failed")
     else:
         result.log("Deleted Vocabulary Item")
+
+    # 5. Correction over existing transcripts
+    resp = requests.post(url, json={"word": "VoxCorrect", "reading": "ぼくすこれくと"})
+    if resp.status_code != 200:
+        result.fail("Create correction item failed")
+        return
+    vocab_id = resp.json()['id']
+    s_url = f"{BASE_URL}/api/sessions/"
+    session_id = requests.post(s_url, json={"title": "Vocabulary Apply Test"}).json()['id']
+    try:
+        block = requests.post(f"{s_url}{session_id}/blocks", json={"type": "audio", "text": "今日はぼくすこれくとの話です"}).json()
+        resp = requests.post(f"{url}apply", json={"session_ids": [session_id], "dry_run": True})
+        if resp.status_code != 200 or resp.json().get('blocks_changed') != 1:
+            result.fail(f"Apply dry run mismatch: {resp.status_code} - {resp.text}")
+        resp = requests.post(f"{url}apply", json={"session_ids": [session_id]})
+        blocks = requests.get(f"{s_url}{session_id}/blocks").json()
+        text = next((b['text'] for b in blocks if b['id'] == block['id']), None)
+        if resp.status_code != 200 or text != "今日はVoxCorrectの話です":
+            result.fail(f"Apply did not correct the transcript: {text}")
+        else:
+            result.log("Applied vocabulary correction to existing transcript")
+    finally:
+        requests.delete(f"{url}{vocab_id}")
+        requests.delete(f"{s_url}{session_id}")
@@ -1,10 +1,14 @@
 from test_utils import BASE_URL
 import requests
 import os
+import wave
+import hashlib
+import time
 
 def run(result):
     # Prepare dummy file
     dummy_file_path = "tests/dummy.mp3"
+    wav_file_path = "tests/probe.wav"
     with open(dummy_file_path, "wb") as f:
         f.write(b"dummy audio content")
         
@@ -58,6 +62,69 @@ def run(result):
              data2 = resp.json()
              if data2['session_id'] != session_id:
                   result.fail("Session ID mismatch on second upload")
+
+        # 3. Metadata probed at upload (1 s of mono 16 kHz silence)
+        with wave.open(wav_file_path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b"\x00\x00" * 16000)
+        with open(wav_file_path, "rb") as f:
+            resp = requests.post(url, files={'file': ('probe.wav', f, 'audio/wav')}, data={'session_id': session_id})
+        if resp.status_code != 200:
+            result.fail("Upload WAV failed")
+        else:
+            wav_block_id = resp.json()['block_id']
+            blocks = requests.get(f"{BASE_URL}/api/sessions/{session_id}/blocks").json()
+            block = next((b for b in blocks if b['id'] == wav_block_id), {})
+            if block.get('sample_rate') != 16000 or block.get('channels') != 1 or abs((block.get('duration_seconds') or 0) - 1.0) > 0.05:
+                result.fail(f"Probed metadata mismatch: {block}")
+            else:
+                result.log(f"Probed metadata: {block.get('codec')} {block.get('duration_seconds')}s {block.get('byte_size')} bytes")
+
+            # Silent clip: completed locally without a provider call
+            resp = requests.post(f"{BASE_URL}/api/stt/transcribe/{wav_block_id}")
+            if resp.status_code not in (200, 202):
+                result.fail(f"Transcribe silent WAV failed: {resp.status_code}")
+            else:
+                for _ in range(30):
+                    blocks = requests.get(f"{BASE_URL}/api/sessions/{session_id}/blocks").json()
+                    block = next((b for b in blocks if b['id'] == wav_block_id), {})
+                    if block.get('status') not in ('queued', 'processing'):
+                        break
+                    time.sleep(0.5)
+                if block.get('status') != 'completed' or block.get('status_message') != 'No speech detected':
+                    result.fail(f"Silent WAV not short-circuited: {block.get('status')} / {block.get('status_message')}")
+                else:
+                    result.log("Silent WAV completed as 'No speech detected'")
+
+
+        # 4. Resumable upload: create -> PATCH chunks -> finalize
+        payload = os.urandom(300000)
+        up_url = f"{BASE_URL}/api/audio/uploads"
+        resp = requests.post(up_url, json={"filename": "resumable.mp3", "size": len(payload), "session_id": session_id})
+        if resp.status_code != 200:
+            result.fail(f"Create upload failed: {resp.status_code} - {resp.text}")
+        else:
+            upload_id = resp.json()['id']
+            headers = {"Content-Type": "application/offset+octet-stream"}
+            requests.patch(f"{up_url}/{upload_id}", data=payload[:100000], headers={**headers, "Upload-Offset": "0"})
+            resp = requests.post(f"{up_url}/{upload_id}/finalize", json={})
+            if resp.status_code != 409:
+                result.fail(f"Finalize of an incomplete upload should be 409, got {resp.status_code}")
+            # Stale offset (e.g. a retried chunk): server answers with its own offset
+            resp = requests.patch(f"{up_url}/{upload_id}", data=payload[:100000], headers={**headers, "Upload-Offset": "0"})
+            offset = requests.get(f"{up_url}/{upload_id}").json()['offset']
+            if resp.status_code != 409 or offset != 100000:
+                result.fail(f"Offset mismatch not reported: {resp.status_code}, offset {offset}")
+            resp = requests.patch(f"{up_url}/{upload_id}", data=payload[offset:], headers={**headers, "Upload-Offset": str(offset)})
+            if resp.status_code != 200 or resp.json()['offset'] != len(payload):
+                result.fail(f"Append failed: {resp.status_code} - {resp.text}")
+            resp = requests.post(f"{up_url}/{upload_id}/finalize", json={"sha256": hashlib.sha256(payload).hexdigest()})
+            if resp.status_code != 200 or resp.json().get('session_id') != session_id:
+                result.fail(f"Finalize failed: {resp.status_code} - {resp.text}")
+            else:
+                result.log(f"Resumable upload finalized as block {resp.json()['block_id']}")
                   
         # Cleanup
         # Delete Session (should delete files too via Empty Trash)
@@ -65,5 +132,6 @@ def run(result):
         requests.delete(f"{BASE_URL}/api/sessions/trash/empty") # Hard
         
     finally:
-        if os.path.exists(dummy_file_path):
-            os.remove(dummy_file_path)
+        for path in (dummy_file_path, wav_file_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,72 @@
+from test_utils import BASE_URL
+import requests
+
+def run(result):
+    url = f"{BASE_URL}/api/stt/queue"
+
+    # 1. Queue introspection
+    resp = requests.get(url)
+    if resp.status_code != 200:
+        result.fail(f"Queue status failed: {resp.status_code}")
+        return
+    stats = resp.json()
+    for key in ("max_queued", "queued", "running", "lanes", "engine", "async", "jobs"):
+        if key not in stats:
+            result.fail(f"Queue status missing '{key}'")
+    result.log(f"Queue: engine={stats.get('engine')} queued={stats.get('queued')} running={stats.get('running')}")
+
+    # 2. Result cache counters
+    resp = requests.get(f"{BASE_URL}/api/stt/cache")
+    if resp.status_code != 200:
+        result.fail(f"Cache status failed: {resp.status_code}")
+    else:
+        cache = resp.json()
+        for key in ("hits", "misses", "entries", "size_bytes", "gemini_files"):
+            if key not in cache:
+                result.fail(f"Cache status missing '{key}'")
+        result.log(f"Cache: hits={cache.get('hits')} misses={cache.get('misses')}")
+
+    # 3. Unknown block should 404 without touching the queue
+    resp = requests.post(f"{BASE_URL}/api/stt/transcribe/non-existent-block")
+    if resp.status_code != 404:
+        result.fail(f"Transcribe unknown block expected 404, got {resp.status_code}")
+    else:
+        result.log("Unknown block rejected (404)")
+
+    resp = requests.delete(f"{BASE_URL}/api/stt/transcribe/non-existent-block")
+    if resp.status_code != 404:
+        result.fail(f"Cancel unknown block expected 404, got {resp.status_code}")
+
+    # Batch endpoints: unknown session / blocks / batch
+    resp = requests.post(f"{BASE_URL}/api/sessions/non-existent-session/transcribe")
+    if resp.status_code != 404:
+        result.fail(f"Transcribe unknown session expected 404, got {resp.status_code}")
+    resp = requests.post(f"{BASE_URL}/api/stt/transcribe", json={"block_ids": ["non-existent-block"]})
+    if resp.status_code != 404:
+        result.fail(f"Batch transcribe of unknown blocks expected 404, got {resp.status_code}")
+    resp = requests.get(f"{BASE_URL}/api/stt/batches/non-existent-batch")
+    if resp.status_code != 404:
+        result.fail(f"Unknown batch expected 404, got {resp.status_code}")
+    else:
+        result.log("Batch endpoints reject unknown ids (404)")
+
+    # 4. Shared provider rate limiter state
+    resp = requests.get(f"{BASE_URL}/api/system/rate_limits")
+    if resp.status_code != 200 or not isinstance(resp.json(), dict):
+        result.fail(f"Rate limiter status failed: {resp.status_code}")
+    else:
+        result.log(f"Rate limiters: {sorted(resp.json().keys())}")
+
+    # 5. Circuit breaker state and failover order
+    resp = requests.get(f"{BASE_URL}/api/system/breakers")
+    if resp.status_code != 200:
+        result.fail(f"Breaker status failed: {resp.status_code}")
+    else:
+        data = resp.json()
+        for key in ("breakers", "failover"):
+            if key not in data:
+                result.fail(f"Breaker status missing '{key}'")
+        result.log(f"Failover: {data.get('failover')}")
+    resp = requests.post(f"{BASE_URL}/api/system/breakers/bogus/openai/reset")
+    if resp.status_code != 400:
+        result.fail(f"Reset with unknown kind expected 400, got {resp.status_code}")
@@ -0,0 +1,58 @@
+from test_utils import BASE_URL
+import json
+import requests
+
+WS_URL = BASE_URL.replace("http", "ws", 1)
+
+def run(result):
+    try:
+        from websockets.sync.client import connect
+        from websockets.exceptions import ConnectionClosed
+    except ImportError:
+        result.log("websockets not installed, skipping")
+        return
+
+    # 1. Unknown session is rejected with 4404
+    try:
+        with connect(f"{WS_URL}/ws/stt/non-existent-session") as ws:
+            ws.recv(timeout=5)
+            result.fail("Unknown session was not rejected")
+    except ConnectionClosed as e:
+        if e.rcvd is None or e.rcvd.code != 4404:
+            result.fail(f"Expected close code 4404, got {e.rcvd.code if e.rcvd else None}")
+        else:
+            result.log("Unknown session rejected (4404)")
+
+    resp = requests.post(f"{BASE_URL}/api/sessions/", json={"title": "Streaming Test"})
+    if resp.status_code != 200:
+        result.fail(f"Create session failed: {resp.status_code}")
+        return
+    session_id = resp.json()["id"]
+    try:
+        # 2. Out-of-range sample rate is rejected with 1008 (too small would never fill a VAD frame)
+        for bad_rate in (1, -16000, 96000):
+            try:
+                with connect(f"{WS_URL}/ws/stt/{session_id}?sample_rate={bad_rate}") as ws:
+                    ws.recv(timeout=5)
+                    result.fail(f"sample_rate={bad_rate} was not rejected")
+            except ConnectionClosed as e:
+                if e.rcvd is None or e.rcvd.code != 1008:
+                    result.fail(f"sample_rate={bad_rate}: expected close code 1008, got {e.rcvd.code if e.rcvd else None}")
+        result.log("Out-of-range sample rates rejected (1008)")
+
+        # 3. Silence only: no utterances, no blocks, clean shutdown
+        with connect(f"{WS_URL}/ws/stt/{session_id}?sample_rate=16000") as ws:
+            ready = json.loads(ws.recv(timeout=5))
+            if ready.get("type") != "ready":
+                result.fail(f"Expected ready message, got {ready}")
+            silence = b"\x00\x00" * 16000
+            for _ in range(2):
+                ws.send(silence)
+            ws.send(json.dumps({"type": "stop"}))
+            done = json.loads(ws.recv(timeout=10))
+            if done.get("type") != "done" or done.get("utterances") != 0:
+                result.fail(f"Expected done with 0 utterances, got {done}")
+            else:
+                result.log("Silence produced no utterances")
+    finally:
+        requests.delete(f"{BASE_URL}/api/sessions/{session_id}")
@@ -0,0 +1,65 @@
+from test_utils import BASE_URL
+import json
+import requests
+from urllib.parse import urlparse
+
+# Only run against a local mock provider (never a real API)
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0"}
+
+
+def _mock_root(result):
+    config = requests.get(f"{BASE_URL}/api/system/config", timeout=10).json().get("llm") or {}
+    url = urlparse(config.get("url") or "")
+    if config.get("provider") != "openai" or url.hostname not in LOCAL_HOSTS:
+        result.log("LLM provider is not a local mock, skipping")
+        return None, None
+    root = f"{url.scheme}://{url.netloc}"
+    try:
+        requests.get(f"{root}/mock/stats", timeout=2)
+        return root, None
+    except requests.RequestException:
+        from mock_provider import MockProvider
+        return root, MockProvider(url.hostname, url.port or 80).start()
+
+
+def _events(body):
+    with requests.post(f"{BASE_URL}/api/llm/chat/stream", json=body, stream=True, timeout=60) as resp:
+        if resp.status_code != 200:
+            raise RuntimeError(f"Stream request failed: {resp.status_code}")
+        for line in resp.iter_lines():
+            if not line.startswith(b"data: ") or line[6:] == b"[DONE]":
+                continue
+            yield json.loads(line[6:])
+
+
+def run(result):
+    root, started = _mock_root(result)
+    if root is None:
+        return
+    previous = requests.get(f"{root}/mock/config", timeout=5).json()
+    try:
+        # 1. The stream drops after one token: no retry / failover once content went out
+        requests.post(f"{root}/mock/config", json={
+            "drop_after_tokens": 1, "latency": 0.05, "error_rate": 0.0, "rate_limit_rate": 0.0, "max_concurrency": 0
+        }, timeout=5)
+        requests.post(f"{root}/mock/reset", timeout=5)
+        events = list(_events({"messages": [{"role": "user", "content": "Interrupted stream test"}]}))
+        contents = [e for e in events if e.get("content")]
+        first = next((i for i, e in enumerate(events) if e.get("content")), None)
+        after = events[first + 1:] if first is not None else []
+        calls = requests.get(f"{root}/mock/stats", timeout=5).json()["requests"].get("chat/completions", 0)
+
+        if len(contents) != 1:
+            result.fail(f"Expected 1 content chunk, got {len(contents)}: {events}")
+        elif any(e.get("type") == "status" for e in after):
+            result.fail(f"Stream was retried after content was sent: {after}")
+        elif [e.get("type") for e in after] != ["error"]:
+            result.fail(f"Expected a single error event after the partial answer, got {after}")
+        elif calls != 1:
+            result.fail(f"Expected 1 provider call, got {calls}")
+        else:
+            result.log(f"Interrupted stream ended with an error: {after[0].get('message')}")
+    finally:
+        requests.post(f"{root}/mock/config", json=previous, timeout=5)
+        if started:
+            started.stop()